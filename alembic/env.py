@@ -0,0 +1,125 @@
+from logging.config import fileConfig
+
+from sqlalchemy import engine_from_config
+from sqlalchemy import pool
+from sqlalchemy import Date, DateTime
+
+from alembic import context
+
+from app import config as app_config
+from app.models import Base
+
+# this is the Alembic Config object, which provides
+# access to the values within the .ini file in use.
+config = context.config
+
+# Interpret the config file for Python logging.
+# This line sets up loggers basically.
+if config.config_file_name is not None:
+    fileConfig(config.config_file_name)
+
+# add your model's MetaData object here
+# for 'autogenerate' support
+# from myapp import mymodel
+# target_metadata = mymodel.Base.metadata
+target_metadata = Base.metadata
+
+# URL de la base : celle de l'application, sauf si fournie explicitement
+if not config.get_main_option("sqlalchemy.url"):
+    config.set_main_option("sqlalchemy.url", app_config.DATABASE_URL)
+
+# Objets créés par les migrations hors de Base.metadata : tables virtuelles FTS5 et
+# leurs tables internes (book_fts_data...), index GIN tsvector sur PostgreSQL (0005).
+# Sans ce filtre, `alembic check` et `--autogenerate` proposent de les supprimer.
+TABLES_FTS = ("book_fts", "author_fts")
+INDEX_FTS = ("ix_book_titre_tsv", "ix_author_nom_tsv")
+
+
+def include_object(objet, nom, type_, reflete, compare_to):
+    if type_ == "table" and reflete and compare_to is None:
+        return not any(nom == table or nom.startswith(f"{table}_") for table in TABLES_FTS)
+    if type_ == "index" and nom in INDEX_FTS:
+        return False
+    return True
+
+
+def compare_type(context, colonne_inspectee, colonne_metadata, type_inspecte, type_metadata):
+    """
+    Dates des emprunts : DATETIME dans les bases créées avant Alembic (bibliotheque.db fournie,
+    marquée `alembic stamp 0001`), Date depuis 0001. Sur SQLite les deux ont la même affinité et
+    sont lues par l'application (app.stock._duree accepte datetime et date) : pas d'écart signalé.
+    """
+    if (
+        context.dialect.name == "sqlite"
+        and isinstance(type_metadata, Date)
+        and isinstance(type_inspecte, DateTime)
+    ):
+        return False
+    # Comparaison par défaut d'Alembic
+    return None
+
+
+# other values from the config, defined by the needs of env.py,
+# can be acquired:
+# my_important_option = config.get_main_option("my_important_option")
+# ... etc.
+
+
+def run_migrations_offline() -> None:
+    """Run migrations in 'offline' mode.
+
+    This configures the context with just a URL
+    and not an Engine, though an Engine is acceptable
+    here as well.  By skipping the Engine creation
+    we don't even need a DBAPI to be available.
+
+    Calls to context.execute() here emit the given string to the
+    script output.
+
+    """
+    url = config.get_main_option("sqlalchemy.url")
+    context.configure(
+        url=url,
+        target_metadata=target_metadata,
+        literal_binds=True,
+        include_object=include_object,
+        compare_type=compare_type,
+        dialect_opts={"paramstyle": "named"},
+        render_as_batch=url.startswith("sqlite"),
+    )
+
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    """Run migrations in 'online' mode.
+
+    In this scenario we need to create an Engine
+    and associate a connection with the context.
+
+    """
+    connectable = engine_from_config(
+        config.get_section(config.config_ini_section, {}),
+        prefix="sqlalchemy.",
+        poolclass=pool.NullPool,
+    )
+
+    with connectable.connect() as connection:
+        context.configure(
+            connection=connection,
+            target_metadata=target_metadata,
+            include_object=include_object,
+            compare_type=compare_type,
+            # SQLite ne sait pas modifier une contrainte : tables recopiées par batch
+            render_as_batch=connection.dialect.name == "sqlite",
+        )
+
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
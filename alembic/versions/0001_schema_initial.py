@@ -0,0 +1,102 @@
+"""schema initial
+
+Revision ID: 0001
+Revises: 
+Create Date: 2026-10-17 00:00:00.000000
+
+Schéma tel que créé par Base.metadata.create_all avant l'arrivée d'Alembic.
+Une base existante (bibliotheque.db) se marque avec `alembic stamp 0001`.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'author',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('prenom', sa.String(length=100), nullable=False),
+        sa.Column('nom', sa.String(length=100), nullable=False),
+        sa.Column('date_naissance', sa.Date(), nullable=False),
+        sa.Column('nationalite', sa.String(length=2), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('prenom', 'nom', name='uq_author_full_name'),
+    )
+    op.create_index('ix_author_id', 'author', ['id'])
+
+    op.create_table(
+        'book',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('titre', sa.String(length=255), nullable=False),
+        sa.Column('isbn', sa.String(length=17), nullable=False),
+        sa.Column('annee_publication', sa.Integer(), nullable=False),
+        sa.Column('nombre_exemplaires_disponibles', sa.Integer(), nullable=False),
+        sa.Column('nombre_exemplaires_total', sa.Integer(), nullable=False),
+        sa.Column('categorie', sa.String(length=50), nullable=False),
+        sa.Column('langue', sa.String(length=50), nullable=False),
+        sa.Column('nombre_pages', sa.Integer(), nullable=False),
+        sa.Column('maison_edition', sa.String(length=255), nullable=False),
+        sa.Column('auteur_id', sa.Integer(), nullable=False),
+        sa.CheckConstraint(
+            'nombre_exemplaires_disponibles <= nombre_exemplaires_total',
+            name='ck_exemplaires_dispo_lte_total',
+        ),
+        sa.ForeignKeyConstraint(['auteur_id'], ['author.id'], ondelete='RESTRICT'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_book_auteur_id', 'book', ['auteur_id'])
+    op.create_index('ix_book_id', 'book', ['id'])
+    op.create_index('ix_book_isbn', 'book', ['isbn'], unique=True)
+    op.create_index('ix_book_titre', 'book', ['titre'])
+
+    op.create_table(
+        'loans',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nom_emprunteur', sa.String(length=255), nullable=False),
+        sa.Column('email_emprunteur', sa.String(length=255), nullable=False),
+        sa.Column('numero_carte_bibliotheque', sa.String(length=50), nullable=False),
+        sa.Column('date_emprunt', sa.Date(), nullable=False),
+        sa.Column('date_limite_retour', sa.Date(), nullable=False),
+        sa.Column('date_retour_effectif', sa.Date(), nullable=True),
+        sa.Column('statut', sa.String(length=20), nullable=False),
+        sa.Column('commentaires', sa.Text(), nullable=True),
+        sa.Column('livre_id', sa.Integer(), nullable=False),
+        sa.CheckConstraint(
+            'date_retour_effectif IS NULL OR date_retour_effectif >= date_emprunt',
+            name='ck_loan_retour_apres_loan',
+        ),
+        sa.ForeignKeyConstraint(['livre_id'], ['book.id'], ondelete='RESTRICT'),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_loans_id', 'loans', ['id'])
+    op.create_index('ix_loans_livre_id', 'loans', ['livre_id'])
+    op.create_index('ix_loans_numero_carte_bibliotheque', 'loans', ['numero_carte_bibliotheque'], unique=True)
+
+    op.create_table(
+        'loan_history',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('livre_id', sa.Integer(), nullable=False),
+        sa.Column('nombre_emprunts_total', sa.Integer(), nullable=False),
+        sa.Column('duree_moyenne_emprunt', sa.Integer(), nullable=True),
+        sa.Column('popularite', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['livre_id'], ['book.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_loan_history_id', 'loan_history', ['id'])
+    op.create_index('ix_loan_history_livre_id', 'loan_history', ['livre_id'])
+
+
+def downgrade() -> None:
+    op.drop_table('loan_history')
+    op.drop_table('loans')
+    op.drop_table('book')
+    op.drop_table('author')
@@ -0,0 +1,91 @@
+"""statistiques d'emprunts et tri par popularité / auteur
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00.000000
+
+- book.popularite (indexée) : copie de LoanHistory.popularite pour le tri
+- loan_history.nombre_retours : base de la moyenne glissante des durées
+- loan_history.livre_id devient unique (une ligne de statistiques par livre)
+- index sur author.nom pour sort_by=auteur
+Les statistiques sont calculées une fois depuis les emprunts existants.
+"""
+from collections import defaultdict
+from datetime import date
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _en_date(valeur):
+    # Les bases créées avant Alembic stockent parfois un DATETIME
+    if isinstance(valeur, str):
+        return date.fromisoformat(valeur[:10])
+    return valeur
+
+
+def upgrade() -> None:
+    with op.batch_alter_table('book') as batch:
+        batch.add_column(sa.Column('popularite', sa.Integer(), nullable=False, server_default='0'))
+        batch.create_index('ix_book_popularite', ['popularite'])
+
+    with op.batch_alter_table('loan_history') as batch:
+        batch.add_column(sa.Column('nombre_retours', sa.Integer(), nullable=False, server_default='0'))
+        batch.alter_column('duree_moyenne_emprunt', type_=sa.Float(), existing_nullable=True)
+        batch.drop_index('ix_loan_history_livre_id')
+        batch.create_index('ix_loan_history_livre_id', ['livre_id'], unique=True)
+
+    op.create_index('ix_author_nom', 'author', ['nom'])
+
+    # Calcul initial des statistiques (seule agrégation complète sur loans)
+    conn = op.get_bind()
+    emprunts = defaultdict(int)
+    durees = defaultdict(list)
+    for livre_id, debut, fin in conn.execute(sa.text(
+        "SELECT livre_id, date_emprunt, date_retour_effectif FROM loans"
+    )):
+        emprunts[livre_id] += 1
+        if fin is not None:
+            durees[livre_id].append((_en_date(fin) - _en_date(debut)).days)
+
+    conn.execute(sa.text("DELETE FROM loan_history"))
+    for livre_id, nombre in emprunts.items():
+        retours = durees[livre_id]
+        conn.execute(
+            sa.text(
+                "INSERT INTO loan_history (livre_id, nombre_emprunts_total, duree_moyenne_emprunt, "
+                "nombre_retours, popularite) VALUES (:livre_id, :nombre, :duree, :retours, :nombre)"
+            ),
+            {
+                "livre_id": livre_id,
+                "nombre": nombre,
+                "duree": sum(retours) / len(retours) if retours else None,
+                "retours": len(retours),
+            },
+        )
+        conn.execute(
+            sa.text("UPDATE book SET popularite = :nombre WHERE id = :livre_id"),
+            {"livre_id": livre_id, "nombre": nombre},
+        )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_author_nom', table_name='author')
+
+    with op.batch_alter_table('loan_history') as batch:
+        batch.drop_index('ix_loan_history_livre_id')
+        batch.create_index('ix_loan_history_livre_id', ['livre_id'])
+        batch.alter_column('duree_moyenne_emprunt', type_=sa.Integer(), existing_nullable=True)
+        batch.drop_column('nombre_retours')
+
+    with op.batch_alter_table('book') as batch:
+        batch.drop_index('ix_book_popularite')
+        batch.drop_column('popularite')
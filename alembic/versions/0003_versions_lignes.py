@@ -0,0 +1,38 @@
+"""version et updated_at pour les requêtes conditionnelles (ETag / Last-Modified)
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 00:00:00.000000
+
+Colonnes ajoutées à author, book et loans. updated_at reste nullable :
+SQLite refuse un DEFAULT CURRENT_TIMESTAMP dans ADD COLUMN et un passage
+à NOT NULL recopierait les tables (et supprimerait les triggers FTS).
+Les lignes existantes reçoivent l'heure de la migration.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TABLES = ('author', 'book', 'loans')
+
+
+def upgrade() -> None:
+    for table in TABLES:
+        op.add_column(table, sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+        op.add_column(table, sa.Column('updated_at', sa.DateTime(), nullable=True))
+        op.execute(f"UPDATE {table} SET updated_at = CURRENT_TIMESTAMP")
+
+
+def downgrade() -> None:
+    for table in TABLES:
+        with op.batch_alter_table(table) as batch:
+            batch.drop_column('updated_at')
+            batch.drop_column('version')
@@ -0,0 +1,49 @@
+"""index composites des chemins de recherche et de tri
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 00:00:00.000000
+
+Chaque index suit une forme de requête des endpoints (voir app/plans.py) :
+colonnes filtrées par égalité d'abord, puis la plage ou la colonne de tri.
+L'id n'est jamais ajouté : SQLite termine chaque index par le rowid, ce
+qui couvre le départage "ORDER BY colonne, id" de la pagination.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0004'
+down_revision: Union[str, None] = '0003'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX = [
+    # /books/search : categorie, langue, plage d'années, disponibilité
+    ('ix_book_categorie_titre', 'book', ['categorie', 'titre']),
+    ('ix_book_categorie_langue_annee', 'book', ['categorie', 'langue', 'annee_publication']),
+    ('ix_book_langue_annee', 'book', ['langue', 'annee_publication']),
+    ('ix_book_annee_publication', 'book', ['annee_publication']),
+    ('ix_book_disponibles', 'book', ['nombre_exemplaires_disponibles']),
+    # /authors/search : nationalite, tri par nom ou date de naissance
+    ('ix_author_nationalite_nom', 'author', ['nationalite', 'nom']),
+    ('ix_author_nationalite_date_naissance', 'author', ['nationalite', 'date_naissance']),
+    ('ix_author_date_naissance', 'author', ['date_naissance']),
+    # Emprunts échus
+    ('ix_loans_statut_date_limite', 'loans', ['statut', 'date_limite_retour']),
+]
+
+
+def upgrade() -> None:
+    for nom, table, colonnes in INDEX:
+        op.create_index(nom, table, colonnes)
+    # Statistiques pour le planificateur (sélectivité des nouveaux index)
+    if op.get_bind().dialect.name == 'sqlite':
+        op.execute('ANALYZE')
+
+
+def downgrade() -> None:
+    for nom, table, _ in reversed(INDEX):
+        op.drop_index(nom, table_name=table)
@@ -0,0 +1,101 @@
+"""index plein texte : FTS5 (book_fts, author_fts) et leurs triggers, GIN sur PostgreSQL
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-17 00:00:00.000000
+
+Jusqu'ici créés par l'application à chaque import de app.main ; ils font
+désormais partie du schéma, créé une fois par déploiement avec
+`alembic upgrade head`. Sur PostgreSQL, index GIN sur to_tsvector('simple', ...).
+Sans effet sur les autres bases ou sans FTS5 : la recherche retombe sur ILIKE.
+
+Le DDL est recopié ici (et non importé de app.search) : rejouer la migration
+doit toujours produire le même schéma, quelle que soit la version du code.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0005'
+down_revision: Union[str, None] = '0004'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+TRIGGERS = [
+    'book_fts_ai', 'book_fts_ad', 'book_fts_au',
+    'author_fts_ai', 'author_fts_ad', 'author_fts_au',
+]
+
+
+TOKENIZE = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS book_fts USING fts5(
+        titre, content='book', content_rowid='id', {TOKENIZE})""",
+    """CREATE TRIGGER IF NOT EXISTS book_fts_ai AFTER INSERT ON book BEGIN
+        INSERT INTO book_fts(rowid, titre) VALUES (new.id, new.titre);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS book_fts_ad AFTER DELETE ON book BEGIN
+        INSERT INTO book_fts(book_fts, rowid, titre) VALUES ('delete', old.id, old.titre);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS book_fts_au AFTER UPDATE OF titre ON book BEGIN
+        INSERT INTO book_fts(book_fts, rowid, titre) VALUES ('delete', old.id, old.titre);
+        INSERT INTO book_fts(rowid, titre) VALUES (new.id, new.titre);
+    END""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS author_fts USING fts5(
+        prenom, nom, content='author', content_rowid='id', {TOKENIZE})""",
+    """CREATE TRIGGER IF NOT EXISTS author_fts_ai AFTER INSERT ON author BEGIN
+        INSERT INTO author_fts(rowid, prenom, nom) VALUES (new.id, new.prenom, new.nom);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS author_fts_ad AFTER DELETE ON author BEGIN
+        INSERT INTO author_fts(author_fts, rowid, prenom, nom) VALUES ('delete', old.id, old.prenom, old.nom);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS author_fts_au AFTER UPDATE OF prenom, nom ON author BEGIN
+        INSERT INTO author_fts(author_fts, rowid, prenom, nom) VALUES ('delete', old.id, old.prenom, old.nom);
+        INSERT INTO author_fts(rowid, prenom, nom) VALUES (new.id, new.prenom, new.nom);
+    END""",
+]
+
+PG_DDL = [
+    "CREATE INDEX IF NOT EXISTS ix_book_titre_tsv ON book USING gin (to_tsvector('simple', titre))",
+    "CREATE INDEX IF NOT EXISTS ix_author_nom_tsv ON author USING gin (to_tsvector('simple', prenom || ' ' || nom))",
+]
+
+
+def upgrade() -> None:
+    conn = op.get_bind()
+    if conn.dialect.name == 'postgresql':
+        for ddl in PG_DDL:
+            op.execute(ddl)
+        return
+    if conn.dialect.name != 'sqlite':
+        return
+    options = set(conn.execute(sa.text('PRAGMA compile_options')).scalars())
+    if 'ENABLE_FTS5' not in options:
+        return
+
+    existants = set(conn.execute(sa.text(
+        "SELECT name FROM sqlite_master WHERE name IN ('book_fts', 'author_fts')"
+    )).scalars())
+    for ddl in FTS_DDL:
+        op.execute(ddl)
+    # Index à contenu externe : remplis depuis book / author sur une base existante
+    for table in ('book_fts', 'author_fts'):
+        if table not in existants:
+            op.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_book_titre_tsv')
+        op.execute('DROP INDEX IF EXISTS ix_author_nom_tsv')
+        return
+    if op.get_bind().dialect.name != 'sqlite':
+        return
+    for trigger in TRIGGERS:
+        op.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    op.execute('DROP TABLE IF EXISTS book_fts')
+    op.execute('DROP TABLE IF EXISTS author_fts')
@@ -0,0 +1,103 @@
+"""nom normalisé et index trigrammes des auteurs (GET /authors/suggest)
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00.000000
+
+- author.nom_normalise : "prénom nom" sans accents ni casse, calculé ici
+  pour les auteurs existants. Ajouté avec un DEFAULT '' : un passage à
+  NOT NULL par recopie de la table supprimerait les triggers FTS.
+- author_trigram (trigramme, auteur_id) et author_trigram_stat (nombre
+  d'auteurs par trigramme), sans rowid sur SQLite, remplies depuis
+  nom_normalise. Voir app/trigrammes.py.
+
+Normalisation et découpage en trigrammes recopiés ici (et non importés de
+app.trigrammes, qui dépend des modèles ORM) : rejouer la migration doit
+toujours produire les mêmes données, quelle que soit la version du code.
+"""
+import re
+import unicodedata
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0006'
+down_revision: Union[str, None] = '0005'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+SEPARATEURS = re.compile(r"[^0-9a-z]+")
+
+LOT = 5000
+
+
+def nom_normalise(prenom: str, nom: str) -> str:
+    """Minuscules sans accents, mots séparés par un espace ("Jean-Paul Sartre" -> "jean paul sartre")"""
+    decompose = unicodedata.normalize("NFKD", f"{prenom} {nom}")
+    sans_accents = "".join(c for c in decompose if not unicodedata.combining(c)).casefold()
+    return " ".join(SEPARATEURS.split(sans_accents)).strip()
+
+
+def trigrammes(texte: str) -> set:
+    """Trigrammes à la manière de pg_trgm : chaque mot entouré de deux espaces devant et d'un derrière"""
+    resultat = set()
+    for mot in texte.split():
+        entoure = f"  {mot} "
+        resultat.update(entoure[j:j + 3] for j in range(len(entoure) - 2))
+    return resultat
+
+
+def upgrade() -> None:
+    op.add_column('author', sa.Column('nom_normalise', sa.String(201), nullable=False, server_default=''))
+    op.create_table(
+        'author_trigram',
+        sa.Column('trigramme', sa.String(3), primary_key=True),
+        sa.Column('auteur_id', sa.Integer(), sa.ForeignKey('author.id', ondelete='CASCADE'), primary_key=True),
+        sqlite_with_rowid=False,
+    )
+    op.create_index('ix_author_trigram_auteur_id', 'author_trigram', ['auteur_id'])
+    op.create_table(
+        'author_trigram_stat',
+        sa.Column('trigramme', sa.String(3), primary_key=True),
+        sa.Column('nombre', sa.Integer(), nullable=False),
+        sqlite_with_rowid=False,
+    )
+
+    # Remplissage : il faut lire les auteurs existants, impossible en --sql (base vide supposée)
+    if context.is_offline_mode():
+        return
+    conn = op.get_bind()
+    auteurs = [
+        {"id": id_, "nom_normalise": nom_normalise(prenom, nom)}
+        for id_, prenom, nom in conn.execute(sa.text("SELECT id, prenom, nom FROM author"))
+    ]
+    for debut in range(0, len(auteurs), LOT):
+        conn.execute(
+            sa.text("UPDATE author SET nom_normalise = :nom_normalise WHERE id = :id"),
+            auteurs[debut:debut + LOT],
+        )
+
+    lignes = [
+        {"trigramme": trigramme, "auteur_id": auteur["id"]}
+        for auteur in auteurs for trigramme in trigrammes(auteur["nom_normalise"])
+    ]
+    for debut in range(0, len(lignes), LOT):
+        conn.execute(
+            sa.text("INSERT INTO author_trigram (trigramme, auteur_id) VALUES (:trigramme, :auteur_id)"),
+            lignes[debut:debut + LOT],
+        )
+    op.execute(
+        "INSERT INTO author_trigram_stat (trigramme, nombre) "
+        "SELECT trigramme, count(*) FROM author_trigram GROUP BY trigramme"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('author_trigram_stat')
+    op.drop_index('ix_author_trigram_auteur_id', table_name='author_trigram')
+    op.drop_table('author_trigram')
+    # ALTER TABLE ... DROP COLUMN (SQLite >= 3.35) : la table et ses triggers FTS sont conservés
+    op.drop_column('author', 'nom_normalise')
@@ -0,0 +1,152 @@
+import json
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert, select, tuple_
+from sqlalchemy.orm import Session
+from app import config
+from app.models import Author, Book
+from app.prefixes import titres
+from app.schemas.author import AuteurCreate
+from app.schemas.book import BookCreate
+from app.trigrammes import indexer_auteurs, nom_normalise
+
+# ===============================
+# Imports en masse (POST /authors/bulk, POST /books/bulk)
+# ===============================
+#
+# Chaque lot de BULK_CHUNK_SIZE lignes est vérifié par requêtes ensemblistes
+# (un seul IN (...) par contrainte au lieu de SELECT par ligne), puis inséré
+# en un executemany dans sa propre transaction. Les lignes refusées sont
+# listées dans le rapport avec leur index dans le fichier d'origine.
+
+
+def lire_lignes(corps: bytes, content_type: str):
+    """
+    Décoder un tableau JSON ou un flux NDJSON
+
+    Renvoie (lignes, erreurs) : une ligne NDJSON illisible devient une
+    erreur du rapport, un tableau JSON invalide est refusé en bloc.
+    """
+    try:
+        texte = corps.decode("utf-8")
+    except UnicodeDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"Le corps doit être encodé en UTF-8 (octet {e.start})")
+    if "ndjson" in content_type or "jsonl" in content_type:
+        lignes, erreurs = [], []
+        for index, ligne in enumerate(texte.splitlines()):
+            if not ligne.strip():
+                continue
+            try:
+                lignes.append((index, json.loads(ligne)))
+            except json.JSONDecodeError as e:
+                erreurs.append({"ligne": index, "erreur": f"JSON invalide: {e.msg}"})
+        return lignes, erreurs
+
+    try:
+        donnees = json.loads(texte)
+    except json.JSONDecodeError as e:
+        raise HTTPException(status_code=400, detail=f"JSON invalide: {e.msg}")
+    if not isinstance(donnees, list):
+        raise HTTPException(status_code=400, detail="Le corps doit être un tableau JSON ou du NDJSON")
+    return list(enumerate(donnees)), []
+
+
+def _valider(lignes, schema, erreurs):
+    """Valider chaque ligne avec le schéma de création, en collectant les erreurs"""
+    valides = []
+    for index, donnees in lignes:
+        try:
+            valides.append((index, schema.model_validate(donnees)))
+        except ValidationError as e:
+            message = "; ".join(
+                f"{'.'.join(str(p) for p in err['loc'])}: {err['msg']}" for err in e.errors()
+            )
+            erreurs.append({"ligne": index, "erreur": message})
+    return valides
+
+
+def _par_lots(valides):
+    taille = config.BULK_CHUNK_SIZE
+    for debut in range(0, len(valides), taille):
+        yield valides[debut:debut + taille]
+
+
+def _rapport(nombre, inseres, erreurs):
+    return {
+        "total": nombre,
+        "inseres": inseres,
+        "rejetes": len(erreurs),
+        "erreurs": sorted(erreurs, key=lambda e: e["ligne"]),
+    }
+
+
+def importer_livres(db: Session, lignes, erreurs):
+    """Importer des livres lot par lot ; renvoie le rapport d'import"""
+    nombre = len(lignes) + len(erreurs)
+    inseres = 0
+
+    for lot in _par_lots(_valider(lignes, BookCreate, erreurs)):
+        auteurs = set(db.scalars(
+            select(Author.id).where(Author.id.in_({livre.auteur_id for _, livre in lot}))
+        ))
+        isbns_pris = set(db.scalars(
+            select(Book.isbn).where(Book.isbn.in_({livre.isbn for _, livre in lot}))
+        ))
+
+        a_inserer = []
+        for index, livre in lot:
+            if livre.auteur_id not in auteurs:
+                erreurs.append({"ligne": index, "erreur": f"Auteur avec l'ID {livre.auteur_id} non trouvé"})
+            elif livre.isbn in isbns_pris:
+                erreurs.append({"ligne": index, "erreur": "Un livre avec cet ISBN existe déjà"})
+            elif livre.nombre_exemplaires_disponibles > livre.nombre_exemplaires_total:
+                erreurs.append({
+                    "ligne": index,
+                    "erreur": "Le nombre d'exemplaires disponibles ne peut pas dépasser le total"
+                })
+            else:
+                # Les doublons à l'intérieur du fichier sont refusés aussi
+                isbns_pris.add(livre.isbn)
+                a_inserer.append(livre.model_dump())
+
+        # RETURNING : les ids des livres insérés, pour l'index des titres
+        livres = db.execute(insert(Book).returning(Book.id, Book.titre), a_inserer).all() if a_inserer else []
+        db.commit()
+        titres.ajouter_lot(livres)
+        inseres += len(a_inserer)
+
+    return _rapport(nombre, inseres, erreurs)
+
+
+def importer_auteurs(db: Session, lignes, erreurs):
+    """Importer des auteurs lot par lot ; renvoie le rapport d'import"""
+    nombre = len(lignes) + len(erreurs)
+    inseres = 0
+
+    for lot in _par_lots(_valider(lignes, AuteurCreate, erreurs)):
+        noms = {(auteur.prenom, auteur.nom) for _, auteur in lot}
+        noms_pris = set(db.execute(
+            select(Author.prenom, Author.nom).where(tuple_(Author.prenom, Author.nom).in_(noms))
+        ).tuples())
+
+        a_inserer = []
+        for index, auteur in lot:
+            cle = (auteur.prenom, auteur.nom)
+            if cle in noms_pris:
+                erreurs.append({"ligne": index, "erreur": "Un auteur avec ce prénom et ce nom existe déjà"})
+            elif auteur.nationalite is None or auteur.date_naissance is None:
+                # Facultatifs dans le schéma mais NOT NULL en base
+                erreurs.append({"ligne": index, "erreur": "nationalite et date_naissance sont obligatoires"})
+            else:
+                noms_pris.add(cle)
+                a_inserer.append({**auteur.model_dump(), "nom_normalise": nom_normalise(*cle)})
+
+        if a_inserer:
+            # RETURNING : les ids des auteurs insérés, pour leurs trigrammes
+            indexer_auteurs(db, db.execute(
+                insert(Author).returning(Author.id, Author.nom_normalise), a_inserer
+            ).all(), nouveaux=True)
+        db.commit()
+        inseres += len(a_inserer)
+
+    return _rapport(nombre, inseres, erreurs)
@@ -0,0 +1,322 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from fastapi import Response
+from app import config
+
+# ===============================
+# Cache des réponses de détail (GET /books/{id}, GET /authors/{id})
+# ===============================
+#
+# Lecture à travers le cache : la réponse JSON déjà sérialisée est stockée
+# par id, un succès ne touche ni SQLite ni Pydantic. Les handlers d'écriture
+# des trois routers invalident précisément les clés concernées, après le
+# commit.
+#
+# Une lecture qui a chargé sa ligne avant ce commit peut finir après
+# l'invalidation : sa mise en cache remettrait l'ancienne version jusqu'au
+# TTL. Chaque clé porte donc une génération, incrémentée par invalider() :
+# le handler la relève avant de lire la base (generation()) et la passe à
+# ecrire(), qui abandonne la mise en cache si elle a changé entre-temps.
+# Avec une réplique en lecture, une lecture commencée juste après
+# l'invalidation peut encore voir l'ancienne ligne : pendant
+# CACHE_REPLICA_LAG_S après une invalidation, la génération relevée ne
+# permet aucune mise en cache.
+#
+# Clés :
+#   livre:{id}   détail d'un livre
+#   auteur:{id}  détail d'un auteur, qui contient aussi ses livres
+#
+# Une entrée est la ligne JSON des en-têtes (ETag...) suivie du corps :
+# les réponses servies depuis le cache gardent leurs validateurs.
+
+# Génération relevée pendant le délai de réplication : ne correspond jamais
+EN_QUARANTAINE = -1
+
+
+class MemoireLRU:
+    """Backend en mémoire du processus : LRU borné en nombre d'entrées, avec TTL"""
+
+    nom = "memoire"
+
+    def __init__(self, max_entrees: int = 1024, ttl: float = 60.0, quarantaine: float = 0.0):
+        self.max_entrees = max_entrees
+        self.ttl = ttl
+        self.quarantaine = quarantaine
+        self.evictions = 0
+        self._entrees = OrderedDict()
+        # Invalidations récentes : clé -> (génération, fin de quarantaine), bornées
+        # comme les entrées. Une clé oubliée prend la génération plancher, au moins
+        # égale à la sienne : une lecture en cours ne peut plus écrire (prudent).
+        self._generations = OrderedDict()
+        self._compteur = 0
+        self._plancher = 0
+        self._verrou = threading.Lock()
+
+    def _generation(self, cle: str, maintenant: float) -> int:
+        generation, fin = self._generations.get(cle, (self._plancher, 0.0))
+        return EN_QUARANTAINE if fin > maintenant else generation
+
+    def generations(self, cles) -> list:
+        maintenant = time.monotonic()
+        with self._verrou:
+            return [self._generation(cle, maintenant) for cle in cles]
+
+    def get(self, cle: str) -> Optional[bytes]:
+        with self._verrou:
+            entree = self._entrees.get(cle)
+            if entree is None:
+                return None
+            expire, valeur = entree
+            if expire < time.monotonic():
+                del self._entrees[cle]
+                return None
+            self._entrees.move_to_end(cle)
+            return valeur
+
+    def get_many(self, cles) -> list:
+        return [self.get(cle) for cle in cles]
+
+    def set(self, cle: str, valeur: bytes, generation: int = None) -> bool:
+        """Stocker la valeur ; avec generation, seulement si la clé n'a pas été invalidée depuis"""
+        with self._verrou:
+            # La quarantaine a déjà été appliquée au relevé de la génération
+            if generation is not None and generation != self._generations.get(cle, (self._plancher, 0.0))[0]:
+                return False
+            self._entrees[cle] = (time.monotonic() + self.ttl, valeur)
+            self._entrees.move_to_end(cle)
+            while len(self._entrees) > self.max_entrees:
+                self._entrees.popitem(last=False)
+                self.evictions += 1
+            return True
+
+    def delete(self, *cles: str):
+        fin = time.monotonic() + self.quarantaine if self.quarantaine else 0.0
+        with self._verrou:
+            for cle in cles:
+                self._entrees.pop(cle, None)
+                self._compteur += 1
+                self._generations[cle] = (self._compteur, fin)
+                self._generations.move_to_end(cle)
+            while len(self._generations) > self.max_entrees:
+                _, (generation, _) = self._generations.popitem(last=False)
+                self._plancher = max(self._plancher, generation)
+
+    def clear(self):
+        with self._verrou:
+            self._entrees.clear()
+
+    def __len__(self):
+        return len(self._entrees)
+
+
+class RedisCache:
+    """
+    Backend partagé entre workers : tout serveur compatible Redis (redis, valkey, dragonfly...)
+
+    L'expiration et l'éviction sont laissées au serveur (maxmemory-policy allkeys-lru).
+    Les générations sont des compteurs du serveur (INCR), partagés par les
+    workers, qui expirent avec le TTL des entrées : une génération disparue
+    repart de 0, ce qui ne fait qu'abandonner des mises en cache.
+    """
+
+    nom = "redis"
+
+    def __init__(self, client, ttl: float = 60.0, prefixe: str = "bibliotheque:", quarantaine: float = 0.0):
+        self.client = client
+        self.ttl = ttl
+        self.prefixe = prefixe
+        self.quarantaine = quarantaine
+        # Hors de prefixe : ni comptées par len(), ni effacées par clear()
+        self.prefixe_generation = prefixe.rstrip(":") + "-generation:"
+        self.prefixe_quarantaine = prefixe.rstrip(":") + "-quarantaine:"
+        # Les évictions sont comptées par le serveur (INFO stats)
+        self.evictions = 0
+
+    @classmethod
+    def depuis_url(cls, url: str, ttl: float = 60.0, quarantaine: float = 0.0):
+        # Dépendance optionnelle : importée seulement si ce backend est choisi
+        import redis
+        return cls(redis.Redis.from_url(url), ttl, quarantaine=quarantaine)
+
+    def generations(self, cles) -> list:
+        cles = list(cles)
+        if not cles:
+            return []
+        # Un seul MGET : générations puis marques de quarantaine
+        valeurs = self.client.mget(
+            [self.prefixe_generation + cle for cle in cles] + [self.prefixe_quarantaine + cle for cle in cles]
+        )
+        return [
+            EN_QUARANTAINE if quarantaine is not None else int(generation or 0)
+            for generation, quarantaine in zip(valeurs[:len(cles)], valeurs[len(cles):])
+        ]
+
+    def get(self, cle: str) -> Optional[bytes]:
+        return self.client.get(self.prefixe + cle)
+
+    def get_many(self, cles) -> list:
+        # Un seul aller-retour (MGET) pour toutes les clés
+        return self.client.mget([self.prefixe + cle for cle in cles]) if cles else []
+
+    def set(self, cle: str, valeur: bytes, generation: int = None) -> bool:
+        """Stocker la valeur ; avec generation, seulement si la clé n'a pas été invalidée depuis"""
+        if generation is None:
+            self.client.set(self.prefixe + cle, valeur, px=int(self.ttl * 1000))
+            return True
+        from redis.exceptions import WatchError
+
+        cle_generation = self.prefixe_generation + cle
+        with self.client.pipeline() as pipe:
+            try:
+                # Transaction optimiste : un INCR concurrent de la génération fait échouer EXEC
+                pipe.watch(cle_generation)
+                if int(pipe.get(cle_generation) or 0) != generation:
+                    return False
+                pipe.multi()
+                pipe.set(self.prefixe + cle, valeur, px=int(self.ttl * 1000))
+                pipe.execute()
+                return True
+            except WatchError:
+                return False
+
+    def delete(self, *cles: str):
+        if not cles:
+            return
+        pipe = self.client.pipeline(transaction=False)
+        pipe.delete(*(self.prefixe + cle for cle in cles))
+        for cle in cles:
+            pipe.incr(self.prefixe_generation + cle)
+            pipe.pexpire(self.prefixe_generation + cle, int(self.ttl * 1000))
+            if self.quarantaine:
+                pipe.set(self.prefixe_quarantaine + cle, b"1", px=int(self.quarantaine * 1000))
+        pipe.execute()
+
+    def clear(self):
+        for cle in self.client.scan_iter(match=self.prefixe + "*"):
+            self.client.delete(cle)
+
+    def __len__(self):
+        return sum(1 for _ in self.client.scan_iter(match=self.prefixe + "*"))
+
+
+class CacheReponses:
+    """Façade des handlers : lecture, écriture, invalidation et compteurs"""
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        # Les handlers sync tournent dans le threadpool : += n'est pas atomique
+        self._verrou_compteurs = threading.Lock()
+
+    def _compter(self, hits: int = 0, misses: int = 0, invalidations: int = 0):
+        with self._verrou_compteurs:
+            self.hits += hits
+            self.misses += misses
+            self.invalidations += invalidations
+
+    def lire(self, cle: str) -> Optional[Response]:
+        """Réponse JSON en cache, ou None (compte un succès ou un échec)"""
+        if self.backend is None:
+            return None
+        valeur = self.backend.get(cle)
+        if valeur is None:
+            self._compter(misses=1)
+            return None
+        self._compter(hits=1)
+        entetes, contenu = valeur.split(b"\n", 1)
+        return Response(content=contenu, media_type="application/json", headers=json.loads(entetes))
+
+    def lire_corps(self, cles) -> dict:
+        """Corps JSON en cache de plusieurs clés (lectures par lot) : clé -> corps, absentes omises"""
+        if self.backend is None or not cles:
+            return {}
+        corps, hits = {}, 0
+        for cle, valeur in zip(cles, self.backend.get_many(cles)):
+            if valeur is not None:
+                hits += 1
+                corps[cle] = valeur.split(b"\n", 1)[1]
+        self._compter(hits=hits, misses=len(cles) - hits)
+        return corps
+
+    def generation(self, cle: str) -> Optional[int]:
+        """Génération de la clé, à relever avant de lire la base puis à passer à ecrire()"""
+        return self.generations([cle])[cle] if self.backend is not None else None
+
+    def generations(self, cles) -> dict:
+        """Générations de plusieurs clés (lectures par lot) : clé -> génération"""
+        if self.backend is None or not cles:
+            return {}
+        cles = list(cles)
+        return dict(zip(cles, self.backend.generations(cles)))
+
+    def stocker(self, cle: str, modele, entetes: dict = None, generation: int = None) -> bytes:
+        """
+        Sérialiser le modèle Pydantic une fois, le mettre en cache et renvoyer le corps JSON
+
+        Avec generation (relevée avant la lecture en base), la mise en cache est
+        abandonnée si la clé a été invalidée depuis : le corps reste renvoyé.
+        """
+        # model_dump_json ne produit jamais de saut de ligne brut
+        contenu = modele.model_dump_json().encode()
+        if self.backend is not None:
+            self.backend.set(cle, json.dumps(entetes or {}).encode() + b"\n" + contenu, generation)
+        return contenu
+
+    def ecrire(self, cle: str, modele, entetes: dict = None, generation: int = None) -> Response:
+        """Comme stocker(), en renvoyant la réponse"""
+        contenu = self.stocker(cle, modele, entetes, generation)
+        return Response(content=contenu, media_type="application/json", headers=entetes or {})
+
+    def invalider(self, *cles: str):
+        cles = [cle for cle in cles if cle is not None]
+        if self.backend is None or not cles:
+            return
+        self.backend.delete(*cles)
+        self._compter(invalidations=len(cles))
+
+    def vider(self):
+        if self.backend is not None:
+            self.backend.clear()
+
+    def statistiques(self) -> dict:
+        lectures = self.hits + self.misses
+        return {
+            "backend": self.backend.nom if self.backend is not None else None,
+            "entrees": len(self.backend) if self.backend is not None else 0,
+            "hits": self.hits,
+            "misses": self.misses,
+            "ratio": round(self.hits / lectures, 4) if lectures else None,
+            "evictions": self.backend.evictions if self.backend is not None else 0,
+            "invalidations": self.invalidations,
+        }
+
+
+def cle_livre(livre_id) -> Optional[str]:
+    return f"livre:{livre_id}" if livre_id is not None else None
+
+
+def cle_auteur(auteur_id) -> Optional[str]:
+    return f"auteur:{auteur_id}" if auteur_id is not None else None
+
+
+def creer_backend(nom: str = None):
+    """Backend choisi par CACHE_BACKEND : 'memoire' (défaut), 'redis' ou 'aucun'"""
+    nom = nom or config.CACHE_BACKEND
+    # Sans réplique, les lectures voient le commit dès l'invalidation
+    quarantaine = config.CACHE_REPLICA_LAG_S if config.DATABASE_REPLICA_URL else 0.0
+    if nom == "memoire":
+        return MemoireLRU(config.CACHE_MAX_ENTRIES, config.CACHE_TTL_S, quarantaine)
+    if nom == "redis":
+        return RedisCache.depuis_url(config.CACHE_REDIS_URL, config.CACHE_TTL_S, quarantaine)
+    if nom == "aucun":
+        return None
+    raise ValueError(f"CACHE_BACKEND inconnu : {nom}")
+
+
+# Instance partagée par les routers sync et async
+reponses = CacheReponses(creer_backend())
@@ -0,0 +1,85 @@
+import hashlib
+from datetime import timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from fastapi import Request, Response
+
+# ===============================
+# Requêtes conditionnelles (ETag / Last-Modified / 304)
+# ===============================
+#
+# Les validateurs sont calculés depuis les colonnes version et updated_at
+# des lignes déjà chargées, avant toute construction de modèle Pydantic :
+# une réponse 304 ne coûte que la requête SQL.
+#
+# - détail d'un livre ou d'un emprunt : ETag + Last-Modified
+# - listes, et détail d'un auteur (qui liste ses livres) : ETag seul, calculé
+#   sur les ids et versions de toutes les lignes ; une ligne supprimée ou
+#   sortie de la page ne change pas la date maximale, Last-Modified n'y
+#   serait pas fiable.
+
+# Les réponses peuvent être stockées mais doivent être revalidées à chaque usage
+CACHE_CONTROL = "no-cache"
+
+
+def etag(lignes, *extra, table: str = None) -> str:
+    """
+    ETag fort : empreinte des (table, id, version) des lignes et des valeurs extra
+
+    table: nom de la table pour des lignes lues en colonnes (tuples sans __tablename__)
+    """
+    empreinte = hashlib.blake2b(digest_size=16)
+    for ligne in lignes:
+        empreinte.update(f"{table or ligne.__tablename__}:{ligne.id}:{ligne.version};".encode())
+    for valeur in extra:
+        empreinte.update(repr(valeur).encode())
+    return f'"{empreinte.hexdigest()}"'
+
+
+def validateurs(lignes, *extra, last_modified: bool = True, table: str = None) -> dict:
+    """En-têtes ETag (et Last-Modified, date de la ligne la plus récente) d'une réponse"""
+    lignes = list(lignes)
+    entetes = {"ETag": etag(lignes, *extra, table=table), "Cache-Control": CACHE_CONTROL}
+    if not last_modified:
+        return entetes
+    dates = [ligne.updated_at for ligne in lignes if ligne.updated_at is not None]
+    if dates:
+        entetes["Last-Modified"] = format_datetime(max(dates).replace(tzinfo=timezone.utc), usegmt=True)
+    return entetes
+
+
+def non_modifie(request: Request, entetes) -> bool:
+    """
+    Vrai si la copie du client est à jour (RFC 9110, section 13.2.2)
+
+    If-None-Match est prioritaire ; If-Modified-Since n'est consulté qu'en son absence.
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Comparaison faible pour If-None-Match : W/"x" équivaut à "x"
+        etags = {valeur.strip().removeprefix("W/") for valeur in if_none_match.split(",")}
+        return entetes.get("ETag") in etags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    last_modified = entetes.get("Last-Modified")
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def pas_modifie(entetes) -> Response:
+    """Réponse 304 sans corps, avec les validateurs de la ressource"""
+    return Response(status_code=304, headers={
+        nom: entetes[nom] for nom in ("ETag", "Last-Modified", "Cache-Control") if nom in entetes
+    })
+
+
+def conditionnelle(request: Request, reponse: Response) -> Response:
+    """Réponse déjà construite (cache), ou 304 si le client en a la même version"""
+    if non_modifie(request, reponse.headers):
+        return pas_modifie(reponse.headers)
+    return reponse
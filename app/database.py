@@ -1,11 +1,208 @@
-from sqlalchemy import create_engine
+import os
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
+from app import config
+from app.models import Base
+from app.search import install_fts
 
-# Créer l'engine SQLite
-engine = create_engine(
-    "sqlite:///bibliotheque.db",
-    connect_args={"check_same_thread": False}
-)
+# Pilotes async correspondant aux pilotes sync
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
 
-# Créer la session
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
\ No newline at end of file
+
+def _engine_options(url):
+    """Options de création de l'engine selon le type de base"""
+    url = make_url(url)
+    options = {"pool_pre_ping": config.DB_POOL_PRE_PING}
+
+    if url.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        # Une base en mémoire n'existe que dans sa connexion : pas de pool
+        if url.database in (None, "", ":memory:"):
+            return options
+
+    options.update(
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+    )
+    return options
+
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Réglages SQLite appliqués à l'ouverture de chaque connexion"""
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA journal_mode={config.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={config.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}")
+        # Valeur négative = taille en Kio plutôt qu'en nombre de pages
+        cursor.execute(f"PRAGMA cache_size=-{config.SQLITE_CACHE_SIZE_KB}")
+        # Clés étrangères vérifiées comme sur PostgreSQL (désactivées par défaut dans SQLite)
+        cursor.execute("PRAGMA foreign_keys=ON")
+    finally:
+        cursor.close()
+
+
+def _debut_ecriture(conn):
+    """
+    Transaction d'écriture SQLite : BEGIN IMMEDIATE au lieu du BEGIN implicite
+
+    Avec un BEGIN différé, une transaction qui lit puis écrit (emprunt, retour,
+    import) ne demande le verrou d'écriture qu'à son premier INSERT/UPDATE ; si
+    un autre processus a écrit entre-temps, SQLite répond SQLITE_BUSY sans
+    attendre. Pris d'emblée, le verrou sérialise les écrivains et l'attente est
+    bornée par busy_timeout. Émis sur la connexion DBAPI : pas de requête de
+    plus dans les métriques. Les lectures restent en BEGIN différé (WAL).
+    """
+    if conn.get_execution_options().get("ecriture"):
+        conn.connection.driver_connection.execute("BEGIN IMMEDIATE")
+
+
+def create_db_engine(url=None):
+    """Créer un engine configuré (pool + PRAGMAs SQLite)"""
+    url = url or config.DATABASE_URL
+    db_engine = create_engine(url, **_engine_options(url))
+
+    if db_engine.dialect.name == "sqlite":
+        event.listen(db_engine, "connect", _set_sqlite_pragmas)
+        if config.SQLITE_WRITE_LOCK == "immediate":
+            event.listen(db_engine, "begin", _debut_ecriture)
+
+    return db_engine
+
+
+# Engine partagé par toute l'application. Créé à l'import sans ouvrir de
+# connexion : chaque processus (worker) ouvre les siennes, voir
+# reinitialiser_apres_fork et fermer_engines.
+engine = create_db_engine()
+
+# Même pool, transactions marquées comme écritures (voir _debut_ecriture)
+engine_ecriture = engine.execution_options(ecriture=True)
+
+# Réplique en lecture si DATABASE_REPLICA_URL est renseignée, sinon la base principale
+engine_lecture = create_db_engine(config.DATABASE_REPLICA_URL) if config.DATABASE_REPLICA_URL else engine
+
+# Fabriques de sessions partagées : base principale, écritures, lectures (réplique)
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+SessionEcriture = sessionmaker(autocommit=False, autoflush=False, bind=engine_ecriture)
+SessionLecture = sessionmaker(autocommit=False, autoflush=False, bind=engine_lecture)
+
+# Méthodes HTTP servies par une session de lecture
+METHODES_LECTURE = frozenset({"GET", "HEAD", "OPTIONS"})
+
+
+def creer_schema(db_engine=None):
+    """
+    Créer les tables manquantes et les index FTS5 (idempotent)
+
+    Jamais à l'import : une fois par déploiement (`alembic upgrade head`),
+    ou au démarrage avec DB_CREATE_SCHEMA=1, et par les tests.
+    """
+    db_engine = db_engine or engine
+    Base.metadata.create_all(bind=db_engine)
+    install_fts(db_engine)
+
+
+def get_db(request: Request):
+    """
+    Dépendance FastAPI : une session par requête
+
+    GET/HEAD/OPTIONS sont servis par la réplique en lecture (ou la base
+    principale sans réplique), les autres méthodes par une session d'écriture
+    sur la base principale.
+    """
+    db = SessionLecture() if request.method in METHODES_LECTURE else SessionEcriture()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+def get_db_lecture():
+    """Dépendance FastAPI : session de lecture, pour les POST qui ne font que lire (/batch-get)"""
+    db = SessionLecture()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# ===============================
+# Cycle de vie par processus (plusieurs workers)
+# ===============================
+
+
+def reinitialiser_apres_fork():
+    """
+    Processus enfant : abandonner les connexions héritées du parent
+
+    Une connexion SQLite (ou un socket PostgreSQL) ne se partage pas entre
+    processus : l'enfant repart d'un pool vide, sans fermer les connexions
+    que le parent continue d'utiliser (close=False).
+    """
+    engine.dispose(close=False)
+    if engine_lecture is not engine:
+        engine_lecture.dispose(close=False)
+    if _async_engine is not None:
+        _async_engine.sync_engine.dispose(close=False)
+
+
+if hasattr(os, "register_at_fork"):
+    # gunicorn --preload, multiprocessing en mode fork...
+    os.register_at_fork(after_in_child=reinitialiser_apres_fork)
+
+
+async def fermer_engines():
+    """Arrêt du worker (lifespan) : fermer les connexions de ses pools"""
+    engine.dispose()
+    if engine_lecture is not engine:
+        engine_lecture.dispose()
+    if _async_engine is not None:
+        await _async_engine.dispose()
+
+
+# ===============================
+# Mode async (DB_MODE=async)
+# ===============================
+
+_async_engine = None
+_AsyncSessionLocal = None
+
+
+def async_url(url=None):
+    """Convertir une URL sync en URL utilisant le pilote async"""
+    url = make_url(url or config.DATABASE_URL)
+    return url.set(drivername=ASYNC_DRIVERS.get(url.get_backend_name(), url.drivername))
+
+
+def get_async_engine():
+    """
+    Engine async créé à la demande (aiosqlite n'est requis qu'en mode async)
+
+    Il ne sert que les lectures : il se connecte à la réplique si elle existe.
+    """
+    global _async_engine, _AsyncSessionLocal
+    if _async_engine is None:
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        url = async_url(config.DATABASE_REPLICA_URL or None)
+        _async_engine = create_async_engine(url, **_engine_options(url))
+        if _async_engine.dialect.name == "sqlite":
+            event.listen(_async_engine.sync_engine, "connect", _set_sqlite_pragmas)
+        _AsyncSessionLocal = async_sessionmaker(
+            _async_engine, autoflush=False, expire_on_commit=False
+        )
+    return _async_engine
+
+
+async def get_async_db():
+    """Dépendance FastAPI : une AsyncSession par requête"""
+    get_async_engine()
+    async with _AsyncSessionLocal() as db:
+        yield db
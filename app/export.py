@@ -0,0 +1,72 @@
+import csv
+import io
+import json
+from datetime import date, datetime
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from app import config
+from app.database import engine_lecture
+
+# ===============================
+# Exports en streaming (NDJSON / CSV)
+# ===============================
+#
+# Les lignes sont lues par lots (yield_per) sur une connexion dédiée et
+# écrites au fil de l'eau : ni objets ORM ni modèles Pydantic, la mémoire
+# reste constante et le premier octet part dès le premier lot.
+
+FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+
+def _valeur(v):
+    if isinstance(v, (date, datetime)):
+        return v.isoformat()
+    return v
+
+
+def _lots(stmt):
+    """Lots de lignes (mappings) lus côté serveur, sur la réplique en lecture s'il y en a une"""
+    with engine_lecture.connect() as conn:
+        result = conn.execution_options(yield_per=config.EXPORT_BATCH_SIZE).execute(stmt)
+        for lot in result.mappings().partitions():
+            yield lot
+
+
+def _ndjson(stmt):
+    for lot in _lots(stmt):
+        yield "".join(
+            json.dumps({k: _valeur(v) for k, v in ligne.items()}, ensure_ascii=False) + "\n"
+            for ligne in lot
+        )
+
+
+def _csv(stmt):
+    tampon = io.StringIO()
+    writer = csv.writer(tampon)
+    writer.writerow([colonne.name for colonne in stmt.selected_columns])
+    for lot in _lots(stmt):
+        writer.writerows([_valeur(v) for v in ligne.values()] for ligne in lot)
+        yield tampon.getvalue()
+        tampon.seek(0)
+        tampon.truncate()
+    # En-tête seul si la table est vide
+    if tampon.tell():
+        yield tampon.getvalue()
+
+
+def exporter(stmt, format: str, nom: str) -> StreamingResponse:
+    """Réponse streaming d'un select() Core au format 'ndjson' ou 'csv'"""
+    if format not in FORMATS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Format inconnu: {format}. Valides: {', '.join(FORMATS)}"
+        )
+    lignes = _ndjson(stmt) if format == "ndjson" else _csv(stmt)
+    return StreamingResponse(
+        lignes,
+        media_type=FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="{nom}.{format}"'},
+    )
@@ -0,0 +1,115 @@
+import json
+from fastapi import HTTPException, Response
+from sqlalchemy import select
+from app import config
+from app.cache import reponses
+
+# ===============================
+# Lectures par lot (GET ?ids=..., POST /batch-get)
+# ===============================
+#
+# Les ids sont résolus par des requêtes IN (...) de TAILLE_MORCEAU ids au
+# plus : une seule requête jusqu'à ce nombre, et toujours sous la limite de
+# variables liées de SQLite (999 avant la version 3.32). Les doublons sont
+# ignorés, l'ordre des ids demandés est conservé et les ids introuvables
+# sont listés dans "manquants".
+#
+# Pour les livres et les auteurs, le lot passe par le cache des réponses de
+# détail : les corps déjà en cache sont recopiés tels quels, seuls les ids
+# absents sont lus en base, puis mis en cache pour les lectures suivantes
+# (si leur clé n'a pas été invalidée pendant la lecture, voir app/cache.py).
+
+TAILLE_MORCEAU = 900
+
+
+def lire_ids(texte: str) -> list:
+    """'3,1,2' -> [3, 1, 2] ; 422 si un id n'est pas un entier ou s'il y en a trop"""
+    try:
+        ids = [int(partie) for partie in texte.split(",") if partie.strip()]
+    except ValueError:
+        raise HTTPException(status_code=422, detail="ids : liste d'entiers séparés par des virgules attendue")
+    if len(ids) > config.BATCH_GET_MAX_IDS:
+        raise HTTPException(
+            status_code=422, detail=f"ids : {config.BATCH_GET_MAX_IDS} ids au maximum par appel"
+        )
+    return ids
+
+
+def ids_uniques(ids) -> list:
+    """Ids sans doublons, dans l'ordre de leur première occurrence"""
+    return list(dict.fromkeys(ids))
+
+
+def morceaux(ids):
+    for debut in range(0, len(ids), TAILLE_MORCEAU):
+        yield ids[debut:debut + TAILLE_MORCEAU]
+
+
+def requetes_par_ids(modele, ids, *options):
+    """Une requête select(modele) ... WHERE id IN (...) par morceau d'ids"""
+    for morceau in morceaux(ids):
+        yield select(modele).options(*options).where(modele.id.in_(morceau))
+
+
+def charger(db, modele, ids, *options) -> list:
+    """Lignes trouvées parmi les ids (ordre quelconque)"""
+    lignes = []
+    for stmt in requetes_par_ids(modele, ids, *options):
+        # unique() : nécessaire avec un joinedload de collection
+        lignes.extend(db.scalars(stmt).unique())
+    return lignes
+
+
+async def charger_async(db, modele, ids, *options) -> list:
+    lignes = []
+    for stmt in requetes_par_ids(modele, ids, *options):
+        lignes.extend((await db.scalars(stmt)).unique())
+    return lignes
+
+
+def corps_en_cache(ids, cle) -> dict:
+    """id -> corps JSON déjà en cache"""
+    cles = {cle(id_): id_ for id_ in ids}
+    return {cles[c]: corps for c, corps in reponses.lire_corps(list(cles)).items()}
+
+
+def generations_en_cache(ids, cle) -> dict:
+    """id -> génération de sa clé, relevée avant de lire les ids absents du cache"""
+    cles = {cle(id_): id_ for id_ in ids}
+    return {cles[c]: generation for c, generation in reponses.generations(list(cles)).items()}
+
+
+def serialiser(corps: dict, lignes, schema, cle=None, entetes=None, generations: dict = None) -> dict:
+    """
+    Compléter corps (id -> JSON) avec les lignes lues en base
+
+    Avec cle, chaque ligne est aussi mise en cache, avec les en-têtes
+    entetes(ligne) de sa réponse de détail, si sa génération (id -> génération
+    relevée avant la lecture) n'a pas changé.
+    """
+    generations = generations or {}
+    for ligne in lignes:
+        modele = schema.model_validate(ligne)
+        if cle is None:
+            corps[ligne.id] = modele.model_dump_json().encode()
+        else:
+            corps[ligne.id] = reponses.stocker(cle(ligne.id), modele, entetes(ligne), generations.get(ligne.id))
+    return corps
+
+
+def reponse_lot(nom: str, ids, corps: dict) -> Response:
+    """
+    {nom: [...], "manquants": [...]} assemblé à partir des corps JSON de chaque ligne
+
+    Les corps (en cache ou tout juste sérialisés) sont concaténés sans être relus.
+    """
+    trouves = [corps[id_] for id_ in ids if id_ in corps]
+    manquants = [id_ for id_ in ids if id_ not in corps]
+    contenu = b"".join((
+        f'{{"{nom}":['.encode(),
+        b",".join(trouves),
+        b'],"manquants":',
+        json.dumps(manquants).encode(),
+        b"}",
+    ))
+    return Response(content=contenu, media_type="application/json")
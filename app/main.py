@@ -1,16 +1,58 @@
-from fastapi import FastAPI
-from app.database import engine
-from app.models import Base
+import asyncio
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import ORJSONResponse, PlainTextResponse
+from app import config
+from app.cache import reponses
+from app.database import creer_schema, engine, engine_ecriture, fermer_engines
+from app.metriques import MiddlewareMetriques, instrumenter_routes, metriques
+from app.prefixes import boucle_titres
+from app.profilage import profils
+from app.retards import boucle_retards
 from app.routers import authors, book, loans  
 
-Base.metadata.create_all(bind=engine)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Schéma créé au démarrage seulement sur demande (voir config.DB_CREATE_SCHEMA)
+    if config.DB_CREATE_SCHEMA:
+        creer_schema(engine)
+    # Index des titres de GET /books/suggest, construit en tâche de fond sur la base
+    # principale (pas de retard de réplique) : le worker sert dès son démarrage
+    taches = [asyncio.create_task(boucle_titres(engine, config.BOOK_SUGGEST_REBUILD_S))]
+    # Passage périodique des emprunts échus au statut 'En retard', en transactions d'écriture
+    # (BEGIN IMMEDIATE sous SQLite, comme les requêtes d'écriture)
+    if config.OVERDUE_SWEEP_INTERVAL_S > 0:
+        taches.append(asyncio.create_task(boucle_retards(engine_ecriture, config.OVERDUE_SWEEP_INTERVAL_S)))
+    yield
+    for tache in taches:
+        tache.cancel()
+    # Chaque worker ferme ses propres connexions
+    await fermer_engines()
+
 
 app = FastAPI(
     title="API Bibliothèque",
     description="Système de gestion de bibliothèque",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson : encodage JSON plus rapide que json de la bibliothèque standard
+    default_response_class=ORJSONResponse,
 )
 
+if config.METRICS_ENABLED:
+    app.add_middleware(MiddlewareMetriques)
+
+# En mode async, les lectures sont enregistrées en premier : FastAPI retient
+# la première route qui correspond, les écritures tombent sur les routers sync.
+# Leurs routes /{id:int} laissent passer les chemins fixes (/export...) aux routers sync.
+if config.DB_MODE == "async":
+    from app.routers import authors_async, book_async, loans_async
+    app.include_router(authors_async.router)
+    app.include_router(book_async.router)
+    app.include_router(loans_async.router)
+
 app.include_router(authors.router) 
 app.include_router(book.router)     
 app.include_router(loans.router)  
@@ -22,4 +64,29 @@ def root():
         "documentation": {
             "swagger_ui": "http://127.0.0.1:8000/docs",
         },
-    }
\ No newline at end of file
+    }
+
+@app.get("/cache/stats")
+def cache_stats():
+    """Compteurs du cache des réponses de détail (hits, misses, évictions, invalidations)"""
+    return reponses.statistiques()
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def metrics():
+    """Métriques HTTP et SQL au format texte Prometheus"""
+    return PlainTextResponse(metriques.exposition(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+@app.get("/debug/profiles/{profil_id}", include_in_schema=False)
+def debug_profile(profil_id: str):
+    """Profil d'une requête envoyée avec l'en-tête X-Debug-Profile (DEBUG_PROFILE_ENABLED=1)"""
+    profil = profils.lire(profil_id) if config.DEBUG_PROFILE_ENABLED else None
+    if profil is None:
+        raise HTTPException(status_code=404, detail="Profil introuvable")
+    return profil
+
+
+# Après toutes les routes : enveloppe leurs endpoints pour le profil Python
+if config.METRICS_ENABLED:
+    instrumenter_routes(app)
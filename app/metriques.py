@@ -0,0 +1,354 @@
+import asyncio
+import bisect
+import cProfile
+import functools
+import threading
+import time
+from contextvars import ContextVar
+from typing import Optional
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from app import config, profilage
+
+# ===============================
+# Métriques HTTP et SQL (GET /metrics, en-tête Server-Timing)
+# ===============================
+#
+# Le middleware est un middleware ASGI pur (pas BaseHTTPMiddleware, qui
+# recopie chaque réponse dans un flux intermédiaire) : par requête, quelques
+# appels à perf_counter et une mise à jour d'histogramme sous verrou.
+#
+# Les requêtes SQL sont rattachées à la requête HTTP en cours par une
+# ContextVar : le contexte est copié dans le threadpool des handlers sync et
+# partagé par les handlers async, les écouteurs before/after_cursor_execute
+# (posés sur la classe Engine, donc sur tous les engines sync et async)
+# n'ont qu'à incrémenter la mesure courante. Hors requête (tâche des
+# retards, CLI), rien n'est compté.
+#
+# Les routes sont étiquetées par leur gabarit (/books/{livre_id}) et non par
+# le chemin : le nombre de séries reste borné. Les chemins sans route
+# (404) partagent l'étiquette "aucune".
+#
+# Les mêmes écouteurs alimentent le journal des requêtes lentes et le
+# profil X-Debug-Profile (app/profilage.py).
+
+# Bornes des histogrammes (secondes, octets)
+BORNES_DUREE = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BORNES_TAILLE = (100, 1_000, 10_000, 100_000, 1_000_000, 10_000_000)
+
+ROUTE_INCONNUE = "aucune"
+
+
+class Histogramme:
+    """Histogramme cumulatif à bornes fixes (format Prometheus)"""
+
+    def __init__(self, bornes):
+        self.bornes = bornes
+        self.compteurs = [0] * (len(bornes) + 1)
+        self.somme = 0.0
+        self.nombre = 0
+
+    def observer(self, valeur: float):
+        self.compteurs[bisect.bisect_left(self.bornes, valeur)] += 1
+        self.somme += valeur
+        self.nombre += 1
+
+    def cumuls(self):
+        """(borne, nombre d'observations <= borne), +Inf compris"""
+        total = 0
+        for borne, compteur in zip((*self.bornes, float("inf")), self.compteurs):
+            total += compteur
+            yield borne, total
+
+
+class MesureRequete:
+    """
+    Activité SQL d'une requête HTTP
+
+    instructions (liste de (sql, paramètres, durée)) et profil (cProfile)
+    ne sont renseignés que pour une requête profilée (X-Debug-Profile).
+    """
+
+    __slots__ = ("scope", "requetes", "duree_db", "instructions", "profil")
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.requetes = 0
+        self.duree_db = 0.0
+        self.instructions = None
+        self.profil = None
+
+    def endpoint(self) -> str:
+        """'GET /books/{livre_id}' : méthode et gabarit de route de la requête"""
+        if self.scope is None:
+            return "hors requête HTTP"
+        return f"{self.scope['method']} {route_de(self.scope)}"
+
+
+# Mesure de la requête HTTP en cours (None hors requête)
+mesure_courante: ContextVar[Optional[MesureRequete]] = ContextVar("mesure_courante", default=None)
+
+
+class Metriques:
+    """Registre des séries exposées sur /metrics"""
+
+    def __init__(self):
+        self._verrou = threading.Lock()
+        self.en_cours = 0
+        self.durees = {}
+        self.tailles = {}
+        self.requetes_sql = {}
+        self.durees_sql = {}
+
+    def debut(self):
+        with self._verrou:
+            self.en_cours += 1
+
+    def fin(self, methode: str, route: str, statut: int, duree: float, taille: int, mesure: MesureRequete):
+        etiquettes = (methode, route, str(statut))
+        with self._verrou:
+            self.en_cours -= 1
+            if etiquettes not in self.durees:
+                self.durees[etiquettes] = Histogramme(BORNES_DUREE)
+                self.tailles[etiquettes] = Histogramme(BORNES_TAILLE)
+            self.durees[etiquettes].observer(duree)
+            self.tailles[etiquettes].observer(taille)
+            route_sql = (methode, route)
+            self.requetes_sql[route_sql] = self.requetes_sql.get(route_sql, 0) + mesure.requetes
+            self.durees_sql[route_sql] = self.durees_sql.get(route_sql, 0.0) + mesure.duree_db
+
+    def vider(self):
+        with self._verrou:
+            self.durees.clear()
+            self.tailles.clear()
+            self.requetes_sql.clear()
+            self.durees_sql.clear()
+
+    def exposition(self) -> str:
+        """Séries au format texte d'exposition Prometheus (version 0.0.4)"""
+        lignes = []
+        with self._verrou:
+            lignes += [
+                "# HELP http_requests_in_flight Requêtes HTTP en cours de traitement",
+                "# TYPE http_requests_in_flight gauge",
+                f"http_requests_in_flight {self.en_cours}",
+            ]
+            _histogrammes(lignes, "http_request_duration_seconds", "Durée des requêtes HTTP", self.durees)
+            _histogrammes(lignes, "http_response_size_bytes", "Taille des corps de réponse", self.tailles)
+            _compteurs(lignes, "db_queries_total", "Requêtes SQL par route", self.requetes_sql)
+            _compteurs(lignes, "db_query_duration_seconds_total", "Temps SQL cumulé par route", self.durees_sql)
+        return "\n".join(lignes) + "\n"
+
+
+def _echapper(valeur: str) -> str:
+    return valeur.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquettes(noms, valeurs, **extra) -> str:
+    paires = [*zip(noms, valeurs), *extra.items()]
+    return "{" + ",".join(f'{nom}="{_echapper(valeur)}"' for nom, valeur in paires) + "}"
+
+
+def _histogrammes(lignes, nom, aide, series):
+    lignes += [f"# HELP {nom} {aide}", f"# TYPE {nom} histogram"]
+    noms = ("method", "route", "status")
+    for valeurs, histogramme in sorted(series.items()):
+        for borne, cumul in histogramme.cumuls():
+            le = "+Inf" if borne == float("inf") else repr(borne)
+            lignes.append(f"{nom}_bucket{_etiquettes(noms, valeurs, le=le)} {cumul}")
+        lignes.append(f"{nom}_sum{_etiquettes(noms, valeurs)} {histogramme.somme!r}")
+        lignes.append(f"{nom}_count{_etiquettes(noms, valeurs)} {histogramme.nombre}")
+
+
+def _compteurs(lignes, nom, aide, series):
+    lignes += [f"# HELP {nom} {aide}", f"# TYPE {nom} counter"]
+    for valeurs, total in sorted(series.items()):
+        lignes.append(f"{nom}{_etiquettes(('method', 'route'), valeurs)} {total!r}")
+
+
+# Registre partagé par le middleware et GET /metrics
+metriques = Metriques()
+
+
+def route_de(scope) -> str:
+    """Gabarit de la route, posé dans le scope par le routeur FastAPI"""
+    return getattr(scope.get("route"), "path", ROUTE_INCONNUE)
+
+
+# ===============================
+# Écouteurs SQL
+# ===============================
+
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _avant_requete(conn, cursor, statement, parameters, context, executemany):
+    # Chronométrée aussi hors requête HTTP, pour le journal des requêtes lentes
+    conn.info.setdefault("debuts_requetes", []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _apres_requete(conn, cursor, statement, parameters, context, executemany):
+    debuts = conn.info.get("debuts_requetes")
+    if not debuts:
+        return
+    duree = time.perf_counter() - debuts.pop()
+    mesure = mesure_courante.get()
+
+    if config.SLOW_QUERY_MS > 0 and duree * 1000 >= config.SLOW_QUERY_MS:
+        endpoint = mesure.endpoint() if mesure is not None else "hors requête HTTP"
+        profilage.journal_lentes.signaler(conn, statement, parameters, duree, endpoint)
+    if mesure is None:
+        return
+    mesure.requetes += 1
+    mesure.duree_db += duree
+    if mesure.instructions is not None:
+        mesure.instructions.append((statement, parameters, duree))
+
+
+@event.listens_for(Engine, "handle_error")
+def _erreur_requete(contexte):
+    # after_cursor_execute n'est pas appelé pour une requête en erreur
+    debuts = contexte.connection.info.get("debuts_requetes") if contexte.connection is not None else None
+    if debuts:
+        debuts.pop()
+
+
+# ===============================
+# Middleware
+# ===============================
+
+
+def server_timing(duree: float, mesure: MesureRequete) -> str:
+    """En-tête Server-Timing : temps SQL (et nombre de requêtes) puis temps total, en ms"""
+    return (
+        f'db;dur={mesure.duree_db * 1000:.2f};desc="{mesure.requetes} requetes SQL", '
+        f"app;dur={duree * 1000:.2f}"
+    )
+
+
+class MiddlewareMetriques:
+    """
+    Middleware ASGI : latence, taille de réponse et activité SQL par route
+
+    Server-Timing est ajouté au début de la réponse : pour une réponse en
+    streaming (exports), il ne couvre que la partie faite avant le premier
+    octet ; l'histogramme, lui, couvre toute la requête.
+    """
+
+    def __init__(self, app, registre: Metriques = None):
+        self.app = app
+        self.registre = registre or metriques
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        mesure = MesureRequete(scope)
+        profil_id = None
+        options = profilage.options_profil(_entete(scope, profilage.ENTETE))
+        if options:
+            profil_id = profilage.profils.nouvel_id()
+            mesure.instructions = []
+            if "python" in options:
+                mesure.profil = cProfile.Profile()
+
+        jeton = mesure_courante.set(mesure)
+        debut = time.perf_counter()
+        statut = 500
+        taille = 0
+
+        async def envoyer(message):
+            nonlocal statut, taille
+            if message["type"] == "http.response.start":
+                statut = message["status"]
+                entetes = [
+                    *message.get("headers", []),
+                    (b"server-timing", server_timing(time.perf_counter() - debut, mesure).encode("latin-1")),
+                ]
+                if profil_id is not None:
+                    entetes.append((b"x-debug-profile-id", profil_id.encode()))
+                message["headers"] = entetes
+            elif message["type"] == "http.response.body":
+                taille += len(message.get("body", b""))
+            await send(message)
+
+        self.registre.debut()
+        try:
+            await self.app(scope, receive, envoyer)
+        finally:
+            mesure_courante.reset(jeton)
+            duree = time.perf_counter() - debut
+            self.registre.fin(scope["method"], route_de(scope), statut, duree, taille, mesure)
+            if profil_id is not None:
+                profilage.profils.enregistrer(profil_id, _profil(scope, statut, duree, mesure))
+
+
+def _entete(scope, nom: str) -> Optional[str]:
+    nom = nom.encode()
+    for cle, valeur in scope.get("headers", ()):
+        if cle == nom:
+            return valeur.decode("latin-1")
+    return None
+
+
+def _profil(scope, statut: int, duree: float, mesure: MesureRequete) -> dict:
+    """Profil d'une requête, tel que servi par GET /debug/profiles/{id}"""
+    return {
+        "endpoint": mesure.endpoint(),
+        "chemin": scope["path"],
+        "statut": statut,
+        "duree_ms": round(duree * 1000, 3),
+        "duree_sql_ms": round(mesure.duree_db * 1000, 3),
+        "requetes": [
+            {
+                "sql": statement,
+                "parametres": repr(parameters)[:profilage.LONGUEUR_PARAMETRES],
+                "duree_ms": round(duree_sql * 1000, 3),
+            }
+            for statement, parameters, duree_sql in mesure.instructions
+        ],
+        "python": profilage.rapport_python(mesure.profil) if mesure.profil is not None else None,
+    }
+
+
+# ===============================
+# Profil Python des handlers
+# ===============================
+#
+# cProfile ne suit que le thread qui l'active : pour un handler sync, il
+# faut l'activer dans le thread du threadpool. L'appel de chaque endpoint
+# est donc enveloppé (une lecture de ContextVar quand aucun profil n'est
+# demandé). Pour un handler async, le profil couvre aussi ce que la boucle
+# d'événements exécute pendant ses await.
+
+
+def _profiler(appel):
+    if asyncio.iscoroutinefunction(appel):
+        @functools.wraps(appel)
+        async def enveloppe_async(*args, **kwargs):
+            mesure = mesure_courante.get()
+            if mesure is None or mesure.profil is None:
+                return await appel(*args, **kwargs)
+            mesure.profil.enable()
+            try:
+                return await appel(*args, **kwargs)
+            finally:
+                mesure.profil.disable()
+        return enveloppe_async
+
+    @functools.wraps(appel)
+    def enveloppe(*args, **kwargs):
+        mesure = mesure_courante.get()
+        if mesure is None or mesure.profil is None:
+            return appel(*args, **kwargs)
+        return mesure.profil.runcall(appel, *args, **kwargs)
+    return enveloppe
+
+
+def instrumenter_routes(app):
+    """Envelopper l'appel des endpoints pour le profil Python (à faire après include_router)"""
+    for route in app.routes:
+        if isinstance(route, APIRoute):
+            route.dependant.call = _profiler(route.dependant.call)
@@ -1,12 +1,24 @@
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Text, ForeignKey, DateTime, Date, Enum, CheckConstraint, UniqueConstraint, create_engine
-from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship, sessionmaker, declarative_base
+from sqlalchemy import literal_column, Column, Integer, Float, String, Text, ForeignKey, DateTime, Date, Enum, CheckConstraint, UniqueConstraint, Index
+from sqlalchemy.orm import relationship, declarative_base
 import enum
 
 Base = declarative_base()
 
 
+class Versionne:
+    """
+    Colonnes de version des lignes, support des ETag / Last-Modified
+
+    version est incrémentée par chaque UPDATE, ORM ou Core (onupdate est
+    appliqué aussi aux update() des mouvements de stock), updated_at suit
+    la dernière modification.
+    """
+    version = Column(Integer, nullable=False, default=1, server_default="1",
+                     onupdate=literal_column("version") + 1)
+    updated_at = Column(DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class CategorieEnum(str, enum.Enum):
     """Énumération des catégories littéraires"""
     FICTION = "Fiction"
@@ -22,15 +34,17 @@ class StatutEmpruntEnum(str, enum.Enum):
     EN_RETARD = "En retard"
 
 
-class Author(Base):
+class Author(Versionne, Base):
     """Modèle Auteur"""
     __tablename__ = "author"
 
     id = Column(Integer, primary_key=True, index=True)
     prenom = Column(String(100), nullable=False)
-    nom = Column(String(100), nullable=False)
+    nom = Column(String(100), nullable=False, index=True)
     date_naissance = Column(Date, nullable=False)
     nationalite = Column(String(2), nullable=False)  # Code ISO
+    # "prénom nom" sans accents ni casse, écrit avec l'auteur (app/trigrammes.py)
+    nom_normalise = Column(String(201), nullable=False, server_default="")
     
     # Relationships
     livres = relationship("Book", back_populates="auteur")
@@ -38,10 +52,35 @@ class Author(Base):
     # Contraintes
     __table_args__ = (
         UniqueConstraint('prenom', 'nom', name='uq_author_full_name'),
+        # Index des chemins de /authors/search (filtre nationalite, tri nom ou date_naissance)
+        Index('ix_author_nationalite_nom', 'nationalite', 'nom'),
+        Index('ix_author_nationalite_date_naissance', 'nationalite', 'date_naissance'),
+        Index('ix_author_date_naissance', 'date_naissance'),
     )
 
 
-class Book(Base):
+class AuthorTrigram(Base):
+    """Index trigrammes des noms d'auteurs normalisés (app/trigrammes.py)"""
+    __tablename__ = "author_trigram"
+
+    trigramme = Column(String(3), primary_key=True)
+    auteur_id = Column(Integer, ForeignKey("author.id", ondelete="CASCADE"), primary_key=True, index=True)
+    
+    # Liste d'un trigramme rangée par clé primaire, sans rowid
+    __table_args__ = ({"sqlite_with_rowid": False},)
+
+
+class AuthorTrigramStat(Base):
+    """Nombre d'auteurs de chaque trigramme : les listes les plus rares sont lues d'abord"""
+    __tablename__ = "author_trigram_stat"
+
+    trigramme = Column(String(3), primary_key=True)
+    nombre = Column(Integer, nullable=False)
+    
+    __table_args__ = ({"sqlite_with_rowid": False},)
+
+
+class Book(Versionne, Base):
     """Modèle Livre"""
     __tablename__ = "book"
 
@@ -55,6 +94,8 @@ class Book(Base):
     langue = Column(String(50), nullable=False)
     nombre_pages = Column(Integer, nullable=False)
     maison_edition = Column(String(255), nullable=False)
+    # Copie de LoanHistory.popularite, indexée pour le tri sort_by=popularite
+    popularite = Column(Integer, nullable=False, default=0, server_default="0", index=True)
     
     # Foreign Key
     auteur_id = Column(Integer, ForeignKey("author.id", ondelete="RESTRICT"), nullable=False, index=True)
@@ -66,10 +107,16 @@ class Book(Base):
     # Contraintes
     __table_args__ = (
         CheckConstraint('nombre_exemplaires_disponibles <= nombre_exemplaires_total', name='ck_exemplaires_dispo_lte_total'),
+        # Index des chemins de /books/search : filtres d'égalité d'abord, puis plage ou tri
+        Index('ix_book_categorie_titre', 'categorie', 'titre'),
+        Index('ix_book_categorie_langue_annee', 'categorie', 'langue', 'annee_publication'),
+        Index('ix_book_langue_annee', 'langue', 'annee_publication'),
+        Index('ix_book_annee_publication', 'annee_publication'),
+        Index('ix_book_disponibles', 'nombre_exemplaires_disponibles'),
     )
 
 
-class Loan(Base):
+class Loan(Versionne, Base):
     """Modèle Emprunt"""
     __tablename__ = "loans"
 
@@ -92,6 +139,8 @@ class Loan(Base):
     # Contraintes
     __table_args__ = (
         CheckConstraint('date_retour_effectif IS NULL OR date_retour_effectif >= date_emprunt', name='ck_loan_retour_apres_loan'),
+        # Emprunts échus : statut = ... AND date_limite_retour < ...
+        Index('ix_loans_statut_date_limite', 'statut', 'date_limite_retour'),
     )
 
 
@@ -100,12 +149,8 @@ class LoanHistory(Base):
     __tablename__ = "loan_history"
 
     id = Column(Integer, primary_key=True, index=True)
-    livre_id = Column(Integer, ForeignKey("book.id"), nullable=False, index=True)
+    livre_id = Column(Integer, ForeignKey("book.id"), nullable=False, unique=True, index=True)
     nombre_emprunts_total = Column(Integer, nullable=False, default=0)
-    duree_moyenne_emprunt = Column(Integer, nullable=True)  # en jours
+    duree_moyenne_emprunt = Column(Float, nullable=True)  # en jours, moyenne glissante
+    nombre_retours = Column(Integer, nullable=False, default=0, server_default="0")  # base de la moyenne
     popularite = Column(Integer, nullable=False, default=0)
-
-
-engine = create_engine("sqlite:///bibliotheque.db")
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind=engine)
\ No newline at end of file
@@ -0,0 +1,144 @@
+import base64
+import json
+from datetime import date
+from fastapi import HTTPException
+from sqlalchemy import Date, and_, func, or_, select
+
+# ===============================
+# Pagination par curseur (keyset)
+# ===============================
+#
+# Le curseur encode la clé de tri et l'id de la dernière ligne renvoyée.
+# La page suivante filtre "après" ce couple au lieu d'un OFFSET : le coût
+# ne dépend plus de la profondeur de la page.
+
+
+def encode_cursor(valeur, identifiant: int) -> str:
+    """Encoder (clé de tri, id) en jeton opaque"""
+    if isinstance(valeur, date):
+        valeur = valeur.isoformat()
+    brut = json.dumps([valeur, identifiant], separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(brut).decode().rstrip("=")
+
+
+def decode_cursor(jeton: str, colonne):
+    """Décoder un jeton produit par encode_cursor pour la colonne donnée"""
+    try:
+        brut = base64.urlsafe_b64decode(jeton + "=" * (-len(jeton) % 4))
+        valeur, identifiant = json.loads(brut)
+        if valeur is not None and isinstance(colonne.type, Date):
+            valeur = date.fromisoformat(valeur)
+        return valeur, int(identifiant)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Curseur de pagination invalide")
+
+
+def keyset(colonne, colonne_id, order: str = "asc", after: str = None):
+    """
+    Clauses (conditions, order_by) d'une page keyset
+
+    - colonne: clé de tri (titre, annee_publication, nom, date_naissance...)
+    - colonne_id: départage les égalités et rend l'ordre total
+    """
+    desc = order == "desc"
+    order_by = [colonne.desc(), colonne_id.desc()] if desc else [colonne, colonne_id]
+
+    conditions = []
+    if after:
+        valeur, dernier_id = decode_cursor(after, colonne)
+        if desc:
+            # "colonne <= valeur" reste exploitable par l'index sur la colonne
+            conditions.append(colonne <= valeur)
+            conditions.append(or_(colonne < valeur, and_(colonne == valeur, colonne_id < dernier_id)))
+        else:
+            conditions.append(colonne >= valeur)
+            conditions.append(or_(colonne > valeur, and_(colonne == valeur, colonne_id > dernier_id)))
+
+    return conditions, order_by
+
+
+def next_cursor(lignes: list, page_size: int, cle):
+    """
+    Couper la page et calculer le curseur suivant
+
+    Les requêtes keyset lisent page_size + 1 lignes : la ligne en trop
+    indique qu'une page suivante existe, sans COUNT.
+    cle: fonction ligne -> (valeur de tri, id)
+    """
+    if len(lignes) <= page_size:
+        return lignes, None
+    lignes = lignes[:page_size]
+    return lignes, encode_cursor(*cle(lignes[-1]))
+
+
+def _mode_curseur(after, cursor, with_total):
+    mode_curseur = cursor or after is not None
+    if with_total is None:
+        # Le COUNT n'est fait par défaut qu'en mode offset (comportement historique)
+        with_total = not mode_curseur
+    return mode_curseur, with_total
+
+
+def _metadonnees(mode_curseur, page, page_size, total, curseur):
+    return {
+        "page_courante": None if mode_curseur else page,
+        "taille_page": page_size,
+        "total": total,
+        "pages_totales": None if total is None else (total + page_size - 1) // page_size,
+        "next_cursor": curseur,
+    }
+
+
+def paginer(query, colonne, colonne_id, page=1, page_size=5, order="asc",
+            after=None, cursor=False, with_total=None, cle=None):
+    """
+    Paginer une Query ORM en mode offset ou curseur
+
+    Renvoie (lignes, métadonnées de pagination). Le total n'est calculé
+    que si with_total est vrai (par défaut : seulement en mode offset).
+    """
+    mode_curseur, with_total = _mode_curseur(after, cursor, with_total)
+    total = query.order_by(None).count() if with_total else None
+
+    conditions, order_by = keyset(colonne, colonne_id, order, after if mode_curseur else None)
+    query = query.filter(*conditions).order_by(*order_by)
+
+    curseur = None
+    if mode_curseur:
+        cle = cle or (lambda ligne: (getattr(ligne, colonne.key), ligne.id))
+        lignes, curseur = next_cursor(query.limit(page_size + 1).all(), page_size, cle)
+    else:
+        lignes = query.offset((page - 1) * page_size).limit(page_size).all()
+
+    return lignes, _metadonnees(mode_curseur, page, page_size, total, curseur)
+
+
+def _lignes(result, stmt) -> list:
+    """Objets ORM pour select(Modele), tuples (Row) pour un select de colonnes"""
+    descriptions = stmt.column_descriptions
+    if len(descriptions) == 1 and isinstance(descriptions[0]["expr"], type):
+        return result.scalars().all()
+    return result.all()
+
+
+async def paginer_async(db, stmt, colonne, colonne_id, page=1, page_size=5, order="asc",
+                        after=None, cursor=False, with_total=None, cle=None):
+    """Équivalent de paginer() pour un select() exécuté par une AsyncSession"""
+    mode_curseur, with_total = _mode_curseur(after, cursor, with_total)
+    total = None
+    if with_total:
+        total = await db.scalar(select(func.count()).select_from(stmt.order_by(None).subquery()))
+
+    conditions, order_by = keyset(colonne, colonne_id, order, after if mode_curseur else None)
+    stmt = stmt.where(*conditions).order_by(*order_by)
+
+    curseur = None
+    if mode_curseur:
+        cle = cle or (lambda ligne: (getattr(ligne, colonne.key), ligne.id))
+        result = await db.execute(stmt.limit(page_size + 1))
+        lignes, curseur = next_cursor(_lignes(result, stmt), page_size, cle)
+    else:
+        result = await db.execute(stmt.offset((page - 1) * page_size).limit(page_size))
+        lignes = _lignes(result, stmt)
+
+    return lignes, _metadonnees(mode_curseur, page, page_size, total, curseur)
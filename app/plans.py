@@ -0,0 +1,161 @@
+"""
+Conseiller d'index : plans d'exécution des requêtes des endpoints
+
+    python -m app.plans            # rapport
+    python -m app.plans --strict   # code de sortie 1 si un scan complet est détecté
+
+Chaque forme de requête est construite avec les mêmes helpers que les
+routers (tri_livres, recherche_livres, keyset...) puis passée à
+EXPLAIN QUERY PLAN sur la base configurée (DATABASE_URL), en lecture seule.
+Sont signalés :
+- SCAN <table> sans index : la table entière est lue ;
+- USE TEMP B-TREE FOR ORDER BY : le tri n'est pas servi par un index.
+"""
+import argparse
+import sys
+from datetime import date
+from sqlalchemy import select
+from sqlalchemy.orm import joinedload
+from app import search
+from app.database import engine
+from app.lots import requetes_par_ids
+from app.models import Author, Book, Loan
+from app.pagination import encode_cursor, keyset
+from app.retards import echus, en_retard
+from app.routers.authors import colonne_tri_auteurs, conditions_recherche_auteurs
+from app.routers.book import recherche_livres, tri_livres
+
+PAGE = 20
+
+
+def _page(stmt, colonne, colonne_id, order="asc", after=None):
+    """Forme d'une page keyset (ou première page) telle qu'émise par paginer()"""
+    conditions, order_by = keyset(colonne, colonne_id, order, after)
+    return stmt.where(*conditions).order_by(*order_by).limit(PAGE + 1)
+
+
+def _livres(sort_by="titre", order="asc", after=None, **filtres):
+    stmt, colonne, _ = recherche_livres(
+        select(Book), sort_by=sort_by, mode_curseur=after is not None, **filtres
+    )
+    return _page(stmt, colonne, Book.id, order, after)
+
+
+def _auteurs(sort_by="nom", order="asc", nom=None, nationalite=None):
+    stmt = select(Author).where(*conditions_recherche_auteurs(nom, nationalite))
+    return _page(stmt, colonne_tri_auteurs(sort_by), Author.id, order)
+
+
+def formes_requetes() -> dict:
+    """Nom -> requête, pour chaque chemin d'accès des endpoints de lecture"""
+    formes = {
+        "GET /books/ (tri titre)": _page(*tri_livres(select(Book), "titre")[:2], Book.id),
+        "GET /books/ (tri titre, page suivante)": _page(
+            select(Book), Book.titre, Book.id, after=encode_cursor("M", 1)
+        ),
+        "GET /books/ (tri annee_publication desc)": _page(
+            select(Book), Book.annee_publication, Book.id, "desc"
+        ),
+        "GET /books/ (tri popularite desc)": _page(select(Book), Book.popularite, Book.id, "desc"),
+        "GET /books/ (tri auteur)": _page(*tri_livres(select(Book), "auteur")[:2], Book.id),
+        "GET /books/{id}": select(Book).where(Book.id == 1),
+        "POST /books/batch-get": next(requetes_par_ids(Book, list(range(1, 51)))),
+        "GET /books/search?isbn": _livres(isbn="9780000000001"),
+        "GET /books/search?categorie": _livres(categorie="Fiction"),
+        "GET /books/search?categorie&langue&annee_min&annee_max": _livres(
+            categorie="Fiction", langue="Français", annee_min=1950, annee_max=2000
+        ),
+        "GET /books/search?langue&annee": _livres(langue="Français", annee=2000),
+        "GET /books/search?annee_min (tri annee_publication)": _livres(
+            sort_by="annee_publication", annee_min=1990
+        ),
+        "GET /books/search?disponible=false": _livres(disponible=False),
+        "GET /books/search?auteur": _livres(auteur="hugo"),
+        "GET /authors/{id}": select(Author).options(joinedload(Author.livres)).where(Author.id == 1),
+        "GET /authors/search (tri nom)": _auteurs(),
+        "GET /authors/search (tri date_naissance)": _auteurs(sort_by="date_naissance"),
+        "GET /authors/search?nationalite (tri nom)": _auteurs(nationalite="FR"),
+        "GET /authors/search?nationalite (tri date_naissance)": _auteurs(
+            sort_by="date_naissance", nationalite="FR"
+        ),
+        "GET /loans/{id}": select(Loan).where(Loan.id == 1),
+        "GET /loans/overdue": _page(select(Loan).where(en_retard()), Loan.date_limite_retour, Loan.id),
+        "Lot de python -m app.retards": select(Loan.id).where(echus(date.today())).limit(500),
+    }
+    if search.fts_actif():
+        formes["GET /books/search?titre (pertinence)"] = _livres(titre="prince", sort_by="pertinence")
+        formes["GET /authors/search?nom"] = _auteurs(nom="hugo")
+    return formes
+
+
+def _parametres(compiled):
+    """Paramètres positionnels du SQL compilé, dans le format stocké par SQLite"""
+    valeurs = compiled.construct_params()
+    return tuple(
+        valeurs[nom].isoformat() if isinstance(valeurs[nom], date) else valeurs[nom]
+        for nom in compiled.positiontup
+    )
+
+
+def alertes(plan: list) -> list:
+    """Lignes du plan qui trahissent un scan complet ou un tri hors index"""
+    problemes = []
+    for ligne in plan:
+        if ligne.startswith("SCAN ") and " USING " not in ligne and "VIRTUAL TABLE" not in ligne:
+            problemes.append(f"scan complet : {ligne}")
+        elif ligne.startswith("USE TEMP B-TREE FOR ORDER BY"):
+            problemes.append("tri hors index")
+    return problemes
+
+
+def expliquer(conn, stmt) -> list:
+    """Lignes (detail) de EXPLAIN QUERY PLAN pour une requête"""
+    # render_postcompile : les listes IN (...) sont développées en paramètres
+    compiled = stmt.compile(dialect=conn.dialect, compile_kwargs={"render_postcompile": True})
+    lignes = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + compiled.string, _parametres(compiled))
+    return [ligne[3] for ligne in lignes]
+
+
+def analyser(conn) -> dict:
+    """Nom de la forme -> (plan, alertes)"""
+    resultats = {}
+    for nom, stmt in formes_requetes().items():
+        plan = expliquer(conn, stmt)
+        resultats[nom] = (plan, alertes(plan))
+    return resultats
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--strict", action="store_true", help="échouer si un scan complet est détecté")
+    args = parser.parse_args(argv)
+
+    if engine.dialect.name != "sqlite":
+        print("EXPLAIN QUERY PLAN n'est disponible que sur SQLite")
+        return 2
+    # Diagnostic : aucun DDL sur la base analysée (les index FTS5 viennent de la migration 0005)
+    if not search.detecter_fts(engine):
+        print("Index FTS5 absents (alembic upgrade head) : formes plein texte ignorées\n")
+
+    scans = 0
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA query_only=ON")
+        try:
+            resultats = analyser(conn)
+        finally:
+            # La connexion retourne au pool
+            conn.exec_driver_sql("PRAGMA query_only=OFF")
+    for nom, (plan, problemes) in resultats.items():
+        print(f"{'⚠' if problemes else '✓'} {nom}")
+        for ligne in plan:
+            print(f"    {ligne}")
+        for probleme in problemes:
+            print(f"    -> {probleme}")
+        scans += any(probleme.startswith("scan complet") for probleme in problemes)
+
+    print(f"\n{scans} forme(s) de requête avec scan complet")
+    return 1 if args.strict and scans else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
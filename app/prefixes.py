@@ -0,0 +1,341 @@
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from bisect import bisect_left
+from sqlalchemy import func, select
+from app.models import Book
+from app.trigrammes import normaliser
+
+logger = logging.getLogger(__name__)
+
+# ===============================
+# Index des préfixes de titres (GET /books/suggest?q=)
+# ===============================
+#
+# Tableau trié, en mémoire du processus, des débuts de mots des titres
+# normalisés (app.trigrammes.normaliser) : "Le Petit Prince" y figure sous
+# "le petit prince", "petit prince" et "prince". Les clés commençant par q
+# sont contiguës, deux bisect en donnent la tranche ; les livres de la
+# tranche sont classés par popularité (heapq.nlargest), à popularité égale
+# les plus anciens d'abord.
+#
+# Le travail d'une suggestion est borné :
+# - la tranche est copiée sous le verrou (une copie de pointeurs), puis
+#   classée hors du verrou : écritures et reconstruction ne l'attendent pas ;
+# - un préfixe de plus de TRANCHE_MAX clés (une ou deux lettres, un mot
+#   courant) garde ses SUGGESTIONS_MAX meilleurs livres en tête
+#   (self._tetes) : la tranche est classée une fois, puis la tête est tenue
+#   à jour par les écritures. Seuls une suppression, un changement de titre
+#   ou une popularité en baisse obligent à reclasser la tranche, à la
+#   suggestion suivante. Les autres préfixes classent au plus TRANCHE_MAX clés.
+#
+# Deux listes parallèles (clés, ids) plutôt qu'une liste de tuples : un
+# tuple de 56 octets de moins par clé. Mesuré sur le catalogue synthétique
+# (titres de 3 à 4 mots, 21 caractères en moyenne) :
+#   mémoire     ~400 octets par titre (~100 par clé, plus titre et popularité)
+#   construction ~0,16 s pour 10 000 livres, ~1,5 s pour 100 000 (tri en Python)
+#   écriture    ~0,1 ms pour 10 000 livres, ~1 ms pour 100 000 : list.insert
+#               décale la fin des listes, un gros import est fusionné en une passe
+#
+# Construit en tâche de fond au démarrage depuis la table book (une
+# suggestion reçue avant attend la fin de la construction), puis tenu à
+# jour par les handlers d'écriture des livres (après le commit) et par les
+# emprunts pour la popularité. Chaque worker a son propre index : les
+# écritures reçues par un autre worker (ou faites hors de l'API) n'y
+# apparaissent qu'à la reconstruction périodique (BOOK_SUGGEST_REBUILD_S),
+# sautée tant que la table book n'a pas changé (nombre de lignes, dernier
+# id, dernière modification).
+
+# Clés à partir desquelles un lot est fusionné au tableau au lieu d'être inséré clé par clé
+FUSION_MIN = 1000
+
+# Clés d'une tranche au-delà desquelles le préfixe est servi par sa liste de tête
+TRANCHE_MAX = 1000
+
+# Suggestions au plus par appel, et longueur des listes de tête
+SUGGESTIONS_MAX = 50
+
+
+class IndexPrefixes:
+    """Débuts de mots des titres triés, avec titre et popularité de chaque livre"""
+
+    def __init__(self):
+        self._cles = []
+        self._ids = []
+        # id -> titre, id -> popularité
+        self._livres = {}
+        self._popularites = {}
+        # Préfixe de grande tranche -> ids de ses meilleurs livres, dans l'ordre (absent : à classer)
+        self._tetes = {}
+        # Incrémentée à chaque écriture : une tête classée hors du verrou n'est
+        # gardée que si aucune écriture n'a eu lieu entre-temps
+        self._generation = 0
+        self._verrou = threading.Lock()
+        # Une seule construction à la fois (démarrage, reconstruction, première suggestion)
+        self._construction = threading.Lock()
+        # Écritures reçues pendant une reconstruction, rejouées sur le nouvel index
+        self._journal = None
+        # État de la table book lors de la dernière construction (voir signature())
+        self._signature = None
+        self.construit = False
+        self.duree_construction_ms = 0.0
+
+    # ---------- Construction ----------
+
+    def construire(self, conn):
+        """(Re)construire l'index depuis la table book ; Session ou Connection"""
+        with self._construction:
+            self._construire(conn)
+
+    def assurer(self, conn):
+        """Construire l'index s'il ne l'est pas encore, ou attendre la construction en cours"""
+        if self.construit:
+            return
+        with self._construction:
+            if not self.construit:
+                self._construire(conn)
+
+    def reconstruire_si_modifie(self, conn) -> bool:
+        """Reconstruire l'index si la table book a changé depuis la dernière construction"""
+        with self._construction:
+            if self.construit and signature(conn) == self._signature:
+                return False
+            self._construire(conn)
+            return True
+
+    def _construire(self, conn):
+        debut = time.perf_counter()
+        with self._verrou:
+            self._journal = []
+        try:
+            etat = signature(conn)
+            livres, popularites = {}, {}
+            for id_, titre, popularite in conn.execute(select(Book.id, Book.titre, Book.popularite)):
+                livres[id_] = titre
+                popularites[id_] = popularite
+            entrees = sorted(
+                (cle, id_) for id_, titre in livres.items() for cle in _cles_titre(titre)
+            )
+            cles = [cle for cle, _ in entrees]
+            ids = [id_ for _, id_ in entrees]
+            del entrees
+        except Exception:
+            with self._verrou:
+                self._journal = None
+            raise
+
+        # Un emprunt commité avant la lecture peut être compté deux fois : corrigé à la reconstruction suivante
+        with self._verrou:
+            journal, self._journal = self._journal, None
+            self._cles, self._ids, self._livres, self._popularites = cles, ids, livres, popularites
+            self._tetes = {}
+            self._generation += 1
+            self._signature = etat
+            self.construit = True
+            for operation, arguments in journal:
+                operation(*arguments)
+        self.duree_construction_ms = (time.perf_counter() - debut) * 1000
+        logger.info("Index des titres : %d livres, %d clés en %.0f ms",
+                    len(livres), len(cles), self.duree_construction_ms)
+
+    def vider(self):
+        with self._verrou:
+            self._cles, self._ids, self._livres, self._popularites = [], [], {}, {}
+            self._tetes = {}
+            self._generation += 1
+            self._signature = None
+            self.construit = False
+
+    # ---------- Mises à jour (après le commit) ----------
+
+    def ecrire(self, livre_id: int, titre: str, popularite: int):
+        """Ajouter un livre, ou remplacer son titre et sa popularité"""
+        self._appliquer(self._ecrire, livre_id, titre, popularite)
+
+    def ajouter_lot(self, livres):
+        """Livres tout juste insérés (import en masse), en (id, titre) de popularité nulle"""
+        self._appliquer(self._ajouter_lot, list(livres))
+
+    def retirer(self, livre_id: int):
+        self._appliquer(self._retirer, livre_id)
+
+    def emprunte(self, livre_id: int):
+        """Un emprunt de plus : popularité + 1, comme Book.popularite"""
+        self._appliquer(self._emprunte, livre_id)
+
+    def _appliquer(self, operation, *arguments):
+        with self._verrou:
+            if self._journal is not None:
+                self._journal.append((operation, arguments))
+            if self.construit:
+                self._generation += 1
+                operation(*arguments)
+
+    def _ecrire(self, livre_id, titre, popularite):
+        if self._livres.get(livre_id) == titre:
+            ancienne, self._popularites[livre_id] = self._popularites[livre_id], popularite
+            if popularite >= ancienne:
+                self._placer(livre_id)
+            else:
+                self._oublier(livre_id, titre)
+            return
+        self._retirer(livre_id)
+        self._livres[livre_id] = titre
+        self._popularites[livre_id] = popularite
+        for cle in _cles_titre(titre):
+            i = bisect_left(self._cles, cle)
+            # À clé égale, ordre des ids (celui de la construction)
+            while i < len(self._cles) and self._cles[i] == cle and self._ids[i] < livre_id:
+                i += 1
+            self._cles.insert(i, cle)
+            self._ids.insert(i, livre_id)
+        self._placer(livre_id)
+
+    def _ajouter_lot(self, livres):
+        # Déjà présents si l'index a été reconstruit depuis l'insertion (journal rejoué)
+        livres = [(id_, titre) for id_, titre in livres if id_ not in self._livres]
+        entrees = sorted((cle, id_) for id_, titre in livres for cle in _cles_titre(titre))
+        if len(entrees) < FUSION_MIN:
+            for id_, titre in livres:
+                self._ecrire(id_, titre, 0)
+            return
+        # Un gros lot : une fusion des deux tableaux triés plutôt qu'un list.insert par clé
+        self._livres.update(livres)
+        self._popularites.update((id_, 0) for id_, _ in livres)
+        fusion = list(heapq.merge(zip(self._cles, self._ids), entrees))
+        self._cles = [cle for cle, _ in fusion]
+        self._ids = [id_ for _, id_ in fusion]
+        for id_, _ in livres:
+            self._placer(id_)
+
+    def _retirer(self, livre_id):
+        ancien = self._livres.get(livre_id)
+        if ancien is None:
+            return
+        self._oublier(livre_id, ancien)
+        del self._livres[livre_id]
+        del self._popularites[livre_id]
+        for cle in _cles_titre(ancien):
+            i = bisect_left(self._cles, cle)
+            while self._ids[i] != livre_id:
+                i += 1
+            del self._cles[i]
+            del self._ids[i]
+
+    def _emprunte(self, livre_id):
+        if livre_id in self._popularites:
+            self._popularites[livre_id] += 1
+            self._placer(livre_id)
+
+    # ---------- Listes de tête des préfixes de grande tranche ----------
+
+    def _rang(self, livre_id):
+        return self._popularites[livre_id], -livre_id
+
+    def _placer(self, livre_id):
+        """Le livre a été ajouté ou sa popularité a monté : le placer dans les têtes de ses préfixes"""
+        for prefixe in _prefixes(self._livres[livre_id]):
+            tete = self._tetes.get(prefixe)
+            if tete is None:
+                continue
+            # Une tête incomplète contient tous les livres du préfixe : le livre y entre
+            if livre_id in tete or len(tete) < SUGGESTIONS_MAX or self._rang(livre_id) > self._rang(tete[-1]):
+                if livre_id not in tete:
+                    tete.append(livre_id)
+                tete.sort(key=self._rang, reverse=True)
+                del tete[SUGGESTIONS_MAX:]
+
+    def _oublier(self, livre_id, titre):
+        """Le livre quitte ses préfixes ou y descend : ses têtes seront reclassées"""
+        for prefixe in _prefixes(titre):
+            tete = self._tetes.get(prefixe)
+            if tete is not None and livre_id in tete:
+                del self._tetes[prefixe]
+
+    # ---------- Suggestions ----------
+
+    def suggerer(self, q: str, limite: int = 10) -> list:
+        """Livres dont un mot du titre commence par q, les plus populaires d'abord : [{id, titre, popularite}]"""
+        prefixe = normaliser(q)
+        limite = min(limite, SUGGESTIONS_MAX)
+        if not prefixe or limite <= 0:
+            return []
+        with self._verrou:
+            tete = self._tetes.get(prefixe)
+            if tete is not None:
+                return self._decrire(tete[:limite])
+            debut = bisect_left(self._cles, prefixe)
+            # "\uffff" est plus grand que tout caractère d'un titre normalisé
+            fin = bisect_left(self._cles, prefixe + "\uffff", debut)
+            grande = fin - debut > TRANCHE_MAX
+            # Copie de la tranche : le classement se fait hors du verrou
+            ids = self._ids[debut:fin]
+            popularites = self._popularites
+            generation = self._generation
+
+        # Un livre peut avoir plusieurs mots commençant par q ; popularité lue en direct,
+        # un livre supprimé entre-temps est écarté par _decrire()
+        meilleurs = heapq.nlargest(
+            SUGGESTIONS_MAX if grande else limite, set(ids),
+            key=lambda id_: (popularites.get(id_, -1), -id_),
+        )
+        with self._verrou:
+            if grande and generation == self._generation:
+                self._tetes[prefixe] = meilleurs
+            return self._decrire(meilleurs[:limite])
+
+    def _decrire(self, ids) -> list:
+        return [
+            {"id": id_, "titre": self._livres[id_], "popularite": self._popularites[id_]}
+            for id_ in ids if id_ in self._livres
+        ]
+
+    def __len__(self):
+        return len(self._livres)
+
+
+def _cles_titre(titre: str) -> set:
+    """Le titre normalisé à partir de chacun de ses mots"""
+    mots = normaliser(titre).split()
+    return {" ".join(mots[i:]) for i in range(len(mots))}
+
+
+def _prefixes(titre: str) -> set:
+    """Préfixes par lesquels le titre est suggéré"""
+    return {cle[:n] for cle in _cles_titre(titre) for n in range(1, len(cle) + 1)}
+
+
+def signature(conn) -> tuple:
+    """Nombre de livres, dernier id et dernière modification : change à chaque écriture sur book"""
+    return tuple(conn.execute(select(func.count(), func.max(Book.id), func.max(Book.updated_at))).one())
+
+
+titres = IndexPrefixes()
+
+
+def construire_titres(engine, si_modifie: bool = False):
+    with engine.connect() as conn:
+        if si_modifie:
+            titres.reconstruire_si_modifie(conn)
+        else:
+            titres.construire(conn)
+
+
+async def boucle_titres(engine, intervalle: float):
+    """
+    Tâche de fond : construire l'index, puis le reconstruire toutes les `intervalle` secondes
+    si la table book a changé (0 : jamais), hors de la boucle d'événements
+    """
+    si_modifie = False
+    while True:
+        try:
+            await asyncio.to_thread(construire_titres, engine, si_modifie)
+        except Exception:
+            # Schéma pas encore créé... : l'index sera construit à la première suggestion
+            logger.exception("Échec de la construction de l'index des titres")
+        if intervalle <= 0:
+            return
+        si_modifie = True
+        await asyncio.sleep(intervalle)
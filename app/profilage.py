@@ -0,0 +1,157 @@
+import cProfile
+import io
+import logging
+import pstats
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+from app import config
+
+logger = logging.getLogger(__name__)
+
+# ===============================
+# Journal des requêtes SQL lentes
+# ===============================
+#
+# Une requête plus longue que SLOW_QUERY_MS est journalisée avec ses
+# paramètres, l'endpoint appelant et son plan d'exécution. Le journal est
+# limité à SLOW_QUERY_LOG_PER_MIN entrées par minute : au-delà, les requêtes
+# lentes sont seulement comptées (et le plan n'est pas calculé), le total
+# des entrées omises est rapporté par l'entrée suivante.
+
+# Longueur maximale de la représentation des paramètres dans le journal
+LONGUEUR_PARAMETRES = 500
+
+
+class Limiteur:
+    """Au plus `maximum` autorisations par fenêtre de `fenetre` secondes"""
+
+    def __init__(self, maximum: int, fenetre: float = 60.0):
+        self.maximum = maximum
+        self.fenetre = fenetre
+        self._debut = time.monotonic()
+        self._accordes = 0
+        self.omis = 0
+        self._verrou = threading.Lock()
+
+    def autoriser(self) -> Optional[int]:
+        """None si refusé ; sinon le nombre de refus depuis la dernière autorisation"""
+        with self._verrou:
+            maintenant = time.monotonic()
+            if maintenant - self._debut >= self.fenetre:
+                self._debut, self._accordes = maintenant, 0
+            if self._accordes >= self.maximum:
+                self.omis += 1
+                return None
+            self._accordes += 1
+            omis, self.omis = self.omis, 0
+            return omis
+
+
+def plan_execution(conn, statement: str, parameters) -> str:
+    """
+    Plan de la requête, lu sur la connexion DBAPI (sans repasser par les événements)
+
+    EXPLAIN QUERY PLAN sur SQLite, EXPLAIN ailleurs ; la requête n'est pas exécutée.
+    """
+    if isinstance(parameters, list):
+        # executemany : le plan de la première ligne suffit
+        parameters = parameters[0] if parameters else ()
+    prefixe = "EXPLAIN QUERY PLAN " if conn.dialect.name == "sqlite" else "EXPLAIN "
+    try:
+        curseur = conn.connection.dbapi_connection.cursor()
+        try:
+            curseur.execute(prefixe + statement, parameters)
+            lignes = curseur.fetchall()
+        finally:
+            curseur.close()
+    except Exception as exc:
+        return f"indisponible ({exc})"
+    if conn.dialect.name == "sqlite":
+        return "\n".join(f"  {ligne[3]}" for ligne in lignes)
+    return "\n".join(f"  {ligne[0]}" for ligne in lignes)
+
+
+class JournalLentes:
+    """Journalisation des requêtes lentes, limitée en débit"""
+
+    def __init__(self, limiteur: Limiteur = None):
+        self.limiteur = limiteur or Limiteur(config.SLOW_QUERY_LOG_PER_MIN)
+
+    def signaler(self, conn, statement: str, parameters, duree: float, endpoint: str):
+        omis = self.limiteur.autoriser()
+        if omis is None:
+            return
+        logger.warning(
+            "Requête SQL lente : %.1f ms (%s)\nSQL : %s\nParamètres : %s\nPlan :\n%s%s",
+            duree * 1000,
+            endpoint,
+            statement,
+            repr(parameters)[:LONGUEUR_PARAMETRES],
+            plan_execution(conn, statement, parameters),
+            f"\n({omis} requête(s) lente(s) non journalisée(s) depuis l'entrée précédente)" if omis else "",
+        )
+
+
+journal_lentes = JournalLentes()
+
+
+# ===============================
+# Profil d'une requête HTTP (en-tête X-Debug-Profile)
+# ===============================
+#
+# Avec DEBUG_PROFILE_ENABLED=1, une requête portant l'en-tête
+#   X-Debug-Profile: sql          chaque requête SQL, ses paramètres et sa durée
+#   X-Debug-Profile: sql,python   idem, plus le profil cProfile du handler
+# reçoit en réponse X-Debug-Profile-Id ; le profil se lit ensuite sur
+# GET /debug/profiles/{id}. Les PROFILS_CONSERVES derniers profils sont
+# gardés en mémoire. Désactivé par défaut : le profil expose le SQL et
+# ses paramètres.
+
+ENTETE = "x-debug-profile"
+PROFILS_CONSERVES = 100
+
+# Fonctions affichées dans le profil Python (tri par temps cumulé)
+LIGNES_PYTHON = 40
+
+
+def options_profil(valeur: Optional[str]) -> set:
+    """Parties du profil demandées par l'en-tête ('sql', 'python'), vide si désactivé"""
+    if not config.DEBUG_PROFILE_ENABLED or valeur is None:
+        return set()
+    options = {partie.strip().lower() for partie in valeur.split(",")}
+    # 'python' implique 'sql' ; toute autre valeur vaut 'sql'
+    return {"sql", "python"} if "python" in options else {"sql"}
+
+
+def rapport_python(profil: cProfile.Profile) -> str:
+    sortie = io.StringIO()
+    pstats.Stats(profil, stream=sortie).sort_stats("cumulative").print_stats(LIGNES_PYTHON)
+    return sortie.getvalue()
+
+
+class Profils:
+    """Derniers profils de requêtes, par id"""
+
+    def __init__(self, maximum: int = PROFILS_CONSERVES):
+        self.maximum = maximum
+        self._profils = OrderedDict()
+        self._verrou = threading.Lock()
+
+    def nouvel_id(self) -> str:
+        return uuid.uuid4().hex
+
+    def enregistrer(self, profil_id: str, profil: dict):
+        with self._verrou:
+            self._profils[profil_id] = profil
+            while len(self._profils) > self.maximum:
+                self._profils.popitem(last=False)
+
+    def lire(self, profil_id: str) -> Optional[dict]:
+        with self._verrou:
+            return self._profils.get(profil_id)
+
+
+profils = Profils()
@@ -0,0 +1,104 @@
+"""
+Passage des emprunts échus au statut 'En retard'
+
+    python -m app.retards                 # une passe (cron)
+    python -m app.retards --intervalle 600  # une passe toutes les 10 minutes
+
+L'application lance aussi la passe en tâche de fond au démarrage
+(OVERDUE_SWEEP_INTERVAL_S, 0 pour désactiver).
+"""
+import argparse
+import asyncio
+import logging
+import sys
+import time
+from datetime import date
+from typing import Optional
+from sqlalchemy import and_, or_, select, update
+from app import config
+from app.models import Loan, StatutEmpruntEnum
+
+logger = logging.getLogger(__name__)
+
+ACTIF = StatutEmpruntEnum.ACTIF.value
+EN_RETARD = StatutEmpruntEnum.EN_RETARD.value
+
+# ===============================
+# Emprunts échus
+# ===============================
+#
+# Les UPDATE sont faits par lots de OVERDUE_BATCH_SIZE lignes, une
+# transaction par lot : le verrou d'écriture SQLite n'est tenu que le temps
+# d'un lot, les emprunts et retours passent entre deux lots. Les lots sont
+# choisis par l'index (statut, date_limite_retour), sans lire la table.
+
+
+def echus(aujourd_hui: date):
+    """Condition des emprunts actifs dont la date limite est dépassée"""
+    return and_(Loan.statut == ACTIF, Loan.date_limite_retour < aujourd_hui)
+
+
+def en_retard(aujourd_hui: Optional[date] = None):
+    """
+    Condition de GET /loans/overdue
+
+    Les emprunts déjà marqués, et ceux échus depuis la dernière passe.
+    """
+    return or_(Loan.statut == EN_RETARD, echus(aujourd_hui or date.today()))
+
+
+def marquer_retards(engine, aujourd_hui: Optional[date] = None, taille_lot: int = None) -> int:
+    """Passer les emprunts échus à 'En retard', par lots ; renvoie le nombre de lignes modifiées"""
+    aujourd_hui = aujourd_hui or date.today()
+    taille_lot = taille_lot or config.OVERDUE_BATCH_SIZE
+    lot = select(Loan.id).where(echus(aujourd_hui)).limit(taille_lot).scalar_subquery()
+
+    debut = time.perf_counter()
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            modifies = conn.execute(
+                update(Loan)
+                # La condition est répétée : un retour a pu avoir lieu entre-temps
+                .where(Loan.id.in_(lot), echus(aujourd_hui))
+                .values(statut=EN_RETARD)
+            ).rowcount
+        total += modifies
+        if modifies < taille_lot:
+            break
+
+    logger.info(
+        "%d emprunt(s) passé(s) en retard en %.0f ms", total, (time.perf_counter() - debut) * 1000
+    )
+    return total
+
+
+async def boucle_retards(engine, intervalle: float):
+    """Tâche de fond : une passe toutes les `intervalle` secondes, hors de la boucle d'événements"""
+    while True:
+        try:
+            await asyncio.to_thread(marquer_retards, engine)
+        except Exception:
+            # Une passe ratée (base verrouillée...) ne doit pas arrêter les suivantes
+            logger.exception("Échec du passage des emprunts en retard")
+        await asyncio.sleep(intervalle)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--intervalle", type=float, default=0, help="secondes entre deux passes (0 : une seule)")
+    parser.add_argument("--taille-lot", type=int, default=None, help="lignes par transaction")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
+
+    from app.database import engine_ecriture
+
+    while True:
+        marquer_retards(engine_ecriture, taille_lot=args.taille_lot)
+        if not args.intervalle:
+            return 0
+        time.sleep(args.intervalle)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,106 +1,239 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, joinedload, selectinload
+from sqlalchemy import and_, select
+from typing import Optional, Union
 from datetime import date
-from app.models import Session as SessionLocal, Author
-from app.schemas.author import AuteurGet, AuteurUpdate, AuteurCreate
+from app.bulk import importer_auteurs, lire_lignes
+from app.cache import cle_auteur, reponses
+from app.conditionnel import conditionnelle, non_modifie, pas_modifie, validateurs
+from app.database import get_db, get_db_lecture
+from app.export import exporter
+from app.lots import charger, corps_en_cache, generations_en_cache, ids_uniques, lire_ids, reponse_lot, serialiser
+from app.pagination import paginer
+from app.serialisation import colonnes, en_dicts, reponse_liste
+from app import search
+from app.models import Author
+from app.trigrammes import indexer_auteurs, nom_normalise, normaliser, suggerer_auteurs
+from app.schemas.author import AuteurGet, AuteurResume, AuteurUpdate, AuteurCreate
+from app.schemas.lots import LotIds
 
 router = APIRouter(
     prefix="/authors",
     tags=["Auteurs"]
 )
- 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
- 
-@router.get("/", response_model=list[AuteurGet])
-def get_auteur(db: Session = Depends(get_db)):
+
+def colonne_tri_auteurs(sort_by: str):
+    """Colonne de tri des auteurs ('nom' ou 'date_naissance', sinon l'id)"""
+    if sort_by == "nom":
+        return Author.nom
+    if sort_by == "date_naissance":
+        return Author.date_naissance
+    return Author.id
+
+
+def conditions_recherche_auteurs(nom: Optional[str] = None, nationalite: Optional[str] = None):
+    """Filtres de recherche partagés par les modes sync et async"""
+    conditions = []
+    
+    if nom and search.fts_actif() and search.expression_fts(nom):
+        # Index plein texte : mots ou débuts de mots, sans casse ni accents
+        conditions.append(Author.id.in_(search.ids_auteurs(nom)))
+    elif nom:
+        # Sans index plein texte : sous-chaîne du nom normalisé, sans casse ni accents
+        conditions.append(search.contient(Author.nom_normalise, normaliser(nom)))
+    
+    # Recherche par nationalité 
+    if nationalite:
+        conditions.append(Author.nationalite == nationalite)
+    
+    return conditions
+
+
+def inclure_livres(include: Optional[str]) -> bool:
+    """Vrai si ?include= demande les livres imbriqués (ex: include=livres)"""
+    return "livres" in {partie.strip() for partie in (include or "").split(",")}
+
+
+# Colonnes lues par les listes sans livres (sérialisation rapide, voir app/serialisation.py)
+COLONNES_AUTEUR = colonnes(Author, AuteurResume)
+
+
+def selection_auteurs(avec_livres: bool) -> list:
+    """Ce que lit une liste : les objets Author (pour charger leurs livres) ou leurs seules colonnes"""
+    return [Author] if avec_livres else COLONNES_AUTEUR
+
+
+def lignes_auteurs(auteurs, avec_livres: bool):
+    """Lignes dont dépend une réponse : les auteurs, et leurs livres s'ils sont inclus"""
+    for auteur in auteurs:
+        yield auteur
+        if avec_livres:
+            yield from auteur.livres
+
+
+def entetes_auteurs(auteurs, avec_livres: bool, *extra) -> dict:
+    """Validateurs d'une liste d'auteurs (ETag sur les auteurs, et leurs livres s'ils sont inclus)"""
+    if avec_livres:
+        return validateurs(lignes_auteurs(auteurs, True), True, *extra, last_modified=False)
+    return validateurs(auteurs, False, *extra, last_modified=False, table=Author.__tablename__)
+
+
+def serialiser_auteurs(auteurs, avec_livres: bool) -> list:
+    """Auteurs -> dicts : par le schéma s'ils portent leurs livres, directement depuis les colonnes sinon"""
+    if avec_livres:
+        return [AuteurGet.model_validate(auteur).model_dump() for auteur in auteurs]
+    return en_dicts(auteurs, AuteurResume)
+
+
+def entetes_auteur(auteur) -> dict:
+    """Validateurs du détail d'un auteur, qui dépend aussi de ses livres"""
+    return validateurs(lignes_auteurs([auteur], True), last_modified=False)
+
+
+def lire_auteurs(db: Session, ids) -> Response:
+    """Auteurs demandés (avec leurs livres, comme le détail), dans l'ordre des ids, et ids manquants"""
+    ids = ids_uniques(ids)
+    corps = corps_en_cache(ids, cle_auteur)
+    absents = [id_ for id_ in ids if id_ not in corps]
+    generations = generations_en_cache(absents, cle_auteur)
+    lignes = charger(db, Author, absents, selectinload(Author.livres))
+    serialiser(corps, lignes, AuteurGet, cle_auteur, entetes_auteur, generations)
+    return reponse_lot("auteurs", ids, corps)
+
+
+@router.get("/", response_model=list[Union[AuteurResume, AuteurGet]])
+def get_auteur(
+    request: Request,
+    include: Optional[str] = None,
+    ids: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Lister les auteurs
+    
+    - include: 'livres' pour inclure les livres de chaque auteur
+    - ids: '3,1,2' pour lire ces auteurs en un appel (voir POST /authors/batch-get)
+    """
+    if ids is not None:
+        return lire_auteurs(db, lire_ids(ids))
+    
     # Recherche des auteurs dans la base
-    auteur = db.query(Author).all()
-    return auteur
+    avec_livres = inclure_livres(include)
+    query = db.query(*selection_auteurs(avec_livres))
+    if avec_livres:
+        # Une seule requête IN (...) pour tous les livres au lieu d'une par auteur
+        query = query.options(selectinload(Author.livres))
+    auteurs = query.all()
+    
+    entetes = entetes_auteurs(auteurs, avec_livres)
+    if non_modifie(request, entetes):
+        return pas_modifie(entetes)
+    return reponse_liste(serialiser_auteurs(auteurs, avec_livres), entetes)
 
 @router.get("/search")
 def search_authors(
+    request: Request,
     page: int = 1,
     page_size: int = 5,
     nom: Optional[str] = None,
     nationalite: Optional[str] = None,
     sort_by: str = "nom",
     order: str = "asc",
+    after: Optional[str] = None,
+    cursor: bool = False,
+    with_total: Optional[bool] = None,
+    include: Optional[str] = None,
     db: Session = Depends(get_db)
 ):
     """
     Recherche d'auteurs avec filtres et pagination
     
     Paramètres:
-    - nom: recherche partielle par prénom ou nom (insensible à la casse)
+    - nom: recherche par mots ou débuts de mots dans le prénom ou le nom (insensible à la casse et aux accents)
     - nationalite: recherche exacte par code ISO
     - sort_by: tri par 'nom' ou 'date_naissance' (défaut: nom)
     - order: 'asc' (croissant) ou 'desc' (décroissant) (défaut: asc)
     - page, page_size: pagination
+    - cursor / after: pagination par curseur, 'after' reçoit le 'next_cursor' de la page précédente
+    - with_total: calculer le total (défaut: oui en mode page, non en mode curseur)
+    - include: 'livres' pour inclure les livres de chaque auteur
     """
-    conditions = []
-    
-    if nom:
-        conditions.append(
-            (Author.nom(f"%{nom}%")) | (Author.prenom(f"%{nom}%"))
-        )
-    
-    # Recherche par nationalité 
-    if nationalite:
-        conditions.append(Author.nationalite == nationalite)
+    conditions = conditions_recherche_auteurs(nom, nationalite)
+    avec_livres = inclure_livres(include)
     
-    query = db.query(Author)
+    query = db.query(*selection_auteurs(avec_livres))
+    if avec_livres:
+        query = query.options(selectinload(Author.livres))
     
     # Appliquer les filtres
     if conditions:
         query = query.filter(and_(*conditions))
     
-    # Tri
-    if sort_by == "nom":
-        if order == "desc":
-            query = query.order_by(Author.nom.desc())
-        else:
-            query = query.order_by(Author.nom)
-    elif sort_by == "date_naissance":
-        if order == "desc":
-            query = query.order_by(Author.date_naissance.desc())
-        else:
-            query = query.order_by(Author.date_naissance)
-    
-    total = query.count()
-    
-    # Pagination
-    offset = (page - 1) * page_size
-    auteurs = query.offset(offset).limit(page_size).all()
-    
-    pages = (total + page_size - 1) // page_size
-    
-    return {
-        "auteurs" : auteurs,
-        "page_courante": page,
-        "taille_page": page_size,
-        "total": total,
-        "pages_totales": pages,
+    # Tri et pagination
+    auteurs, pagination = paginer(
+        query, colonne_tri_auteurs(sort_by), Author.id,
+        page, page_size, order, after, cursor, with_total
+    )
+    
+    entetes = entetes_auteurs(auteurs, avec_livres, pagination)
+    if non_modifie(request, entetes):
+        return pas_modifie(entetes)
+    return reponse_liste({
+        "auteurs" : serialiser_auteurs(auteurs, avec_livres),
+        **pagination,
         "tri": {
             "sort_by": sort_by,
             "order": order
         }
-    }
+    }, entetes)
  
+@router.get("/suggest")
+def suggest_auteurs(q: str, limit: int = 10, db: Session = Depends(get_db)):
+    """
+    Autocomplétion des auteurs, tolérante aux accents et aux fautes de frappe
+    
+    - q: début de prénom et/ou de nom ("celi", "dostoievski", "victor hu")
+    - limit: nombre de suggestions (défaut: 10)
+    
+    Classées par similarité (part des trigrammes de q retrouvés dans le nom), voir app/trigrammes.py.
+    """
+    return reponse_liste({"suggestions": suggerer_auteurs(db, q, limit)})
+ 
+@router.get("/export")
+def export_auteurs(format: str = "ndjson"):
+    """
+    Exporter tous les auteurs en streaming (sans leurs livres)
+    
+    - format: 'ndjson' (une ligne JSON par auteur) ou 'csv'
+    """
+    return exporter(select(*colonnes(Author, AuteurResume, version=False)).order_by(Author.id), format, "auteurs")
+
 @router.get("/{auteur_id}", response_model=AuteurGet)
-def get_auteur(db: Session = Depends(get_db), auteur_id: int = None):
-    auteur = db.query(Author).filter(Author.id == auteur_id).first()
+def get_auteur(request: Request, db: Session = Depends(get_db), auteur_id: int = None):
+    # Réponse déjà sérialisée si l'auteur est en cache
+    cle = cle_auteur(auteur_id)
+    reponse = reponses.lire(cle)
+    if reponse is not None:
+        return conditionnelle(request, reponse)
+    # Relevée avant la lecture : une invalidation pendant celle-ci annule la mise en cache
+    generation = reponses.generation(cle)
+    
+    # Auteur et livres en une seule requête (LEFT OUTER JOIN)
+    auteur = (
+        db.query(Author)
+        .options(joinedload(Author.livres))
+        .filter(Author.id == auteur_id)
+        .first()
+    )
     
     if not auteur:
         raise HTTPException(status_code=404, detail="Auteur non trouvé")
-    else:
-        return auteur
+    
+    entetes = entetes_auteur(auteur)
+    if non_modifie(request, entetes):
+        return pas_modifie(entetes)
+    return reponses.ecrire(cle, AuteurGet.model_validate(auteur), entetes, generation)
  
 @router.put("/{auteur_id}", response_model=AuteurGet)
 def update_auteur(
@@ -124,9 +257,16 @@ def update_auteur(
         auteur_base.date_naissance = auteur.date_naissance
     if auteur.nationalite is not None:
         auteur_base.nationalite = auteur.nationalite
+    
+    # Nom normalisé et trigrammes suivent le prénom et le nom
+    normalise = nom_normalise(auteur_base.prenom, auteur_base.nom)
+    if normalise != auteur_base.nom_normalise:
+        auteur_base.nom_normalise = normalise
+        indexer_auteurs(db, [(auteur_id, normalise)])
         
     db.commit()
     db.refresh(auteur_base)
+    reponses.invalider(cle_auteur(auteur_id))
     
     return auteur_base
 
@@ -146,9 +286,11 @@ def delete_auteur(auteur_id: int, db: Session = Depends(get_db)):
     nom_auteur = auteur_a_supprimer.nom
     
     try:
-        # Tentative de suppression
+        # Tentative de suppression (trigrammes et leurs comptes d'abord)
+        indexer_auteurs(db, [(auteur_id, "")])
         db.delete(auteur_a_supprimer)
         db.commit()
+        reponses.invalider(cle_auteur(auteur_id))
         
         return {
             "statut": "succès",
@@ -168,6 +310,28 @@ def delete_auteur(auteur_id: int, db: Session = Depends(get_db)):
             )
         )
 
+@router.post("/batch-get")
+def batch_get_auteurs(lot: LotIds, db: Session = Depends(get_db_lecture)):
+    """
+    Lire plusieurs auteurs (avec leurs livres) par id en un appel
+    
+    Corps: {"ids": [3, 1, 2]}. Renvoie {"auteurs": [...], "manquants": [...]},
+    dans l'ordre des ids demandés (doublons ignorés).
+    """
+    return lire_auteurs(db, lot.ids)
+
+@router.post("/bulk")
+async def bulk_auteurs(request: Request, db: Session = Depends(get_db)):
+    """
+    Importer des auteurs en masse
+    
+    Corps: tableau JSON d'auteurs, ou NDJSON (Content-Type: application/x-ndjson).
+    Renvoie le nombre d'auteurs insérés et la liste des lignes refusées.
+    """
+    lignes, erreurs = lire_lignes(await request.body(), request.headers.get("content-type", ""))
+    # Travail base de données hors de la boucle d'événements
+    return await run_in_threadpool(importer_auteurs, db, lignes, erreurs)
+
 @router.post("/add", response_model=AuteurGet)
 def create_auteur(
     auteur : AuteurCreate,
@@ -179,9 +343,12 @@ def create_auteur(
         nom=auteur.nom,
         date_naissance=auteur.date_naissance,
         nationalite=auteur.nationalite,
+        nom_normalise=nom_normalise(auteur.prenom, auteur.nom),
     )
     
     db.add(new_auteur)
+    db.flush()
+    indexer_auteurs(db, [(new_auteur.id, new_auteur.nom_normalise)], nouveaux=True)
     db.commit()
     db.refresh(new_auteur)
     
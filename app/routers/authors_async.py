@@ -0,0 +1,123 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import and_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from typing import Optional, Union
+from app.cache import cle_auteur, reponses
+from app.conditionnel import conditionnelle, non_modifie, pas_modifie
+from app.database import get_async_db
+from app.lots import charger_async, corps_en_cache, generations_en_cache, ids_uniques, lire_ids, reponse_lot, serialiser
+from app.models import Author
+from app.pagination import paginer_async
+from app.routers.authors import (
+    colonne_tri_auteurs, conditions_recherche_auteurs, entetes_auteur, entetes_auteurs, inclure_livres,
+    selection_auteurs, serialiser_auteurs
+)
+from app.serialisation import reponse_liste
+from app.schemas.author import AuteurGet, AuteurResume
+
+# Lectures des auteurs en mode async (DB_MODE=async).
+# Les écritures restent servies par app.routers.authors.
+router = APIRouter(
+    prefix="/authors",
+    tags=["Auteurs"]
+)
+
+
+async def lire_auteurs(db: AsyncSession, ids) -> Response:
+    """Auteurs demandés, dans l'ordre des ids, et ids manquants (voir la version sync)"""
+    ids = ids_uniques(ids)
+    corps = corps_en_cache(ids, cle_auteur)
+    absents = [id_ for id_ in ids if id_ not in corps]
+    generations = generations_en_cache(absents, cle_auteur)
+    lignes = await charger_async(db, Author, absents, selectinload(Author.livres))
+    serialiser(corps, lignes, AuteurGet, cle_auteur, entetes_auteur, generations)
+    return reponse_lot("auteurs", ids, corps)
+
+
+@router.get("/", response_model=list[Union[AuteurResume, AuteurGet]])
+async def get_auteur(
+    request: Request,
+    include: Optional[str] = None,
+    ids: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    if ids is not None:
+        return await lire_auteurs(db, lire_ids(ids))
+    
+    # Les relations ne peuvent pas être chargées paresseusement en async
+    avec_livres = inclure_livres(include)
+    query = select(*selection_auteurs(avec_livres))
+    if avec_livres:
+        query = query.options(selectinload(Author.livres))
+    result = await db.execute(query)
+    auteurs = result.scalars().all() if avec_livres else result.all()
+    
+    entetes = entetes_auteurs(auteurs, avec_livres)
+    if non_modifie(request, entetes):
+        return pas_modifie(entetes)
+    return reponse_liste(serialiser_auteurs(auteurs, avec_livres), entetes)
+
+@router.get("/search")
+async def search_authors(
+    request: Request,
+    page: int = 1,
+    page_size: int = 5,
+    nom: Optional[str] = None,
+    nationalite: Optional[str] = None,
+    sort_by: str = "nom",
+    order: str = "asc",
+    after: Optional[str] = None,
+    cursor: bool = False,
+    with_total: Optional[bool] = None,
+    include: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Recherche d'auteurs avec filtres et pagination (voir la version sync)"""
+    conditions = conditions_recherche_auteurs(nom, nationalite)
+    
+    avec_livres = inclure_livres(include)
+    
+    query = select(*selection_auteurs(avec_livres))
+    if conditions:
+        query = query.where(and_(*conditions))
+    if avec_livres:
+        query = query.options(selectinload(Author.livres))
+    
+    auteurs, pagination = await paginer_async(
+        db, query, colonne_tri_auteurs(sort_by), Author.id,
+        page, page_size, order, after, cursor, with_total
+    )
+    
+    entetes = entetes_auteurs(auteurs, avec_livres, pagination)
+    if non_modifie(request, entetes):
+        return pas_modifie(entetes)
+    return reponse_liste({
+        "auteurs" : serialiser_auteurs(auteurs, avec_livres),
+        **pagination,
+        "tri": {
+            "sort_by": sort_by,
+            "order": order
+        }
+    }, entetes)
+
+@router.get("/{auteur_id:int}", response_model=AuteurGet)
+async def get_auteur_par_id(auteur_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    cle = cle_auteur(auteur_id)
+    reponse = reponses.lire(cle)
+    if reponse is not None:
+        return conditionnelle(request, reponse)
+    generation = reponses.generation(cle)
+    
+    result = await db.execute(
+        select(Author).options(selectinload(Author.livres)).where(Author.id == auteur_id)
+    )
+    auteur = result.scalar_one_or_none()
+    
+    if not auteur:
+        raise HTTPException(status_code=404, detail="Auteur non trouvé")
+    
+    entetes = entetes_auteur(auteur)
+    if non_modifie(request, entetes):
+        return pas_modifie(entetes)
+    return reponses.ecrire(cle, AuteurGet.model_validate(auteur), entetes, generation)
@@ -1,9 +1,21 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from app.database import SessionLocal
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from collections import Counter
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session, contains_eager
+from sqlalchemy import and_, func, literal_column, select
+from app.bulk import importer_livres, lire_lignes
+from app.cache import cle_auteur, cle_livre, reponses
+from app.conditionnel import conditionnelle, non_modifie, pas_modifie, validateurs
+from app.database import get_db, get_db_lecture
+from app.lots import charger, corps_en_cache, generations_en_cache, ids_uniques, lire_ids, reponse_lot, serialiser
+from app.pagination import paginer
+from app.prefixes import titres
+from app.serialisation import colonnes, en_dicts, reponse_liste
+from app.stats import supprimer_historique
+from app import search
 from app.models import Book, Author
 from app.schemas.book import BookCreate, BookUpdate, BookGet, BookGet_All
+from app.schemas.lots import LotIds
 from typing import Optional
 
 router = APIRouter(
@@ -11,67 +23,48 @@ router = APIRouter(
     tags=["Livres"]
 )
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
+# Colonnes de tri directes (toutes indexées sauf annee_publication)
+COLONNES_TRI = {
+    "titre": Book.titre,
+    "annee_publication": Book.annee_publication,
+    "popularite": Book.popularite,
+}
 
-@router.get("/", response_model=BookGet_All)
-def get_books(
-    page: int = 1, 
-    page_size: int = 5,
-    sort_by: str = "titre",
-    order: str = "asc",
-    db: Session = Depends(get_db)
-):
+
+# Colonnes lues par les listes (sérialisation rapide, voir app/serialisation.py)
+COLONNES_LIVRE = colonnes(Book, BookGet)
+
+
+# Facettes de /books/search?facets=true : nom -> expression de regroupement
+FACETTES = {
+    "categorie": Book.categorie,
+    "langue": Book.langue,
+    "decennie": Book.annee_publication // 10 * 10,
+    "disponible": Book.nombre_exemplaires_disponibles > 0,
+}
+
+
+def tri_livres(query, sort_by: str, en_colonnes: bool = False):
     """
-    Récupérer la liste des livres avec pagination et tri
+    Préparer le tri des livres : renvoie (requête, colonne de tri, clé du curseur)
     
-    Paramètres:
-    - page: numéro de page (défaut: 1)
-    - page_size: nombre de livres par page (défaut: 5)
-    - sort_by: trier par 'titre', 'auteur', 'annee_publication' ou 'popularite' (défaut: titre)
-    - order: 'asc' (croissant) ou 'desc' (décroissant) (défaut: asc)
+    'auteur' trie par nom d'auteur via une jointure qui charge aussi l'auteur
+    (ou, pour une requête en colonnes, ajoute la colonne auteur_nom), ce qui
+    permet de lire la clé du curseur sans requête supplémentaire.
+    Un tri inconnu retombe sur l'id.
     """
-    # Pagination
-    offset = (page - 1) * page_size
-    query = db.query(Book)
-    
-    # Tri simple
-    if sort_by == "titre":
-        if order == "desc":
-            query = query.order_by(Book.titre.desc())
-        else:
-            query = query.order_by(Book.titre)
-    elif sort_by == "annee_publication":
-        if order == "desc":
-            query = query.order_by(Book.annee_publication.desc())
-        else:
-            query = query.order_by(Book.annee_publication)
-    
-    total = query.count()
-    
-    # Appliquer pagination
-    livres = query.offset(offset).limit(page_size).all()
-    
-    # Calculer les pages
-    pages = (total + page_size - 1) // page_size
-    
-    return {
-        "livres": livres,
-        "page_courante": page,
-        "taille_page": page_size,
-        "total": total,
-        "pages_totales": pages,
-    }
+    if sort_by == "auteur" and en_colonnes:
+        query = query.join(Book.auteur).add_columns(Author.nom.label("auteur_nom"))
+        return query, Author.nom, lambda ligne: (ligne.auteur_nom, ligne.id)
+    if sort_by == "auteur":
+        query = query.join(Book.auteur).options(contains_eager(Book.auteur))
+        return query, Author.nom, lambda livre: (livre.auteur.nom, livre.id)
+    return query, COLONNES_TRI.get(sort_by, Book.id), None
 
-@router.get("/search")
-def search_books(
-    page: int = 1,
-    page_size: int = 5,
+
+def recherche_livres(
+    query,
     titre: Optional[str] = None,
     auteur: Optional[str] = None,
     isbn: Optional[str] = None,
@@ -81,32 +74,40 @@ def search_books(
     annee_max: Optional[int] = None,
     langue: Optional[str] = None,
     disponible: Optional[bool] = None,
-    db: Session = Depends(get_db)
+    sort_by: str = "pertinence",
+    mode_curseur: bool = False,
+    en_colonnes: bool = False,
 ):
     """
-    Recherche avancée de livres avec filtres multiples (combinaison ET)
+    Appliquer les filtres de recherche à une Query ORM ou un select() de Book
     
-    Paramètres:
-    - titre: recherche partielle insensible à la casse
-    - auteur: recherche par nom/prénom (partielle)
-    - isbn: recherche exacte
-    - categorie: recherche exacte
-    - annee: année exacte
-    - annee_min/annee_max: plage d'années
-    - langue: recherche exacte
-    - disponible: True si disponible, False si non disponible
-    - page, page_size: pagination
+    Partagé par les modes sync et async. Renvoie (requête filtrée, colonne de tri, clé du curseur).
+    en_colonnes: la requête lit des colonnes (COLONNES_LIVRE) et non des objets Book.
+    Avec un index FTS5, titre et auteur passent par l'index plein texte ;
+    sort_by='pertinence' classe alors par score BM25 (mode page uniquement).
     """
     conditions = []
-    
-    if titre:
-        conditions.append(Book.titre(f"%{titre}%"))
+    query, colonne, cle = tri_livres(query, "titre" if sort_by == "pertinence" else sort_by, en_colonnes)
+    plein_texte = search.fts_actif()
+    
+    if titre and plein_texte and search.expression_fts(titre):
+        if sort_by == "pertinence" and not mode_curseur:
+            # La jointure filtre et fournit le score en une seule passe sur l'index
+            rang = search.rang_livres(titre)
+            query = query.join(rang, rang.c.rowid == Book.id)
+            colonne, cle = rang.c.rang, None
+        else:
+            conditions.append(Book.id.in_(search.ids_livres(titre)))
+    elif titre:
+        conditions.append(search.contient(Book.titre, titre))
     
     # Recherche par auteur (nom ou prénom)
-    if auteur:
+    if auteur and plein_texte and search.expression_fts(auteur):
+        conditions.append(Book.auteur_id.in_(search.ids_auteurs(auteur)))
+    elif auteur:
         conditions.append(
             Book.auteur.has(
-                Author.nom(f"%{auteur}%") | Author.prenom(f"%{auteur}%")
+                search.contient(Author.nom, auteur) | search.contient(Author.prenom, auteur)
             )
         )
     
@@ -142,34 +143,220 @@ def search_books(
             conditions.append(Book.nombre_exemplaires_disponibles == 0)
     
     # Combiner toutes les conditions avec ET
-    query = db.query(Book)
     if conditions:
         query = query.filter(and_(*conditions))
     
-    total = query.count()
-    
-    offset = (page - 1) * page_size
-    livres = query.offset(offset).limit(page_size).all()
-    
-    pages = (total + page_size - 1) // page_size
+    return query, colonne, cle
+
+
+def requete_facettes(*filtres):
+    """
+    Comptes des facettes sur l'ensemble filtré, en une seule requête groupée
     
+    filtres: titre, auteur, isbn, ... disponible, dans l'ordre de recherche_livres.
+    Une ligne par combinaison (categorie, langue, décennie, disponibilité)
+    présente : quelques centaines au plus, repliées par facettes().
+    """
+    # Regroupement par les alias : les expressions paramétrées (décennie,
+    # disponibilité) ne seraient pas reconnues identiques par PostgreSQL
+    query, _, _ = recherche_livres(
+        select(*(expression.label(nom) for nom, expression in FACETTES.items()), func.count()),
+        *filtres, sort_by="titre",
+    )
+    return query.group_by(*map(literal_column, FACETTES))
+
+
+def facettes(lignes) -> dict:
+    """Lignes de requete_facettes() -> {facette: [{valeur, nombre}]}, par nombre décroissant"""
+    comptes = {nom: Counter() for nom in FACETTES}
+    for *valeurs, nombre in lignes:
+        for nom, valeur in zip(FACETTES, valeurs):
+            comptes[nom][valeur] += nombre
     return {
-        "livres": livres,
-        "page_courante": page,
-        "taille_page": page_size,
-        "total": total,
-        "pages_totales": pages
+        nom: [
+            {"valeur": valeur, "nombre": nombre}
+            for valeur, nombre in sorted(compte.items(), key=lambda e: (-e[1], e[0]))
+        ]
+        for nom, compte in comptes.items()
     }
 
+
+def entetes_livre(livre) -> dict:
+    """Validateurs du détail d'un livre (stockés avec sa réponse en cache)"""
+    return validateurs([livre])
+
+
+def lire_livres(db: Session, ids) -> Response:
+    """Livres demandés, dans l'ordre des ids, et ids manquants (cache puis base)"""
+    ids = ids_uniques(ids)
+    corps = corps_en_cache(ids, cle_livre)
+    absents = [id_ for id_ in ids if id_ not in corps]
+    generations = generations_en_cache(absents, cle_livre)
+    lignes = charger(db, Book, absents)
+    serialiser(corps, lignes, BookGet, cle_livre, entetes_livre, generations)
+    return reponse_lot("livres", ids, corps)
+
+
+def page_livres(livres, pagination, request: Request, comptes: dict = None) -> Response:
+    """Réponse d'une page de livres lus en colonnes (304 si le client l'a déjà), avec ses facettes"""
+    extra = (pagination,) if comptes is None else (pagination, comptes)
+    entetes = validateurs(livres, *extra, last_modified=False, table=Book.__tablename__)
+    if non_modifie(request, entetes):
+        return pas_modifie(entetes)
+    contenu = {"livres": en_dicts(livres, BookGet), **pagination}
+    if comptes is not None:
+        contenu["facettes"] = comptes
+    return reponse_liste(contenu, entetes)
+
+
+@router.get("/", response_model=BookGet_All)
+def get_books(
+    request: Request,
+    page: int = 1, 
+    page_size: int = 5,
+    sort_by: str = "titre",
+    order: str = "asc",
+    after: Optional[str] = None,
+    cursor: bool = False,
+    with_total: Optional[bool] = None,
+    ids: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Récupérer la liste des livres avec pagination et tri
+    
+    Paramètres:
+    - page: numéro de page (défaut: 1)
+    - page_size: nombre de livres par page (défaut: 5)
+    - sort_by: trier par 'titre', 'auteur', 'annee_publication' ou 'popularite' (défaut: titre)
+    - order: 'asc' (croissant) ou 'desc' (décroissant) (défaut: asc)
+    - cursor / after: pagination par curseur, 'after' reçoit le 'next_cursor' de la page précédente
+    - with_total: calculer le total (défaut: oui en mode page, non en mode curseur)
+    - ids: '3,1,2' pour lire ces livres en un appel (voir POST /books/batch-get)
+    
+    Réponse avec ETag : If-None-Match renvoie 304 si la page n'a pas changé.
+    """
+    if ids is not None:
+        return lire_livres(db, lire_ids(ids))
+    
+    query, colonne, cle = tri_livres(db.query(*COLONNES_LIVRE), sort_by, en_colonnes=True)
+    livres, pagination = paginer(
+        query, colonne, Book.id, page, page_size, order, after, cursor, with_total, cle
+    )
+    return page_livres(livres, pagination, request)
+
+@router.get("/search")
+def search_books(
+    request: Request,
+    page: int = 1,
+    page_size: int = 5,
+    titre: Optional[str] = None,
+    auteur: Optional[str] = None,
+    isbn: Optional[str] = None,
+    categorie: Optional[str] = None,
+    annee: Optional[int] = None,
+    annee_min: Optional[int] = None,
+    annee_max: Optional[int] = None,
+    langue: Optional[str] = None,
+    disponible: Optional[bool] = None,
+    sort_by: str = "pertinence",
+    order: str = "asc",
+    after: Optional[str] = None,
+    cursor: bool = False,
+    with_total: Optional[bool] = None,
+    facets: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Recherche avancée de livres avec filtres multiples (combinaison ET)
+    
+    Paramètres:
+    - titre: recherche plein texte par mots ou débuts de mots, insensible à la casse et aux accents
+    - auteur: recherche par nom/prénom (mots ou débuts de mots)
+    - isbn: recherche exacte
+    - categorie: recherche exacte
+    - annee: année exacte
+    - annee_min/annee_max: plage d'années
+    - langue: recherche exacte
+    - disponible: True si disponible, False si non disponible
+    - sort_by / order: tri par 'pertinence' (défaut, si titre est fourni), 'titre', 'auteur',
+      'annee_publication' ou 'popularite'
+    - page, page_size: pagination
+    - cursor / after / with_total: pagination par curseur (voir GET /books/)
+    - facets: ajouter les comptes par categorie, langue, décennie et disponibilité
+      de l'ensemble filtré (une requête groupée de plus)
+    """
+    filtres = (titre, auteur, isbn, categorie, annee, annee_min, annee_max, langue, disponible)
+    query, colonne, cle = recherche_livres(
+        db.query(*COLONNES_LIVRE), *filtres, sort_by, mode_curseur=cursor or after is not None, en_colonnes=True
+    )
+    
+    livres, pagination = paginer(
+        query, colonne, Book.id, page, page_size, order, after, cursor, with_total, cle
+    )
+    comptes = facettes(db.execute(requete_facettes(*filtres))) if facets else None
+    return page_livres(livres, pagination, request, comptes)
+
+@router.get("/suggest")
+def suggest_books(q: str, limit: int = 10, db: Session = Depends(get_db)):
+    """
+    Autocomplétion des titres, sans accents ni casse
+    
+    - q: début d'un mot du titre, ou de plusieurs mots qui se suivent ("petit pr", "prince")
+    - limit: nombre de suggestions (défaut: 10, au plus 50)
+    
+    Classées par popularité, servies par un index en mémoire (voir app/prefixes.py).
+    """
+    # Attend la construction de démarrage si elle n'est pas finie
+    titres.assurer(db)
+    return reponse_liste({"suggestions": titres.suggerer(q, limit)})
+
+@router.post("/batch-get")
+def batch_get_books(lot: LotIds, db: Session = Depends(get_db_lecture)):
+    """
+    Lire plusieurs livres par id en un appel
+    
+    Corps: {"ids": [3, 1, 2]}. Renvoie {"livres": [...], "manquants": [...]},
+    les livres dans l'ordre des ids demandés (doublons ignorés).
+    """
+    return lire_livres(db, lot.ids)
+
+@router.post("/bulk")
+async def bulk_books(request: Request, db: Session = Depends(get_db)):
+    """
+    Importer des livres en masse
+    
+    Corps: tableau JSON de livres, ou NDJSON (Content-Type: application/x-ndjson).
+    Renvoie le nombre de livres insérés et la liste des lignes refusées.
+    """
+    lignes, erreurs = lire_lignes(await request.body(), request.headers.get("content-type", ""))
+    # Travail base de données hors de la boucle d'événements
+    rapport = await run_in_threadpool(importer_livres, db, lignes, erreurs)
+    # Le détail des auteurs concernés liste leurs livres
+    reponses.invalider(*{
+        cle_auteur(ligne.get("auteur_id")) for _, ligne in lignes if isinstance(ligne, dict)
+    })
+    return rapport
+
 @router.get("/{livre_id}", response_model=BookGet)
-def get_book(livre_id: int, db: Session = Depends(get_db)):
-    """Récupérer les détails d'un livre"""
+def get_book(livre_id: int, request: Request, db: Session = Depends(get_db)):
+    """Récupérer les détails d'un livre (servi depuis le cache si possible, 304 si inchangé)"""
+    cle = cle_livre(livre_id)
+    reponse = reponses.lire(cle)
+    if reponse is not None:
+        return conditionnelle(request, reponse)
+    # Relevée avant la lecture : une invalidation pendant celle-ci annule la mise en cache
+    generation = reponses.generation(cle)
+    
     livre = db.query(Book).filter(Book.id == livre_id).first()
     
     if not livre:
         raise HTTPException(status_code=404, detail="Livre non trouvé")
     
-    return livre
+    entetes = entetes_livre(livre)
+    if non_modifie(request, entetes):
+        return pas_modifie(entetes)
+    return reponses.ecrire(cle, BookGet.model_validate(livre), entetes, generation)
 
 @router.post("/add", response_model=BookGet)
 def create_book(
@@ -211,6 +398,8 @@ def create_book(
     db.add(new_livre)
     db.commit()
     db.refresh(new_livre)
+    reponses.invalider(cle_auteur(new_livre.auteur_id))
+    titres.ecrire(new_livre.id, new_livre.titre, new_livre.popularite)
     
     return new_livre
 
@@ -226,12 +415,14 @@ def update_book(
     if not livre:
         raise HTTPException(status_code=404, detail="Livre non trouvé")
     
+    ancien_auteur_id = livre.auteur_id
+    
     # Si on change l'auteur, vérifier qu'il existe
-    if livre_id is not None:
-        auteur = db.query(Author).filter(Author.id == livre.auteur_id).first()
+    if book.auteur_id is not None:
+        auteur = db.query(Author).filter(Author.id == book.auteur_id).first()
         if not auteur:
-            raise HTTPException(status_code=404, detail=f"Auteur avec l'ID {livre.auteur_id} non trouvé")
-        livre.auteur_id = livre.auteur_id
+            raise HTTPException(status_code=404, detail=f"Auteur avec l'ID {book.auteur_id} non trouvé")
+        livre.auteur_id = book.auteur_id
     
     # Mise à jour des champs
     if book.titre is not None:
@@ -268,6 +459,8 @@ def update_book(
     
     db.commit()
     db.refresh(livre)
+    reponses.invalider(cle_livre(livre_id), cle_auteur(ancien_auteur_id), cle_auteur(livre.auteur_id))
+    titres.ecrire(livre_id, livre.titre, livre.popularite)
     
     return livre
 
@@ -279,9 +472,15 @@ def delete_book(livre_id: int, db: Session = Depends(get_db)):
     if not livre:
         raise HTTPException(status_code=404, detail="Livre non trouvé")
     
+    auteur_id = livre.auteur_id
+    
     try:
+        # Annulé avec le reste si le livre a encore des emprunts
+        supprimer_historique(db, livre_id)
         db.delete(livre)
         db.commit()
+        reponses.invalider(cle_livre(livre_id), cle_auteur(auteur_id))
+        titres.retirer(livre_id)
         return {
             "statut": "succès",
             "message": f"Livre {livre_id} supprimé avec succès"
@@ -0,0 +1,109 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import Optional
+from app.cache import cle_livre, reponses
+from app.conditionnel import conditionnelle, non_modifie, pas_modifie
+from app.database import get_async_db
+from app.lots import charger_async, corps_en_cache, generations_en_cache, ids_uniques, lire_ids, reponse_lot, serialiser
+from app.models import Book
+from app.pagination import paginer_async
+from app.routers.book import (
+    COLONNES_LIVRE, entetes_livre, facettes, page_livres, recherche_livres, requete_facettes, tri_livres
+)
+from app.schemas.book import BookGet, BookGet_All
+
+# Lectures des livres en mode async (DB_MODE=async).
+# Les écritures restent servies par app.routers.book.
+router = APIRouter(
+    prefix="/books",
+    tags=["Livres"]
+)
+
+
+async def lire_livres(db: AsyncSession, ids) -> Response:
+    """Livres demandés, dans l'ordre des ids, et ids manquants (voir la version sync)"""
+    ids = ids_uniques(ids)
+    corps = corps_en_cache(ids, cle_livre)
+    absents = [id_ for id_ in ids if id_ not in corps]
+    generations = generations_en_cache(absents, cle_livre)
+    lignes = await charger_async(db, Book, absents)
+    serialiser(corps, lignes, BookGet, cle_livre, entetes_livre, generations)
+    return reponse_lot("livres", ids, corps)
+
+
+@router.get("/", response_model=BookGet_All)
+async def get_books(
+    request: Request,
+    page: int = 1, 
+    page_size: int = 5,
+    sort_by: str = "titre",
+    order: str = "asc",
+    after: Optional[str] = None,
+    cursor: bool = False,
+    with_total: Optional[bool] = None,
+    ids: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Récupérer la liste des livres avec pagination et tri (voir la version sync)"""
+    if ids is not None:
+        return await lire_livres(db, lire_ids(ids))
+    
+    query, colonne, cle = tri_livres(select(*COLONNES_LIVRE), sort_by, en_colonnes=True)
+    livres, pagination = await paginer_async(
+        db, query, colonne, Book.id, page, page_size, order, after, cursor, with_total, cle
+    )
+    return page_livres(livres, pagination, request)
+
+@router.get("/search")
+async def search_books(
+    request: Request,
+    page: int = 1,
+    page_size: int = 5,
+    titre: Optional[str] = None,
+    auteur: Optional[str] = None,
+    isbn: Optional[str] = None,
+    categorie: Optional[str] = None,
+    annee: Optional[int] = None,
+    annee_min: Optional[int] = None,
+    annee_max: Optional[int] = None,
+    langue: Optional[str] = None,
+    disponible: Optional[bool] = None,
+    sort_by: str = "pertinence",
+    order: str = "asc",
+    after: Optional[str] = None,
+    cursor: bool = False,
+    with_total: Optional[bool] = None,
+    facets: bool = False,
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Recherche avancée de livres (voir la version sync)"""
+    filtres = (titre, auteur, isbn, categorie, annee, annee_min, annee_max, langue, disponible)
+    query, colonne, cle = recherche_livres(
+        select(*COLONNES_LIVRE), *filtres, sort_by, mode_curseur=cursor or after is not None, en_colonnes=True
+    )
+    
+    livres, pagination = await paginer_async(
+        db, query, colonne, Book.id, page, page_size, order, after, cursor, with_total, cle
+    )
+    comptes = facettes(await db.execute(requete_facettes(*filtres))) if facets else None
+    return page_livres(livres, pagination, request, comptes)
+
+@router.get("/{livre_id:int}", response_model=BookGet)
+async def get_book(livre_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Récupérer les détails d'un livre (servi depuis le cache si possible, 304 si inchangé)"""
+    cle = cle_livre(livre_id)
+    reponse = reponses.lire(cle)
+    if reponse is not None:
+        return conditionnelle(request, reponse)
+    generation = reponses.generation(cle)
+    
+    livre = await db.get(Book, livre_id)
+    
+    if not livre:
+        raise HTTPException(status_code=404, detail="Livre non trouvé")
+    
+    entetes = entetes_livre(livre)
+    if non_modifie(request, entetes):
+        return pas_modifie(entetes)
+    return reponses.ecrire(cle, BookGet.model_validate(livre), entetes, generation)
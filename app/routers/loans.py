@@ -1,34 +1,129 @@
-from fastapi import APIRouter, Depends, HTTPException, Body
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Body, Request, Response
+from sqlalchemy import select
+from sqlalchemy.orm import Session, joinedload
 from typing import Optional, List
-from app.models import Session as SessionLocal, Loan, Book
+from datetime import date
+from app.cache import cle_auteur, cle_livre, reponses
+from app.conditionnel import non_modifie, pas_modifie, validateurs
+from app.database import get_db, get_db_lecture
+from app.export import exporter
+from app.lots import charger, ids_uniques, lire_ids, reponse_lot, serialiser
+from app.pagination import paginer
+from app.serialisation import colonnes, en_dicts, reponse_liste
+from app.retards import ACTIF, EN_RETARD, en_retard
+from app.stock import RETOURNE, clore, emprunter, liberer, retourner
+from app.models import Loan, Book
 from app.schemas.loans import LoansCreate, LoansUpdate, LoansGet
+from app.schemas.lots import LotIds
 
 router = APIRouter(
     prefix="/loans",
     tags=["Emprunts"]
 )
- 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
- 
+
+def invalider_livre(db: Session, livre_id: int):
+    """Le stock et la popularité du livre ont changé : son détail et celui de son auteur sont périmés"""
+    auteur_id = db.scalar(select(Book.auteur_id).where(Book.id == livre_id))
+    reponses.invalider(cle_livre(livre_id), cle_auteur(auteur_id))
+
+
+# Colonnes lues par les listes (sérialisation rapide, voir app/serialisation.py) :
+# email_emprunteur n'y est pas revalidé par EmailStr à chaque lecture
+COLONNES_EMPRUNT = colonnes(Loan, LoansGet)
+
+
+def liste_emprunts(emprunts, request: Request, *extra, envelopper=None) -> Response:
+    """Réponse d'une liste d'emprunts lus en colonnes (304 si le client l'a déjà)"""
+    entetes = validateurs(emprunts, *extra, last_modified=False, table=Loan.__tablename__)
+    if non_modifie(request, entetes):
+        return pas_modifie(entetes)
+    contenu = en_dicts(emprunts, LoansGet)
+    return reponse_liste(envelopper(contenu) if envelopper else contenu, entetes)
+
+
+def lire_emprunts(db: Session, ids) -> Response:
+    """Emprunts demandés, dans l'ordre des ids, et ids manquants (les emprunts ne sont pas en cache)"""
+    ids = ids_uniques(ids)
+    corps = serialiser({}, charger(db, Loan, ids), LoansGet)
+    return reponse_lot("emprunts", ids, corps)
+
+
 @router.get("/", response_model=List[LoansGet])
-def get_emprunt(db: Session = Depends(get_db)):
+def get_emprunt(
+    request: Request,
+    ids: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Lister les emprunts
+    
+    - ids: '3,1,2' pour lire ces emprunts en un appel (voir POST /loans/batch-get)
+    """
+    if ids is not None:
+        return lire_emprunts(db, lire_ids(ids))
+    
     # Recherche des emprunts dans la base
-    emprunt = db.query(Loan).all()
-    return emprunt
+    return liste_emprunts(db.query(*COLONNES_EMPRUNT).all(), request)
+
+@router.post("/batch-get")
+def batch_get_emprunts(lot: LotIds, db: Session = Depends(get_db_lecture)):
+    """
+    Lire plusieurs emprunts par id en un appel
+    
+    Corps: {"ids": [3, 1, 2]}. Renvoie {"emprunts": [...], "manquants": [...]},
+    dans l'ordre des ids demandés (doublons ignorés).
+    """
+    return lire_emprunts(db, lot.ids)
+
+@router.get("/export")
+def export_emprunts(format: str = "ndjson"):
+    """
+    Exporter tous les emprunts en streaming
+    
+    - format: 'ndjson' (une ligne JSON par emprunt) ou 'csv'
+    """
+    return exporter(select(*colonnes(Loan, LoansGet, version=False)).order_by(Loan.id), format, "emprunts")
+
+@router.get("/overdue")
+def get_emprunts_en_retard(
+    request: Request,
+    page: int = 1,
+    page_size: int = 20,
+    after: Optional[str] = None,
+    cursor: bool = False,
+    with_total: Optional[bool] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Emprunts en retard, du plus ancien au plus récent (date limite croissante)
+    
+    Inclut les emprunts échus que la tâche de fond n'a pas encore marqués.
+    - page, page_size / cursor, after, with_total: pagination (voir GET /books/)
+    """
+    emprunts, pagination = paginer(
+        db.query(*COLONNES_EMPRUNT).filter(en_retard()), Loan.date_limite_retour, Loan.id,
+        page, page_size, "asc", after, cursor, with_total
+    )
+    return liste_emprunts(
+        emprunts, request, pagination, envelopper=lambda contenu: {"emprunts": contenu, **pagination}
+    )
 
 @router.get("/{emprunt_id}", response_model=LoansGet)
-def get_emprunt(db: Session = Depends(get_db), emprunt_id: int = None):
+def get_emprunt(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db),
+    emprunt_id: int = None
+):
     emprunt = db.query(Loan).filter(Loan.id == emprunt_id).first()
     
     if not emprunt:
         raise HTTPException(status_code=404, detail="Emprunt non trouvé")
     
+    entetes = validateurs([emprunt])
+    if non_modifie(request, entetes):
+        return pas_modifie(entetes)
+    response.headers.update(entetes)
     return emprunt
  
 @router.put("/{emprunt_id}", response_model=LoansGet)
@@ -44,6 +139,14 @@ def update_emprunt(
     if emprunt_base is None:
         raise HTTPException(status_code=404, detail=f"Aucun emprunt trouvé avec l'id : {emprunt_id}")
 
+    # Les changements de statut touchent au stock : ils passent par app/stock.py
+    retour = emprunt.statut == RETOURNE and emprunt_base.statut != RETOURNE
+    if emprunt_base.statut == RETOURNE and emprunt.statut not in (None, RETOURNE):
+        raise HTTPException(
+            status_code=409,
+            detail="Un emprunt retourné ne peut pas être réactivé, créez un nouvel emprunt"
+        )
+
     # Mise à jour de l'emprunt
     if emprunt.nom_emprunteur is not None:
         emprunt_base.nom_emprunteur = emprunt.nom_emprunteur
@@ -55,22 +158,52 @@ def update_emprunt(
         emprunt_base.date_emprunt = emprunt.date_emprunt
     if emprunt.date_limite_retour is not None:
         emprunt_base.date_limite_retour = emprunt.date_limite_retour
-    if emprunt.date_retour_effectif is not None:
+        # Date limite repoussée (toujours dans le futur) : l'emprunt n'est plus en retard
+        if emprunt_base.statut == EN_RETARD and emprunt.statut is None:
+            emprunt_base.statut = ACTIF
+    if emprunt.date_retour_effectif is not None and not retour:
         emprunt_base.date_retour_effectif = emprunt.date_retour_effectif
-    if emprunt.statut is not None:
+    if emprunt.statut is not None and not retour:
         emprunt_base.statut = emprunt.statut
     if emprunt.commentaires is not None:
         emprunt_base.commentaires = emprunt.commentaires
 
+    if retour:
+        # Champs et retour dans une seule transaction : un retour refusé les annule aussi
+        db.flush()
+        clore(db, emprunt_id, emprunt.date_retour_effectif)
+
     db.commit()
     db.refresh(emprunt_base)
+    if retour:
+        invalider_livre(db, emprunt_base.livre_id)
 
     return emprunt_base
+
+@router.post("/{emprunt_id}/retour", response_model=LoansGet)
+def retour_emprunt(
+    emprunt_id: int,
+    date_retour: Optional[date] = Body(None, embed=True),
+    db: Session = Depends(get_db)
+):
+    """
+    Retourner un emprunt : statut 'Retourné' et un exemplaire rendu au stock
+    
+    - date_retour: date de retour effective (défaut: aujourd'hui)
+    """
+    emprunt = retourner(db, emprunt_id, date_retour)
+    invalider_livre(db, emprunt.livre_id)
+    return emprunt
     
 @router.delete("/{emprunt_id}")
 def delete_emprunt(emprunt_id: int, db: Session = Depends(get_db)):
     # Localisation de l'emprunt
-    emprunt_a_supprimer = db.query(Loan).filter(Loan.id == emprunt_id).first()
+    emprunt_a_supprimer = (
+        db.query(Loan)
+        .options(joinedload(Loan.livre))
+        .filter(Loan.id == emprunt_id)
+        .first()
+    )
     
     if not emprunt_a_supprimer:
         raise HTTPException(
@@ -78,13 +211,20 @@ def delete_emprunt(emprunt_id: int, db: Session = Depends(get_db)):
             detail=f"L'emprunt avec l'ID {emprunt_id} est introuvable"
         )
     
-    # Conservation du nom pour le message de confirmation
-    emprunt = emprunt_a_supprimer.livre
+    # Conservation du titre pour le message de confirmation (livre déjà chargé)
+    emprunt = emprunt_a_supprimer.livre.titre if emprunt_a_supprimer.livre else emprunt_id
+    # Clés de cache lues avant le commit, qui expire les objets chargés
+    livre = emprunt_a_supprimer.livre
+    cles = [cle_livre(livre.id), cle_auteur(livre.auteur_id)] if livre else []
+    actif = emprunt_a_supprimer.statut != RETOURNE
     
     try:
-        # Tentative de suppression
+        # Tentative de suppression, l'exemplaire d'un emprunt actif est rendu
+        liberer(db, emprunt_a_supprimer)
         db.delete(emprunt_a_supprimer)
         db.commit()
+        if actif:
+            reponses.invalider(*cles)
         
         return {
             "statut": "succès",
@@ -109,21 +249,12 @@ def create_emprunt(
     emprunt: LoansCreate,
     db: Session = Depends(get_db)
 ):
-    """Ajouter un nouvel emprunt"""
-    new_emprunt = Loan(
-        nom_emprunteur=emprunt.nom_emprunteur,
-        email_emprunteur=emprunt.email_emprunteur,
-        numero_carte_bibliotheque=emprunt.numero_carte_bibliotheque,
-        date_emprunt=emprunt.date_emprunt,
-        date_limite_retour=emprunt.date_limite_retour,
-        date_retour_effectif=emprunt.date_retour_effectif,
-        statut=emprunt.statut,
-        commentaires=emprunt.commentaires,
-        livre_id=emprunt.livre_id,
-    )
-
-    db.add(new_emprunt)
-    db.commit()
-    db.refresh(new_emprunt)
-
-    return new_emprunt
\ No newline at end of file
+    """
+    Ajouter un nouvel emprunt
+    
+    Un exemplaire du livre est réservé dans la même transaction ;
+    409 si plus aucun exemplaire n'est disponible.
+    """
+    nouvel_emprunt = emprunter(db, emprunt)
+    invalider_livre(db, nouvel_emprunt.livre_id)
+    return nouvel_emprunt
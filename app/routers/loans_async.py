@@ -0,0 +1,55 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.conditionnel import non_modifie, pas_modifie, validateurs
+from app.database import get_async_db
+from app.lots import charger_async, ids_uniques, lire_ids, reponse_lot, serialiser
+from app.models import Loan
+from app.routers.loans import COLONNES_EMPRUNT, liste_emprunts
+from app.schemas.loans import LoansGet
+
+# Lectures des emprunts en mode async (DB_MODE=async).
+# Les écritures restent servies par app.routers.loans.
+router = APIRouter(
+    prefix="/loans",
+    tags=["Emprunts"]
+)
+
+
+async def lire_emprunts(db: AsyncSession, ids) -> Response:
+    """Emprunts demandés, dans l'ordre des ids, et ids manquants (voir la version sync)"""
+    ids = ids_uniques(ids)
+    corps = serialiser({}, await charger_async(db, Loan, ids), LoansGet)
+    return reponse_lot("emprunts", ids, corps)
+
+
+@router.get("/", response_model=List[LoansGet])
+async def get_emprunts(
+    request: Request,
+    ids: Optional[str] = None,
+    db: AsyncSession = Depends(get_async_db)
+):
+    if ids is not None:
+        return await lire_emprunts(db, lire_ids(ids))
+    
+    result = await db.execute(select(*COLONNES_EMPRUNT))
+    return liste_emprunts(result.all(), request)
+
+@router.get("/{emprunt_id:int}", response_model=LoansGet)
+async def get_emprunt(
+    emprunt_id: int,
+    request: Request,
+    response: Response,
+    db: AsyncSession = Depends(get_async_db)
+):
+    emprunt = await db.get(Loan, emprunt_id)
+    
+    if not emprunt:
+        raise HTTPException(status_code=404, detail="Emprunt non trouvé")
+    
+    entetes = validateurs([emprunt])
+    if non_modifie(request, entetes):
+        return pas_modifie(entetes)
+    response.headers.update(entetes)
+    return emprunt
@@ -0,0 +1,7 @@
+from pydantic import BaseModel, Field
+from app import config
+
+
+class LotIds(BaseModel):
+    """Corps des endpoints POST /batch-get"""
+    ids: list[int] = Field(..., max_length=config.BATCH_GET_MAX_IDS)
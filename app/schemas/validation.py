@@ -0,0 +1,134 @@
+from datetime import date
+from typing import Annotated
+from pydantic import AfterValidator, StringConstraints
+
+# ===============================
+# Validation partagée des schémas
+# ===============================
+#
+# Types Annotated réutilisés par les schémas de création et de mise à jour :
+# les contraintes simples (espaces retirés, longueur, majuscules) sont
+# appliquées par pydantic-core, seules les vérifications métier (clé ISBN,
+# code pays, dates) appellent du Python. Dans un Optional[...], la
+# validation n'est pas appelée pour None.
+#
+# Les tables de référence sont des frozenset construits une fois à l'import.
+
+# ISO 3166-1 alpha-2 : les 249 codes officiellement attribués
+CODES_PAYS = frozenset("""
+    AD AE AF AG AI AL AM AO AQ AR AS AT AU AW AX AZ
+    BA BB BD BE BF BG BH BI BJ BL BM BN BO BQ BR BS BT BV BW BY BZ
+    CA CC CD CF CG CH CI CK CL CM CN CO CR CU CV CW CX CY CZ
+    DE DJ DK DM DO DZ
+    EC EE EG EH ER ES ET
+    FI FJ FK FM FO FR
+    GA GB GD GE GF GG GH GI GL GM GN GP GQ GR GS GT GU GW GY
+    HK HM HN HR HT HU
+    ID IE IL IM IN IO IQ IR IS IT
+    JE JM JO JP
+    KE KG KH KI KM KN KP KR KW KY KZ
+    LA LB LC LI LK LR LS LT LU LV LY
+    MA MC MD ME MF MG MH MK ML MM MN MO MP MQ MR MS MT MU MV MW MX MY MZ
+    NA NC NE NF NG NI NL NO NP NR NU NZ
+    OM
+    PA PE PF PG PH PK PL PM PN PR PS PT PW PY
+    QA
+    RE RO RS RU RW
+    SA SB SC SD SE SG SH SI SJ SK SL SM SN SO SR SS ST SV SX SY SZ
+    TC TD TF TG TH TJ TK TL TM TN TO TR TT TV TW TZ
+    UA UG UM US UY UZ
+    VA VC VE VG VI VN VU
+    WF WS
+    YE YT
+    ZA ZM ZW
+""".split())
+
+# Codes hors ISO acceptés par les versions précédentes de l'API ("EN" pour l'Angleterre)
+CODES_PAYS_HISTORIQUES = frozenset({"EN"})
+
+CODES_NATIONALITE = CODES_PAYS | CODES_PAYS_HISTORIQUES
+
+ANNEE_PUBLICATION_MIN = 1950
+
+# Valeurs des caractères de l'ISBN-10
+_VALEURS_ISBN10 = {**{str(chiffre): chiffre for chiffre in range(10)}, "X": 10}
+
+
+# ===============================
+# Vérifications
+# ===============================
+
+
+def isbn_valide(isbn: str) -> bool:
+    """ISBN-10 ou ISBN-13 (tirets et espaces ignorés) dont la clé de contrôle est correcte"""
+    chiffres = isbn.replace("-", "").replace(" ", "").upper()
+    if len(chiffres) == 13 and chiffres.isascii() and chiffres.isdigit():
+        # Poids 1, 3, 1, 3... sommés sur les codes ASCII : chaque chiffre vaut
+        # son code moins 48, soit 48 x (7 + 3 x 6) à retrancher
+        octets = chiffres.encode()
+        return (sum(octets[0::2]) + 3 * sum(octets[1::2]) - 48 * 25) % 10 == 0
+    if len(chiffres) == 10 and chiffres[:9].isascii() and chiffres[:9].isdigit() and chiffres[9] in _VALEURS_ISBN10:
+        return sum(_VALEURS_ISBN10[c] * (10 - i) for i, c in enumerate(chiffres)) % 11 == 0
+    return False
+
+
+def isbn13(douze_chiffres: str) -> str:
+    """Compléter 12 chiffres par leur clé de contrôle ISBN-13"""
+    somme = sum(map(int, douze_chiffres[0::2])) + 3 * sum(map(int, douze_chiffres[1::2]))
+    return douze_chiffres + str(-somme % 10)
+
+
+def _isbn(v: str) -> str:
+    if not isbn_valide(v):
+        raise ValueError("ISBN invalide : 10 ou 13 chiffres (tirets optionnels) avec une clé de contrôle correcte")
+    return v
+
+
+def _code_pays(v: str) -> str:
+    if v not in CODES_NATIONALITE:
+        raise ValueError(f"Code pays invalide: {v} (code ISO 3166-1 alpha-2 attendu, ex: FR, BE, CA)")
+    return v
+
+
+def _pas_dans_le_futur(v: date) -> date:
+    if v > date.today():
+        raise ValueError("Date ne peut pas être dans le futur")
+    return v
+
+
+def _pas_dans_le_passe(v: date) -> date:
+    if v < date.today():
+        raise ValueError("La date limite de retour doit être dans le futur")
+    return v
+
+
+def _annee_publication(v: int) -> int:
+    annee_actuelle = date.today().year
+    if v < ANNEE_PUBLICATION_MIN or v > annee_actuelle:
+        raise ValueError(
+            f"L'année de publication doit être comprise entre {ANNEE_PUBLICATION_MIN} et {annee_actuelle}"
+        )
+    return v
+
+
+# ===============================
+# Types réutilisables
+# ===============================
+
+# Chaîne sans espaces autour, non vide une fois nettoyée (longueur max via Field)
+TexteNonVide = Annotated[str, StringConstraints(strip_whitespace=True, min_length=1)]
+
+Isbn = Annotated[str, StringConstraints(strip_whitespace=True, min_length=10, max_length=17), AfterValidator(_isbn)]
+
+# Code pays, normalisé en majuscules
+CodePays = Annotated[
+    str, StringConstraints(strip_whitespace=True, to_upper=True, min_length=2, max_length=2), AfterValidator(_code_pays)
+]
+
+AnneePublication = Annotated[int, AfterValidator(_annee_publication)]
+
+# Date de naissance, date d'emprunt
+DatePassee = Annotated[date, AfterValidator(_pas_dans_le_futur)]
+
+# Date limite de retour
+DateFuture = Annotated[date, AfterValidator(_pas_dans_le_passe)]
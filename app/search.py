@@ -0,0 +1,242 @@
+import re
+from sqlalchemy import Column, Integer, MetaData, String, Table, func, literal_column, select, text
+from app.models import Author, Book
+
+# ===============================
+# Recherche plein texte (SQLite FTS5, PostgreSQL tsvector)
+# ===============================
+#
+# book_fts et author_fts sont des index FTS5 à contenu externe : ils ne
+# stockent que l'index inversé, le texte reste dans book/author. Des
+# triggers les tiennent à jour à chaque INSERT/UPDATE/DELETE, y compris
+# pour les écritures faites hors de l'ORM.
+#
+# Tokenizer unicode61 avec remove_diacritics=2 : "Celine" trouve "Céline",
+# la casse est ignorée. Les index de préfixes (2 et 3 caractères) rendent
+# les requêtes "term*" aussi rapides qu'une recherche de mot entier.
+#
+# Sur PostgreSQL, des index GIN sur to_tsvector('simple', ...) jouent le
+# même rôle (préfixes 'mot':*, classement ts_rank) ; la casse est ignorée,
+# pas les accents (unaccent n'est pas utilisable dans un index).
+# Ailleurs, ou sans index installés, la recherche retombe sur ILIKE.
+
+# Tables déclarées hors de Base.metadata : create_all ne doit pas les créer
+_fts_metadata = MetaData()
+
+book_fts = Table(
+    "book_fts", _fts_metadata,
+    Column("rowid", Integer),
+    Column("titre", String),
+)
+
+author_fts = Table(
+    "author_fts", _fts_metadata,
+    Column("rowid", Integer),
+    Column("prenom", String),
+    Column("nom", String),
+)
+
+_TOKENIZE = "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3'"
+
+FTS_DDL = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS book_fts USING fts5(
+        titre, content='book', content_rowid='id', {_TOKENIZE})""",
+    """CREATE TRIGGER IF NOT EXISTS book_fts_ai AFTER INSERT ON book BEGIN
+        INSERT INTO book_fts(rowid, titre) VALUES (new.id, new.titre);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS book_fts_ad AFTER DELETE ON book BEGIN
+        INSERT INTO book_fts(book_fts, rowid, titre) VALUES ('delete', old.id, old.titre);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS book_fts_au AFTER UPDATE OF titre ON book BEGIN
+        INSERT INTO book_fts(book_fts, rowid, titre) VALUES ('delete', old.id, old.titre);
+        INSERT INTO book_fts(rowid, titre) VALUES (new.id, new.titre);
+    END""",
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS author_fts USING fts5(
+        prenom, nom, content='author', content_rowid='id', {_TOKENIZE})""",
+    """CREATE TRIGGER IF NOT EXISTS author_fts_ai AFTER INSERT ON author BEGIN
+        INSERT INTO author_fts(rowid, prenom, nom) VALUES (new.id, new.prenom, new.nom);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS author_fts_ad AFTER DELETE ON author BEGIN
+        INSERT INTO author_fts(author_fts, rowid, prenom, nom) VALUES ('delete', old.id, old.prenom, old.nom);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS author_fts_au AFTER UPDATE OF prenom, nom ON author BEGIN
+        INSERT INTO author_fts(author_fts, rowid, prenom, nom) VALUES ('delete', old.id, old.prenom, old.nom);
+        INSERT INTO author_fts(rowid, prenom, nom) VALUES (new.id, new.prenom, new.nom);
+    END""",
+]
+
+# Configuration de recherche PostgreSQL : découpage en mots, sans racinisation
+_PG_CONFIG = literal_column("'simple'")
+
+# Expressions indexées : les requêtes doivent les reproduire à l'identique
+_PG_TSV_LIVRE = "to_tsvector('simple', titre)"
+_PG_TSV_AUTEUR = "to_tsvector('simple', prenom || ' ' || nom)"
+
+PG_DDL = [
+    f"CREATE INDEX IF NOT EXISTS ix_book_titre_tsv ON book USING gin ({_PG_TSV_LIVRE})",
+    f"CREATE INDEX IF NOT EXISTS ix_author_nom_tsv ON author USING gin ({_PG_TSV_AUTEUR})",
+]
+
+# Dialecte des index installés sur la base courante ("sqlite", "postgresql"),
+# False sans index ; None tant que ce n'est pas vérifié (à la première
+# recherche, sans DDL)
+_fts_actif = None
+
+
+def _fts5_compile(conn) -> bool:
+    options = {row[0] for row in conn.execute(text("PRAGMA compile_options"))}
+    return "ENABLE_FTS5" in options
+
+
+def installer_fts(conn) -> bool:
+    """
+    Créer les index plein texte sur une connexion (idempotent)
+
+    SQLite : tables FTS5 et triggers, reconstruits depuis book/author sur une
+    base existante. PostgreSQL : index GIN. Renvoie False pour les autres
+    bases ou si FTS5 n'est pas compilé : la recherche retombe alors sur ILIKE.
+    Utilisé par install_fts (DB_CREATE_SCHEMA, benchmarks) ; la migration Alembic 0005
+    en garde sa propre copie.
+    """
+    if conn.dialect.name == "postgresql":
+        for ddl in PG_DDL:
+            conn.execute(text(ddl))
+        return True
+    if conn.dialect.name != "sqlite" or not _fts5_compile(conn):
+        return False
+
+    existants = set(conn.execute(text(
+        "SELECT name FROM sqlite_master WHERE name IN ('book_fts', 'author_fts')"
+    )).scalars())
+    for ddl in FTS_DDL:
+        conn.execute(text(ddl))
+    for table in ("book_fts", "author_fts"):
+        if table not in existants:
+            conn.execute(text(f"INSERT INTO {table}({table}) VALUES ('rebuild')"))
+    return True
+
+
+def install_fts(engine) -> bool:
+    """Installer les index plein texte sur la base de l'engine (voir installer_fts)"""
+    global _fts_actif
+    with engine.begin() as conn:
+        _fts_actif = installer_fts(conn) and engine.dialect.name
+    return bool(_fts_actif)
+
+
+# Présence des index : une lecture du catalogue, aucun DDL
+_DETECTION = {
+    "sqlite": "SELECT count(*) FROM sqlite_master WHERE type = 'table' AND name IN ('book_fts', 'author_fts')",
+    "postgresql": "SELECT count(*) FROM pg_indexes WHERE indexname IN ('ix_book_titre_tsv', 'ix_author_nom_tsv')",
+}
+
+
+def detecter_fts(engine) -> bool:
+    """Index plein texte présents sur la base ?"""
+    global _fts_actif
+    requete = _DETECTION.get(engine.dialect.name)
+    if requete is None:
+        _fts_actif = False
+        return False
+    with engine.connect() as conn:
+        presents = conn.execute(text(requete)).scalar_one()
+    _fts_actif = presents == 2 and engine.dialect.name
+    return bool(_fts_actif)
+
+
+def fts_actif() -> bool:
+    if _fts_actif is None:
+        # Import tardif : la base n'est pas touchée à l'import de l'application
+        from app.database import engine
+        return detecter_fts(engine)
+    return bool(_fts_actif)
+
+
+_MOT = re.compile(r"\w+", re.UNICODE)
+
+
+def expression_fts(terme: str):
+    """
+    Traduire une saisie libre en requête FTS5
+
+    Chaque mot devient un préfixe entre guillemets ("prin"* AND "pet"*) :
+    la syntaxe FTS5 de l'utilisateur n'est jamais interprétée.
+    """
+    mots = _MOT.findall(terme or "")
+    if not mots:
+        return None
+    return " ".join(f'"{mot}"*' for mot in mots)
+
+
+def expression_tsquery(terme: str):
+    """Équivalent PostgreSQL d'expression_fts : 'prin':* & 'pet':*"""
+    mots = _MOT.findall(terme or "")
+    if not mots:
+        return None
+    return " & ".join(f"'{mot}':*" for mot in mots)
+
+
+def _correspond_pg(vecteur: str, terme: str):
+    return literal_column(vecteur).op("@@")(func.to_tsquery(_PG_CONFIG, expression_tsquery(terme)))
+
+
+def ids_livres(terme: str):
+    """Sous-requête des ids de livres dont le titre correspond"""
+    if _fts_actif == "postgresql":
+        return select(Book.id).where(_correspond_pg(_PG_TSV_LIVRE, terme))
+    return select(book_fts.c.rowid).where(
+        literal_column("book_fts").op("MATCH")(expression_fts(terme))
+    )
+
+
+def ids_auteurs(terme: str):
+    """Sous-requête des ids d'auteurs dont le nom ou prénom correspond"""
+    if _fts_actif == "postgresql":
+        return select(Author.id).where(_correspond_pg(_PG_TSV_AUTEUR, terme))
+    return select(author_fts.c.rowid).where(
+        literal_column("author_fts").op("MATCH")(expression_fts(terme))
+    )
+
+
+def rang_livres(terme: str):
+    """Sous-requête (rowid, rang) des titres correspondants, rang croissant = plus pertinent"""
+    if _fts_actif == "postgresql":
+        requete = func.to_tsquery(_PG_CONFIG, expression_tsquery(terme))
+        return select(
+            Book.id.label("rowid"),
+            # ts_rank croît avec la pertinence, BM25 décroît : même sens de tri
+            (-func.ts_rank(literal_column(_PG_TSV_LIVRE), requete)).label("rang"),
+        ).where(_correspond_pg(_PG_TSV_LIVRE, terme)).subquery("rang_fts")
+    return select(
+        book_fts.c.rowid.label("rowid"),
+        func.bm25(literal_column("book_fts")).label("rang"),
+    ).where(
+        literal_column("book_fts").op("MATCH")(expression_fts(terme))
+    ).subquery("rang_fts")
+
+
+# ===============================
+# Recherche par sous-chaîne (ILIKE)
+# ===============================
+
+
+# Caractère d'échappement des motifs LIKE : pas d'antislash, dont le sens
+# dans les littéraux SQL dépend de la base (standard_conforming_strings)
+ECHAPPEMENT = "!"
+
+
+def motif_contient(terme: str) -> str:
+    """%terme%, les jokers % et _ saisis par l'utilisateur étant pris littéralement"""
+    echappe = terme.replace(ECHAPPEMENT, ECHAPPEMENT * 2)
+    for joker in "%_":
+        echappe = echappe.replace(joker, ECHAPPEMENT + joker)
+    return f"%{echappe}%"
+
+
+def contient(colonne, terme: str):
+    """
+    colonne contient terme, sans tenir compte de la casse
+
+    ILIKE sur PostgreSQL, lower(...) LIKE lower(...) sur SQLite : même résultat.
+    """
+    return colonne.ilike(motif_contient(terme), escape=ECHAPPEMENT)
@@ -0,0 +1,37 @@
+from fastapi.responses import ORJSONResponse
+
+# ===============================
+# Sérialisation rapide des listes
+# ===============================
+#
+# Les listes sont lues en colonnes (select de tuples, sans objets ORM ni
+# identity map) et renvoyées sans repasser par Pydantic : ces lignes
+# viennent de notre propre base, déjà validées à l'écriture. Chaque ligne
+# devient un dict aux champs du schéma de réponse (même ordre, mêmes noms),
+# encodé par orjson, qui sérialise nativement dates et datetimes.
+#
+# Le schéma (BookGet, AuteurResume, LoansGet) reste la référence de la
+# forme des réponses et de la documentation OpenAPI.
+
+
+def colonnes(modele, schema, version: bool = True) -> list:
+    """
+    Colonnes du modèle correspondant aux champs du schéma, dans leur ordre, puis version
+
+    version n'est pas renvoyée au client : elle sert à l'ETag de la liste.
+    version=False : les seuls champs du schéma (exports, dont l'en-tête CSV suit le schéma
+    et non la table).
+    """
+    champs = [getattr(modele, nom) for nom in schema.model_fields]
+    return champs + [modele.version] if version else champs
+
+
+def en_dicts(lignes, schema) -> list:
+    """Lignes lues par colonnes(modele, schema) -> dicts aux champs du schéma"""
+    champs = tuple(schema.model_fields)
+    # zip s'arrête aux champs : version et colonnes de tri ajoutées sont ignorées
+    return [dict(zip(champs, ligne)) for ligne in lignes]
+
+
+def reponse_liste(contenu, entetes: dict = None) -> ORJSONResponse:
+    return ORJSONResponse(contenu, headers=entetes)
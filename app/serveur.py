@@ -0,0 +1,52 @@
+"""
+Serveur de production : plusieurs workers uvicorn sur un même port
+
+    python -m app.serveur --workers 4 --host 0.0.0.0 --port 8000
+
+Chaque worker est un processus qui importe l'application et ouvre ses
+propres connexions à la base (lifespan : fermées à l'arrêt). Le schéma
+n'est pas créé ici : `alembic upgrade head` une fois par déploiement.
+SIGTERM (ou Ctrl+C) arrête les workers proprement, SIGHUP les relance.
+
+Équivaut à `uvicorn app.main:app --workers N`, à une différence près : en
+mode multi-workers, uvicorn transmet le socket d'écoute aux workers, qui le
+recréent depuis son descripteur ; asyncio ne le reconnaît alors plus comme
+TCP et n'active pas TCP_NODELAY sur les connexions acceptées. L'algorithme
+de Nagle et l'ACK retardé du client ajoutent alors ~40 ms à chaque réponse
+envoyée en plusieurs écritures. Sous Linux, l'option posée sur le socket
+d'écoute est héritée par les connexions acceptées.
+"""
+import argparse
+import socket
+import sys
+import uvicorn
+from uvicorn.supervisors import Multiprocess
+
+APPLICATION = "app.main:app"
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    config = uvicorn.Config(
+        APPLICATION, host=args.host, port=args.port, workers=args.workers, log_level=args.log_level
+    )
+    serveur = uvicorn.Server(config)
+    if config.workers == 1:
+        serveur.run()
+        return 0
+
+    sock = config.bind_socket()
+    if sock.family in (socket.AF_INET, socket.AF_INET6):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    Multiprocess(config, target=serveur.run, sockets=[sock]).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
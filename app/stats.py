@@ -0,0 +1,94 @@
+from typing import Optional
+from sqlalchemy import delete, func, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from app.models import Book, LoanHistory
+
+# ===============================
+# Statistiques d'emprunts (LoanHistory)
+# ===============================
+#
+# Les agrégats sont tenus à jour à chaque emprunt et retour, dans la
+# transaction du mouvement de stock, au lieu d'être recalculés par
+# GROUP BY sur loans. La durée moyenne est une moyenne glissante :
+#   nouvelle = (moyenne * retours + durée) / (retours + 1)
+# Book.popularite recopie LoanHistory.popularite pour permettre un tri
+# indexé (GET /books/?sort_by=popularite).
+
+
+def _maj_historique(db: Session, livre_id: int, valeurs: dict, initiales: dict):
+    """
+    INSERT de la ligne du livre à son premier mouvement, UPDATE ensuite
+
+    Un seul upsert (ON CONFLICT (livre_id) DO UPDATE) : avec un UPDATE puis
+    un INSERT si aucune ligne n'était touchée, deux premiers emprunts
+    simultanés inséraient tous les deux et le second violait l'unicité.
+    """
+    # INSERT ... ON CONFLICT DO UPDATE, même syntaxe sur SQLite et PostgreSQL
+    dialecte = db.get_bind().dialect
+    insertion = (postgresql.insert if dialecte.name == "postgresql" else sqlite.insert)(LoanHistory.__table__)
+    db.execute(
+        insertion.values(livre_id=livre_id, **initiales).on_conflict_do_update(
+            index_elements=["livre_id"],
+            set_=valeurs,
+        )
+    )
+
+
+def enregistrer_emprunt(db: Session, livre_id: int, popularite_livre: bool = True):
+    """
+    Compter un emprunt du livre
+
+    popularite_livre=False quand Book.popularite a déjà été incrémentée
+    par l'UPDATE de stock (une seule écriture sur book).
+    """
+    _maj_historique(
+        db, livre_id,
+        valeurs={
+            "nombre_emprunts_total": LoanHistory.nombre_emprunts_total + 1,
+            "popularite": LoanHistory.popularite + 1,
+        },
+        initiales={
+            "nombre_emprunts_total": 1,
+            "popularite": 1,
+            "nombre_retours": 0,
+        },
+    )
+    if popularite_livre:
+        db.execute(
+            update(Book)
+            .where(Book.id == livre_id)
+            .values(popularite=Book.popularite + 1)
+            .execution_options(synchronize_session=False)
+        )
+
+
+def enregistrer_retour(db: Session, livre_id: int, duree: Optional[int]):
+    """Intégrer la durée (en jours) d'un emprunt retourné dans la moyenne glissante"""
+    if duree is None:
+        return
+    _maj_historique(
+        db, livre_id,
+        valeurs={
+            # Les expressions SET lisent toutes les valeurs avant mise à jour
+            "duree_moyenne_emprunt": (
+                func.coalesce(LoanHistory.duree_moyenne_emprunt, 0.0) * LoanHistory.nombre_retours + duree
+            ) / (LoanHistory.nombre_retours + 1.0),
+            "nombre_retours": LoanHistory.nombre_retours + 1,
+        },
+        initiales={
+            "nombre_emprunts_total": 0,
+            "popularite": 0,
+            "duree_moyenne_emprunt": float(duree),
+            "nombre_retours": 1,
+        },
+    )
+
+
+def supprimer_historique(db: Session, livre_id: int):
+    """Statistiques d'un livre supprimé (la clé étrangère empêcherait sa suppression)"""
+    db.execute(
+        delete(LoanHistory)
+        .where(LoanHistory.livre_id == livre_id)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,187 @@
+from datetime import date, datetime
+from typing import Optional
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models import Book, Loan, StatutEmpruntEnum
+from app.prefixes import titres
+from app.schemas.loans import LoansCreate
+from app.stats import enregistrer_emprunt, enregistrer_retour
+
+# ===============================
+# Emprunts et retours (stock des exemplaires)
+# ===============================
+#
+# Le stock n'est jamais lu puis réécrit côté Python : chaque mouvement est
+# un UPDATE conditionnel exécuté par la base (... WHERE disponibles > 0).
+# Deux emprunts simultanés du dernier exemplaire ne peuvent donc pas
+# réussir tous les deux, sans verrou applicatif. L'UPDATE est la première
+# instruction de la transaction : sous SQLite il prend directement le
+# verrou d'écriture (et attend busy_timeout) au lieu d'échouer sur une
+# promotion lecture -> écriture.
+
+RETOURNE = StatutEmpruntEnum.RETOURNE.value
+
+# Contraintes violées au commit d'un emprunt -> (statut, message). Reconnues
+# au nom de la contrainte (PostgreSQL) ou au message de SQLite, qui ne nomme
+# que les colonnes d'une unicité et aucune clé étrangère.
+VIOLATIONS_EMPRUNT = (
+    (("ix_loans_numero_carte_bibliotheque", "loans.numero_carte_bibliotheque"),
+     400, "Ce numéro de carte est déjà utilisé par un emprunt"),
+    (("ck_loan_retour_apres_loan",),
+     400, "La date de retour ne peut pas précéder la date d'emprunt"),
+    # Livre supprimé entre la réservation et le commit
+    (("loans_livre_id_fkey", "FOREIGN KEY constraint failed"),
+     404, "Livre non trouvé"),
+)
+
+
+def _decrementer_stock(db: Session, livre_id: int) -> bool:
+    """Réserver un exemplaire ; False si le stock est épuisé (ou le livre absent)"""
+    result = db.execute(
+        update(Book)
+        .where(Book.id == livre_id, Book.nombre_exemplaires_disponibles > 0)
+        .values(
+            nombre_exemplaires_disponibles=Book.nombre_exemplaires_disponibles - 1,
+            # Même écriture que le stock : la popularité ne coûte aucun UPDATE de plus
+            popularite=Book.popularite + 1,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount == 1
+
+
+def _incrementer_stock(db: Session, livre_id):
+    """Rendre un exemplaire, sans jamais dépasser le total"""
+    db.execute(
+        update(Book)
+        .where(Book.id == livre_id, Book.nombre_exemplaires_disponibles < Book.nombre_exemplaires_total)
+        .values(nombre_exemplaires_disponibles=Book.nombre_exemplaires_disponibles + 1)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _duree(debut, fin) -> Optional[int]:
+    """Durée d'un emprunt en jours (None s'il n'est pas retourné)"""
+    if debut is None or fin is None:
+        return None
+    if isinstance(debut, datetime):
+        debut = debut.date()
+    if isinstance(fin, datetime):
+        fin = fin.date()
+    return (fin - debut).days
+
+
+def _violation(erreur: IntegrityError, violations) -> Optional[HTTPException]:
+    """Erreur HTTP de la contrainte violée, ou None si elle n'est pas prévue"""
+    # psycopg : diag.constraint_name ; sqlite3 : le message seul
+    diag = getattr(erreur.orig, "diag", None)
+    texte = getattr(diag, "constraint_name", None) or str(erreur.orig)
+    for marques, statut, message in violations:
+        if any(marque in texte for marque in marques):
+            return HTTPException(status_code=statut, detail=message)
+    return None
+
+
+def emprunter(db: Session, emprunt: LoansCreate) -> Loan:
+    """
+    Enregistrer un emprunt et réserver un exemplaire dans la même transaction
+
+    404 si le livre n'existe pas, 409 si plus aucun exemplaire n'est disponible.
+    Un emprunt créé directement au statut 'Retourné' (historique) ne touche pas au stock.
+    """
+    date_emprunt = emprunt.date_emprunt or date.today()
+
+    if emprunt.statut != RETOURNE:
+        if not _decrementer_stock(db, emprunt.livre_id):
+            db.rollback()
+            if db.get(Book, emprunt.livre_id) is None:
+                raise HTTPException(status_code=404, detail=f"Livre avec l'ID {emprunt.livre_id} non trouvé")
+            raise HTTPException(status_code=409, detail="Plus aucun exemplaire disponible pour ce livre")
+        enregistrer_emprunt(db, emprunt.livre_id, popularite_livre=False)
+    else:
+        if db.get(Book, emprunt.livre_id) is None:
+            raise HTTPException(status_code=404, detail=f"Livre avec l'ID {emprunt.livre_id} non trouvé")
+        enregistrer_emprunt(db, emprunt.livre_id)
+        enregistrer_retour(db, emprunt.livre_id, _duree(date_emprunt, emprunt.date_retour_effectif))
+
+    new_emprunt = Loan(
+        nom_emprunteur=emprunt.nom_emprunteur,
+        email_emprunteur=emprunt.email_emprunteur,
+        numero_carte_bibliotheque=emprunt.numero_carte_bibliotheque,
+        date_emprunt=date_emprunt,
+        date_limite_retour=emprunt.date_limite_retour,
+        date_retour_effectif=emprunt.date_retour_effectif,
+        statut=emprunt.statut,
+        commentaires=emprunt.commentaires,
+        livre_id=emprunt.livre_id,
+    )
+    db.add(new_emprunt)
+
+    try:
+        db.commit()
+    except IntegrityError as erreur:
+        # L'exemplaire réservé est rendu par l'annulation
+        db.rollback()
+        refus = _violation(erreur, VIOLATIONS_EMPRUNT)
+        if refus is None:
+            raise
+        raise refus from erreur
+
+    titres.emprunte(emprunt.livre_id)
+    db.refresh(new_emprunt)
+    return new_emprunt
+
+
+def retourner(db: Session, emprunt_id: int, date_retour: Optional[date] = None) -> Loan:
+    """
+    Clore un emprunt et rendre l'exemplaire dans la même transaction
+
+    404 si l'emprunt n'existe pas, 409 s'il est déjà retourné.
+    """
+    clore(db, emprunt_id, date_retour)
+    db.commit()
+
+    emprunt = db.get(Loan, emprunt_id)
+    db.refresh(emprunt)
+    return emprunt
+
+
+def clore(db: Session, emprunt_id: int, date_retour: Optional[date] = None) -> int:
+    """
+    Passer l'emprunt au statut 'Retourné' et rendre l'exemplaire (sans commit) ; renvoie l'id du livre
+
+    En cas de refus (404, 409, 400), toute la transaction est annulée : les
+    modifications faites avant dans la même transaction le sont aussi.
+    """
+    try:
+        result = db.execute(
+            update(Loan)
+            .where(Loan.id == emprunt_id, Loan.statut != RETOURNE)
+            .values(statut=RETOURNE, date_retour_effectif=date_retour or date.today())
+            .execution_options(synchronize_session=False)
+        )
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(
+            status_code=400, detail="La date de retour ne peut pas précéder la date d'emprunt"
+        )
+    if result.rowcount == 0:
+        db.rollback()
+        if db.get(Loan, emprunt_id) is None:
+            raise HTTPException(status_code=404, detail=f"Aucun emprunt trouvé avec l'id : {emprunt_id}")
+        raise HTTPException(status_code=409, detail="Cet emprunt est déjà retourné")
+
+    livre_id, date_emprunt, date_retour = db.execute(
+        select(Loan.livre_id, Loan.date_emprunt, Loan.date_retour_effectif).where(Loan.id == emprunt_id)
+    ).one()
+    _incrementer_stock(db, livre_id)
+    enregistrer_retour(db, livre_id, _duree(date_emprunt, date_retour))
+    return livre_id
+
+
+def liberer(db: Session, emprunt: Loan):
+    """Rendre l'exemplaire d'un emprunt encore actif qui va être supprimé (sans commit)"""
+    if emprunt.statut != RETOURNE:
+        _incrementer_stock(db, emprunt.livre_id)
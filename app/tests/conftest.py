@@ -0,0 +1,137 @@
+import itertools
+import os
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+# Les tests utilisent une base temporaire, jamais bibliotheque.db.
+# TEST_DATABASE_URL : une base dédiée (ex. PostgreSQL local), vidée à chaque session
+#   TEST_DATABASE_URL=postgresql://bibliotheque@localhost/bibliotheque_test pytest
+_TEST_DIR = tempfile.mkdtemp(prefix="bibliotheque-tests-")
+if os.getenv("TEST_DATABASE_URL"):
+    os.environ["DATABASE_URL"] = os.environ["TEST_DATABASE_URL"]
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_TEST_DIR, 'test.db')}")
+
+from app.main import app  # noqa: E402  (après le choix de la base)
+from app.database import creer_schema, engine  # noqa: E402
+from app.models import Base  # noqa: E402
+from app.schemas.validation import isbn13  # noqa: E402
+
+# Compteur pour générer des données uniques (ISBN, noms, cartes) d'un test à l'autre
+_sequence = itertools.count(1)
+
+
+def pytest_collection_modifyitems(config, items):
+    """Tests marqués @pytest.mark.sqlite (PRAGMAs, FTS5, plans...) ignorés sur une autre base"""
+    if engine.dialect.name == "sqlite":
+        return
+    ignore = pytest.mark.skip(reason=f"spécifique à SQLite (base de test : {engine.dialect.name})")
+    for item in items:
+        if "sqlite" in item.keywords:
+            item.add_marker(ignore)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def schema():
+    """Schéma de la base de test, créé une fois : l'import de l'application ne le crée pas."""
+    if os.getenv("TEST_DATABASE_URL"):
+        Base.metadata.drop_all(engine)
+    creer_schema(engine)
+
+
+@pytest.fixture
+def client():
+    """Client de test pour l'application FastAPI."""
+    return TestClient(app)
+
+
+@pytest.fixture
+def nouvel_auteur(client):
+    """Fabrique : crée un auteur via l'API et renvoie son id."""
+    def _creer(**champs):
+        n = next(_sequence)
+        donnees = {
+            "nom": f"Nom{n}",
+            "prenom": f"Prenom{n}",
+            "nationalite": "FR",
+            "date_naissance": "1970-01-01",
+        }
+        donnees.update(champs)
+        response = client.post("/authors/add", json=donnees)
+        assert response.status_code == 200, response.text
+        return response.json()["id"]
+    return _creer
+
+
+@pytest.fixture
+def nouveau_livre(client, nouvel_auteur):
+    """Fabrique : crée un livre via l'API et renvoie sa représentation."""
+    def _creer(**champs):
+        n = next(_sequence)
+        donnees = {
+            "titre": f"Livre {n}",
+            "isbn": isbn13(f"978{n:09d}"),
+            "annee_publication": 2000,
+            "nombre_exemplaires_disponibles": 3,
+            "nombre_exemplaires_total": 3,
+            "categorie": "Fiction",
+            "langue": "Français",
+            "nombre_pages": 120,
+            "maison_edition": "Gallimard",
+        }
+        donnees.update(champs)
+        if "auteur_id" not in donnees:
+            donnees["auteur_id"] = nouvel_auteur()
+        response = client.post("/books/add", json=donnees)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return _creer
+
+
+@pytest.fixture
+def nouvel_emprunt(client, nouveau_livre):
+    """Fabrique : crée un emprunt via l'API et renvoie sa représentation."""
+    def _creer(**champs):
+        n = next(_sequence)
+        donnees = {
+            "nom_emprunteur": f"Lecteur {n}",
+            "email_emprunteur": f"lecteur{n}@example.com",
+            "numero_carte_bibliotheque": f"CARTE-{n}",
+            "date_emprunt": date.today().isoformat(),
+            "date_limite_retour": (date.today() + timedelta(days=21)).isoformat(),
+            "statut": "Actif",
+        }
+        donnees.update(champs)
+        if "livre_id" not in donnees:
+            donnees["livre_id"] = nouveau_livre()["id"]
+        response = client.post("/loans/add", json=donnees)
+        assert response.status_code == 200, response.text
+        return response.json()
+    return _creer
+
+
+@pytest.fixture
+def compteur_requetes():
+    """
+    Compter les requêtes SQL exécutées dans un bloc
+
+        with compteur_requetes() as requetes:
+            client.get(...)
+        assert len(requetes) <= budget
+    """
+    @contextmanager
+    def _compter():
+        requetes = []
+
+        def _enregistrer(conn, cursor, statement, parameters, context, executemany):
+            requetes.append(statement)
+
+        event.listen(engine, "before_cursor_execute", _enregistrer)
+        try:
+            yield requetes
+        finally:
+            event.remove(engine, "before_cursor_execute", _enregistrer)
+    return _compter
@@ -1,5 +1,9 @@
+import json
 import pytest
-from app.models import Base
+from sqlalchemy import func, select
+from app.database import engine
+from app.models import AuthorTrigram, AuthorTrigramStat, Base
+from app.schemas.author import AuteurResume
 from fastapi.testclient import TestClient
 from app.main import app
 
@@ -40,5 +44,153 @@ def test_create_author(client, sample_author):
     print(f"Response: {response.json()}")
     assert response.status_code == 200
     data = response.json()
-    assert "auteur_id" in data
-    assert data["message"] == "Auteur ajouté avec succès"
\ No newline at end of file
+    assert isinstance(data["id"], int)
+    assert data["nom"] == sample_author["nom"]
+    assert data["livres"] == []
+
+def test_search_curseur_date_naissance(client, nouvel_auteur):
+    """Le curseur encode correctement une clé de tri de type date."""
+    for annee in (1901, 1902, 1903):
+        nouvel_auteur(nom=f"Keyset{annee}", date_naissance=f"{annee}-05-01")
+    
+    params = {"nom": "Keyset", "sort_by": "date_naissance", "page_size": 2, "cursor": True}
+    data = client.get("/authors/search", params=params).json()
+    assert [a["nom"] for a in data["auteurs"]] == ["Keyset1901", "Keyset1902"]
+    
+    params["after"] = data["next_cursor"]
+    data = client.get("/authors/search", params=params).json()
+    assert [a["nom"] for a in data["auteurs"]] == ["Keyset1903"]
+    assert data["next_cursor"] is None
+
+
+@pytest.mark.sqlite
+def test_search_sans_accents(client, nouvel_auteur):
+    nouvel_auteur(prenom="Fiodor", nom="Dostoïevski")
+    
+    data = client.get("/authors/search", params={"nom": "dostoiev"}).json()
+    assert [a["nom"] for a in data["auteurs"]] == ["Dostoïevski"]
+
+
+# Nombre maximal de requêtes SQL par endpoint, quel que soit le nombre d'auteurs
+BUDGET_REQUETES = {
+    "/authors/": 1,
+    "/authors/?include=livres": 2,
+    "/authors/search?page_size=50": 2,
+    "/authors/search?page_size=50&include=livres": 3,
+}
+
+
+@pytest.mark.parametrize("url,budget", BUDGET_REQUETES.items())
+def test_budget_requetes(client, nouvel_auteur, nouveau_livre, compteur_requetes, url, budget):
+    """Pas de N+1 : le nombre de requêtes ne dépend pas du nombre d'auteurs."""
+    for _ in range(5):
+        auteur_id = nouvel_auteur()
+        nouveau_livre(auteur_id=auteur_id)
+        nouveau_livre(auteur_id=auteur_id)
+    
+    with compteur_requetes() as requetes:
+        response = client.get(url)
+    assert response.status_code == 200
+    assert len(requetes) <= budget, requetes
+
+
+def test_include_livres(client, nouvel_auteur, nouveau_livre):
+    auteur_id = nouvel_auteur()
+    livre = nouveau_livre(auteur_id=auteur_id)
+    
+    sans = {a["id"]: a for a in client.get("/authors/").json()}
+    assert "livres" not in sans[auteur_id]
+    
+    avec = {a["id"]: a for a in client.get("/authors/", params={"include": "livres"}).json()}
+    assert [l["id"] for l in avec[auteur_id]["livres"]] == [livre["id"]]
+
+
+def test_export_auteurs(client, nouvel_auteur):
+    auteur_id = nouvel_auteur(nom="Exporté")
+    
+    response = client.get("/authors/export")
+    assert response.status_code == 200
+    lignes = [json.loads(l) for l in response.text.splitlines()]
+    assert {"id": auteur_id, "nom": "Exporté"}.items() <= next(l for l in lignes if l["id"] == auteur_id).items()
+    # Champs du schéma seulement : ni nom_normalise, ni version, ni updated_at
+    assert list(lignes[0]) == list(AuteurResume.model_fields)
+
+
+def test_bulk_auteurs(client):
+    auteurs = [
+        {"prenom": "Marguerite", "nom": "Yourcenar", "nationalite": "BE", "date_naissance": "1903-06-08"},
+        {"prenom": "Marguerite", "nom": "Yourcenar", "nationalite": "BE", "date_naissance": "1903-06-08"},
+        {"prenom": "Annie", "nom": "Ernaux", "nationalite": "XX", "date_naissance": "1940-09-01"},
+        {"prenom": "Albert", "nom": "Camus"},
+    ]
+    rapport = client.post("/authors/bulk", json=auteurs).json()
+    
+    assert rapport["inseres"] == 1
+    assert [e["ligne"] for e in rapport["erreurs"]] == [1, 2, 3]
+
+
+def test_detail_auteur_etag_suit_ses_livres(client, nouvel_auteur, nouveau_livre):
+    """L'ETag du détail d'un auteur change quand un de ses livres est ajouté ou supprimé."""
+    auteur_id = nouvel_auteur()
+    etag = client.get(f"/authors/{auteur_id}").headers["etag"]
+    assert client.get(f"/authors/{auteur_id}", headers={"If-None-Match": etag}).status_code == 304
+    
+    livre = nouveau_livre(auteur_id=auteur_id)
+    response = client.get(f"/authors/{auteur_id}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    etag_avec_livre = response.headers["etag"]
+    
+    client.delete(f"/books/{livre['id']}")
+    response = client.get(f"/authors/{auteur_id}", headers={"If-None-Match": etag_avec_livre})
+    assert response.status_code == 200
+
+
+def test_lecture_par_lot_auteurs(client, nouvel_auteur, nouveau_livre):
+    """Les auteurs d'un lot ont la forme de leur détail (avec leurs livres)."""
+    a, b = nouvel_auteur(), nouvel_auteur()
+    livre = nouveau_livre(auteur_id=b)
+    
+    response = client.post("/authors/batch-get", json={"ids": [b, 0, a]})
+    assert response.status_code == 200
+    auteurs = response.json()["auteurs"]
+    assert [auteur["id"] for auteur in auteurs] == [b, a]
+    assert [l["id"] for l in auteurs[0]["livres"]] == [livre["id"]]
+    assert response.json()["manquants"] == [0]
+    assert client.get("/authors/", params={"ids": f"{a},{b}"}).json()["auteurs"][1] == auteurs[0]
+
+
+def test_suggestions_auteurs(client, nouvel_auteur):
+    """Autocomplétion sans accents et tolérante aux fautes ; l'index suit chaque écriture."""
+    def suggestions(q):
+        response = client.get("/authors/suggest", params={"q": q})
+        assert response.status_code == 200
+        return [s["id"] for s in response.json()["suggestions"]]
+    
+    auteur_id = nouvel_auteur(prenom="Ysaÿe", nom="Wrzęśniewska")
+    assert suggestions("wrzesniewska")[0] == auteur_id
+    assert suggestions("ysaye wrze")[0] == auteur_id
+    # Deux lettres inversées
+    assert suggestions("Wrzesniewksa")[0] == auteur_id
+    
+    client.put(f"/authors/{auteur_id}", json={"nom": "Szymborska"})
+    assert auteur_id not in suggestions("wrzesniewska")
+    assert suggestions("szymbor")[0] == auteur_id
+    
+    client.post("/authors/bulk", json=[
+        {"prenom": "Ödön", "nom": "Horváthová", "nationalite": "AT", "date_naissance": "1901-12-09"},
+    ])
+    data = client.get("/authors/suggest", params={"q": "odon horvath"}).json()
+    assert data["suggestions"][0]["nom"] == "Horváthová"
+    
+    client.delete(f"/authors/{auteur_id}")
+    assert auteur_id not in suggestions("szymbor")
+    
+    # Les comptes par trigramme restent ceux de l'index
+    with engine.connect() as conn:
+        comptes = dict(conn.execute(
+            select(AuthorTrigram.trigramme, func.count()).group_by(AuthorTrigram.trigramme)
+        ).all())
+        stats = dict(conn.execute(
+            select(AuthorTrigramStat.trigramme, AuthorTrigramStat.nombre).where(AuthorTrigramStat.nombre > 0)
+        ).all())
+    assert stats == comptes
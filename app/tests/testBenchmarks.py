@@ -0,0 +1,49 @@
+import sqlite3
+from benchmarks.bench import comparer
+from benchmarks.demarrage import mesurer_import
+from benchmarks.generer import generer
+
+
+def _empreinte(chemin):
+    with sqlite3.connect(chemin) as conn:
+        return conn.execute(
+            "SELECT group_concat(titre || auteur_id || nombre_exemplaires_disponibles, '|') FROM book"
+        ).fetchone()[0]
+
+
+def test_catalogue_reproductible(tmp_path):
+    """Même graine, même catalogue ; stocks cohérents avec les emprunts en cours."""
+    generer(f"sqlite:///{tmp_path / 'a.db'}", "10k", graine=7)
+    generer(f"sqlite:///{tmp_path / 'b.db'}", "10k", graine=7)
+    assert _empreinte(tmp_path / "a.db") == _empreinte(tmp_path / "b.db")
+    
+    with sqlite3.connect(tmp_path / "a.db") as conn:
+        assert conn.execute("SELECT count(*) FROM book").fetchone()[0] == 10_000
+        assert conn.execute("SELECT count(*) FROM author").fetchone()[0] == 1_000
+        incoherents = conn.execute("""
+            SELECT count(*) FROM book
+            WHERE nombre_exemplaires_total - nombre_exemplaires_disponibles != (
+                SELECT count(*) FROM loans
+                WHERE loans.livre_id = book.id AND statut != 'Retourné'
+            )
+        """).fetchone()[0]
+        assert incoherents == 0
+
+
+def test_comparer_reference():
+    """Régression de latence (au-delà du seuil), de requêtes SQL ou réponse en erreur."""
+    reference = {"GET /books/": {"p50_ms": 10.0, "requetes_sql": 2}}
+    mesure = {"p50_ms": 11.0, "requetes_sql": 2, "erreurs": 0}
+    assert comparer({"GET /books/": mesure}, reference) == []
+    assert len(comparer({"GET /books/": {**mesure, "p50_ms": 16.0}}, reference)) == 1
+    # Machine deux fois plus lente : la référence est ramenée à sa vitesse
+    assert comparer({"GET /books/": {**mesure, "p50_ms": 20.0}}, reference, vitesse=2.0) == []
+    assert len(comparer({"GET /books/": {**mesure, "requetes_sql": 3}}, reference)) == 1
+    assert len(comparer({"GET /books/": {**mesure, "erreurs": 1}}, reference)) == 1
+
+
+def test_import_sans_effet_de_bord():
+    """Importer app.main ne crée ni ne lit la base : le schéma vient d'Alembic."""
+    mesure = mesurer_import()
+    assert not mesure["base_creee"]
+    assert mesure["total_ms"] > mesure["application_ms"] > 0
@@ -0,0 +1,402 @@
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app import config
+from app.cache import cle_livre, reponses
+from app import prefixes
+from app.database import engine
+from app.prefixes import titres
+from app.routers import book_async
+from app.schemas.author import AuteurCreate
+from app.schemas.book import BookCreate, BookGet, BookUpdate
+from app.schemas.validation import isbn13
+from pydantic import ValidationError
+
+
+def test_lectures_async(nouveau_livre):
+    """Les lectures du mode async renvoient les mêmes données que le mode sync."""
+    livre = nouveau_livre(titre="Le Petit Prince")
+    
+    app_async = FastAPI()
+    app_async.include_router(book_async.router)
+    with TestClient(app_async) as client_async:
+        response = client_async.get(f"/books/{livre['id']}")
+        assert response.status_code == 200
+        assert response.json()["titre"] == "Le Petit Prince"
+        
+        response = client_async.get("/books/search", params={"titre": "petit prince", "facets": True})
+        assert response.status_code == 200
+        assert [l["id"] for l in response.json()["livres"]] == [livre["id"]]
+        assert response.json()["facettes"]["categorie"] == [{"valeur": "Fiction", "nombre": 1}]
+        
+        response = client_async.get("/books/", params={"cursor": True, "page_size": 1})
+        assert response.json()["next_cursor"] is not None or response.json()["livres"]
+        
+        assert client_async.get("/books/999999").status_code == 404
+
+
+def test_pagination_curseur(client, nouveau_livre):
+    """Le mode curseur parcourt toutes les pages sans doublon ni COUNT."""
+    ids = [nouveau_livre(titre=f"Curseur {i % 3}")["id"] for i in range(7)]
+    
+    vus = []
+    params = {"titre": "Curseur", "page_size": 3, "cursor": True}
+    while True:
+        data = client.get("/books/search", params=params).json()
+        assert data["total"] is None
+        vus += [l["id"] for l in data["livres"]]
+        if not data["next_cursor"]:
+            break
+        params["after"] = data["next_cursor"]
+    
+    # Tri par titre puis id, chaque livre exactement une fois
+    attendu = sorted(ids, key=lambda i: (f"Curseur {ids.index(i) % 3}", i))
+    assert vus == attendu
+
+
+def test_pagination_curseur_desc_et_total(client, nouveau_livre):
+    for annee in (1990, 1995, 2001):
+        nouveau_livre(titre=f"Millesime {annee}", annee_publication=annee)
+    
+    params = {"titre": "Millesime", "sort_by": "annee_publication", "order": "desc",
+              "page_size": 2, "cursor": True, "with_total": True}
+    data = client.get("/books/search", params=params).json()
+    assert data["total"] == 3
+    assert [l["annee_publication"] for l in data["livres"]] == [2001, 1995]
+    
+    params["after"] = data["next_cursor"]
+    data = client.get("/books/search", params=params).json()
+    assert [l["annee_publication"] for l in data["livres"]] == [1990]
+    assert data["next_cursor"] is None
+
+
+def test_curseur_invalide(client):
+    assert client.get("/books/", params={"after": "pas-un-curseur"}).status_code == 400
+
+
+def test_recherche_plein_texte(client, nouvel_auteur, nouveau_livre):
+    """Recherche sans accents ni casse, par préfixe, classée par pertinence."""
+    auteur_id = nouvel_auteur(prenom="Louis-Ferdinand", nom="Céline")
+    voyage = nouveau_livre(titre="Voyage au bout de la nuit", auteur_id=auteur_id)
+    nouveau_livre(titre="La nuit étoilée des voyageurs")
+    nuits = nouveau_livre(titre="Nuits après nuits")
+    
+    data = client.get("/books/search", params={"titre": "VOYAGE nuit"}).json()
+    assert data["total"] == 2
+    
+    # BM25 : titre court où le terme revient deux fois en tête
+    data = client.get("/books/search", params={"titre": "nuit"}).json()
+    assert data["livres"][0]["id"] == nuits["id"]
+    
+    data = client.get("/books/search", params={"auteur": "celine"}).json()
+    assert [l["id"] for l in data["livres"]] == [voyage["id"]]
+    
+    data = client.get("/books/search", params={"titre": "etoil"}).json()
+    assert [l["titre"] for l in data["livres"]] == ["La nuit étoilée des voyageurs"]
+
+
+def test_index_plein_texte_synchronise(client, nouveau_livre):
+    """Les triggers tiennent l'index à jour sur modification et suppression."""
+    livre = nouveau_livre(titre="Ancien intitulé Zorglub")
+    
+    client.put(f"/books/{livre['id']}", json={"titre": "Nouvel intitulé Wumpus"})
+    assert client.get("/books/search", params={"titre": "zorglub"}).json()["total"] == 0
+    assert client.get("/books/search", params={"titre": "wumpus"}).json()["total"] == 1
+    
+    client.delete(f"/books/{livre['id']}")
+    assert client.get("/books/search", params={"titre": "wumpus"}).json()["total"] == 0
+
+
+def _livre_bulk(isbn, auteur_id, **champs):
+    donnees = {
+        "titre": f"Import {isbn}", "isbn": isbn, "annee_publication": 2010,
+        "nombre_exemplaires_disponibles": 1, "nombre_exemplaires_total": 1,
+        "categorie": "Science", "langue": "Français", "nombre_pages": 50,
+        "maison_edition": "Dunod", "auteur_id": auteur_id,
+    }
+    donnees.update(champs)
+    return donnees
+
+
+def test_bulk_json(client, nouvel_auteur, nouveau_livre, monkeypatch):
+    """Import par lots avec rapport d'erreurs ligne par ligne."""
+    monkeypatch.setattr(config, "BULK_CHUNK_SIZE", 2)
+    auteur_id = nouvel_auteur()
+    existant = nouveau_livre()
+    
+    livres = [
+        _livre_bulk("9781111111113", auteur_id),
+        _livre_bulk("9781111111120", 999999),                 # auteur inconnu
+        _livre_bulk(existant["isbn"], auteur_id),              # ISBN déjà en base
+        _livre_bulk("9781111111113", auteur_id),               # doublon dans le fichier
+        _livre_bulk("abc", auteur_id),                          # invalide
+        _livre_bulk("9781111111144", auteur_id),
+    ]
+    rapport = client.post("/books/bulk", json=livres).json()
+    
+    assert rapport["total"] == 6
+    assert rapport["inseres"] == 2
+    assert [e["ligne"] for e in rapport["erreurs"]] == [1, 2, 3, 4]
+    assert "isbn" in rapport["erreurs"][3]["erreur"]
+    assert client.get("/books/search", params={"isbn": "9781111111144"}).json()["total"] == 1
+
+
+def test_bulk_ndjson(client, nouvel_auteur):
+    auteur_id = nouvel_auteur()
+    corps = "\n".join([
+        json.dumps(_livre_bulk("9782222222224", auteur_id)),
+        "{pas du json",
+        json.dumps(_livre_bulk("9782222222231", auteur_id)),
+    ])
+    
+    response = client.post(
+        "/books/bulk", content=corps, headers={"Content-Type": "application/x-ndjson"}
+    )
+    rapport = response.json()
+    assert rapport["inseres"] == 2
+    assert rapport["erreurs"][0]["ligne"] == 1
+    
+    assert client.post("/books/bulk", json={"pas": "une liste"}).status_code == 400
+    # Corps non UTF-8 (Latin-1) : refusé, pas d'erreur 500
+    latin1 = json.dumps([_livre_bulk("9782222222248", auteur_id, titre="Été")], ensure_ascii=False).encode("latin-1")
+    response = client.post("/books/bulk", content=latin1, headers={"Content-Type": "application/json"})
+    assert response.status_code == 400 and "UTF-8" in response.json()["detail"]
+
+
+def test_tri_popularite_et_auteur(client, nouvel_auteur, nouveau_livre, nouvel_emprunt):
+    """Tri par popularité (nombre d'emprunts) et par nom d'auteur, en mode curseur."""
+    auteur_z = nouvel_auteur(nom="Zweig")
+    auteur_a = nouvel_auteur(nom="Aragon")
+    peu = nouveau_livre(auteur_id=auteur_z)
+    beaucoup = nouveau_livre(auteur_id=auteur_a)
+    for _ in range(3):
+        nouvel_emprunt(livre_id=beaucoup["id"])
+    nouvel_emprunt(livre_id=peu["id"])
+    
+    data = client.get("/books/", params={"sort_by": "popularite", "order": "desc", "page_size": 1}).json()
+    assert data["livres"][0]["popularite"] >= 3
+    
+    ids = [l["id"] for l in client.get("/books/", params={"sort_by": "popularite", "order": "desc",
+                                                          "page_size": 1000}).json()["livres"]]
+    assert ids.index(beaucoup["id"]) < ids.index(peu["id"])
+    
+    # Tri par auteur paginé par curseur
+    vus, params = [], {"sort_by": "auteur", "cursor": True, "page_size": 2}
+    while True:
+        data = client.get("/books/", params=params).json()
+        vus += [l["id"] for l in data["livres"]]
+        if not data["next_cursor"]:
+            break
+        params["after"] = data["next_cursor"]
+    assert vus.index(beaucoup["id"]) < vus.index(peu["id"])
+    assert len(vus) == len(set(vus))
+
+
+def test_detail_conditionnel(client, nouveau_livre, nouvel_emprunt, monkeypatch):
+    """ETag / Last-Modified sur le détail ; 304 sans construire de modèle Pydantic."""
+    livre = nouveau_livre()
+    reponses.invalider(cle_livre(livre["id"]))
+    response = client.get(f"/books/{livre['id']}")
+    etag, last_modified = response.headers["etag"], response.headers["last-modified"]
+    
+    def interdit(*args, **kwargs):
+        raise AssertionError("modèle construit pour une réponse 304")
+    
+    with monkeypatch.context() as m:
+        m.setattr(BookGet, "model_validate", interdit)
+        # Depuis le cache, puis depuis la base
+        for _ in range(2):
+            response = client.get(f"/books/{livre['id']}", headers={"If-None-Match": etag})
+            assert response.status_code == 304
+            assert response.content == b""
+            assert response.headers["etag"] == etag
+            reponses.invalider(cle_livre(livre["id"]))
+    
+    response = client.get(f"/books/{livre['id']}", headers={"If-Modified-Since": last_modified})
+    assert response.status_code == 304
+    
+    # Un emprunt modifie le stock : nouvelle version
+    nouvel_emprunt(livre_id=livre["id"])
+    response = client.get(f"/books/{livre['id']}", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_liste_conditionnelle(client, nouveau_livre):
+    """La page de liste a un ETag qui change avec ses lignes."""
+    livre = nouveau_livre(titre="Zzz conditionnel")
+    params = {"sort_by": "titre", "order": "desc", "page_size": 3}
+    
+    response = client.get("/books/", params=params)
+    etag = response.headers["etag"]
+    assert "last-modified" not in response.headers
+    
+    response = client.get("/books/", params=params, headers={"If-None-Match": f'W/{etag}, "autre"'})
+    assert response.status_code == 304
+    
+    client.put(f"/books/{livre['id']}", json={"maison_edition": "Seuil"})
+    response = client.get("/books/", params=params, headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["etag"] != etag
+
+
+def test_lecture_par_lot(client, nouveau_livre, compteur_requetes):
+    """?ids= et /batch-get : ordre des ids conservé, manquants signalés, cache de détail réutilisé."""
+    a, b, c = (nouveau_livre()["id"] for _ in range(3))
+    reponses.vider()
+    
+    with compteur_requetes() as requetes:
+        response = client.get("/books/", params={"ids": f"{c},999999,{a},{c}"})
+    assert response.status_code == 200
+    assert [livre["id"] for livre in response.json()["livres"]] == [c, a]
+    assert response.json()["manquants"] == [999999]
+    assert len(requetes) == 1
+    
+    # a et c sont désormais en cache : seul b est lu en base
+    with compteur_requetes() as requetes:
+        response = client.post("/books/batch-get", json={"ids": [b, a, c]})
+    assert [livre["id"] for livre in response.json()["livres"]] == [b, a, c]
+    assert response.json()["livres"][0] == client.get(f"/books/{b}").json()
+    assert len(requetes) == 1
+    
+    assert client.get("/books/", params={"ids": "1,x"}).status_code == 422
+    assert client.post("/books/batch-get", json={"ids": list(range(config.BATCH_GET_MAX_IDS + 1))}).status_code == 422
+    
+    app_async = FastAPI()
+    app_async.include_router(book_async.router)
+    with TestClient(app_async) as client_async:
+        reponses.vider()
+        response = client_async.get("/books/", params={"ids": f"{b},{a}"})
+        assert [livre["id"] for livre in response.json()["livres"]] == [b, a]
+
+
+def test_listes_serialisees_sans_pydantic(client, nouveau_livre, monkeypatch):
+    """Les listes sont lues en colonnes et encodées sans valider de modèle, avec la forme de BookGet."""
+    livre = nouveau_livre(titre="Colonnes et orjson")
+    detail = client.get(f"/books/{livre['id']}").json()
+    
+    def interdit(*args, **kwargs):
+        raise AssertionError("validation Pydantic sur une liste")
+    monkeypatch.setattr(BookGet, "model_validate", interdit)
+    
+    response = client.get("/books/search", params={"titre": "colonnes orjson"})
+    assert response.status_code == 200
+    assert response.json()["livres"] == [detail]
+    assert list(response.json()["livres"][0]) == list(BookGet.model_fields)
+    
+    response = client.get("/books/", params={"sort_by": "auteur", "cursor": True, "page_size": 2})
+    assert response.status_code == 200
+    assert set(response.json()["livres"][0]) == set(BookGet.model_fields)
+
+
+def test_validation_partagee(client, nouvel_auteur):
+    """Types partagés : clé ISBN vérifiée, table ISO 3166-1 complète, chaînes nettoyées."""
+    auteur_id = nouvel_auteur()
+    response = client.post("/books/add", json=_livre_bulk("9781111111114", auteur_id))
+    assert response.status_code == 422
+    assert "ISBN invalide" in response.text
+    # ISBN-10 avec clé X et tirets
+    assert BookCreate(**_livre_bulk("0-8044-2957-X", auteur_id)).isbn == "0-8044-2957-X"
+
+    livre = BookCreate(**_livre_bulk(isbn13("978000000001"), auteur_id, titre="  Les Vagues  "))
+    assert livre.titre == "Les Vagues"
+    # Mise à jour partielle : null ne déclenche pas la validation
+    assert BookUpdate(annee_publication=None).annee_publication is None
+
+    auteur = {"prenom": "Chinua", "nom": "Achebe"}
+    assert AuteurCreate(**auteur, nationalite=" ng ").nationalite == "NG"
+    assert AuteurCreate(**auteur, nationalite="EN").nationalite == "EN"  # code historique
+    with pytest.raises(ValidationError):
+        AuteurCreate(**auteur, nationalite="XX")
+    with pytest.raises(ValidationError):
+        AuteurCreate(prenom="   ", nom="Achebe")
+
+
+def test_facettes_recherche(client, nouveau_livre):
+    """facets=true ajoute les comptes de l'ensemble filtré, calculés en une seule requête groupée."""
+    nouveau_livre(titre="Facette un", annee_publication=1995)
+    nouveau_livre(titre="Facette deux", annee_publication=1999, langue="Anglais")
+    nouveau_livre(titre="Facette trois", annee_publication=2004, categorie="Histoire",
+                  nombre_exemplaires_disponibles=0)
+    
+    params = {"titre": "facette", "page_size": 1}
+    sans = client.get("/books/search", params=params)
+    assert "facettes" not in sans.json()
+    
+    response = client.get("/books/search", params={**params, "facets": True})
+    data = response.json()
+    assert data["total"] == 3 and len(data["livres"]) == 1
+    assert data["facettes"] == {
+        "categorie": [{"valeur": "Fiction", "nombre": 2}, {"valeur": "Histoire", "nombre": 1}],
+        "langue": [{"valeur": "Français", "nombre": 2}, {"valeur": "Anglais", "nombre": 1}],
+        "decennie": [{"valeur": 1990, "nombre": 2}, {"valeur": 2000, "nombre": 1}],
+        "disponible": [{"valeur": True, "nombre": 2}, {"valeur": False, "nombre": 1}],
+    }
+    # Les facettes entrent dans l'ETag : la page sans facettes ne vaut pas pour celle-ci
+    assert response.headers["etag"] != sans.headers["etag"]
+    
+    data = client.get("/books/search", params={**params, "facets": True, "categorie": "Fiction"}).json()
+    assert data["facettes"]["decennie"] == [{"valeur": 1990, "nombre": 2}]
+
+
+def test_suggestions_titres(client, nouvel_auteur, nouveau_livre, nouvel_emprunt):
+    """L'index des titres en mémoire suit les créations, modifications, imports, suppressions et emprunts."""
+    titres.vider()
+    # Construit à la première suggestion, avec les livres déjà en base
+    ancien = nouveau_livre(titre="Zéphyr des Orangers")
+    
+    def suggestions(q):
+        response = client.get("/books/suggest", params={"q": q})
+        assert response.status_code == 200
+        return [(s["id"], s["popularite"]) for s in response.json()["suggestions"]]
+    
+    assert suggestions("zephyr") == [(ancien["id"], 0)]
+    populaire = nouveau_livre(titre="Le Zéphyr d'été")
+    nouvel_emprunt(livre_id=populaire["id"])
+    # Début de n'importe quel mot, sans accents ni casse ; les plus empruntés d'abord
+    assert suggestions("ZEPH") == [(populaire["id"], 1), (ancien["id"], 0)]
+    assert suggestions("orang") == [(ancien["id"], 0)]
+    assert suggestions("zephyr d e") == [(populaire["id"], 1)]
+    assert suggestions("zephyrs") == []
+    
+    client.put(f"/books/{ancien['id']}", json={"titre": "Brise des Orangers"})
+    assert suggestions("zeph") == [(populaire["id"], 1)]
+    assert suggestions("brise") == [(ancien["id"], 0)]
+    
+    assert client.delete(f"/books/{ancien['id']}").status_code == 200
+    assert suggestions("brise") == []
+    
+    rapport = client.post("/books/bulk", json=[_livre_bulk(isbn13("979100000001"), nouvel_auteur(), titre="Zéphyrine")])
+    assert rapport.json()["inseres"] == 1
+    data = client.get("/books/suggest", params={"q": "zeph"}).json()
+    assert [s["titre"] for s in data["suggestions"]] == ["Le Zéphyr d'été", "Zéphyrine"]
+
+
+def test_suggestions_titres_tetes(client, nouveau_livre, nouvel_emprunt, monkeypatch):
+    """Préfixes de grande tranche servis par leur liste de tête, tenue à jour par les écritures ; reconstruction sautée sans changement."""
+    monkeypatch.setattr(prefixes, "TRANCHE_MAX", 0)
+    titres.vider()
+    premier = nouveau_livre(titre="Quenouille")
+    second = nouveau_livre(titre="Quartz")
+    
+    def suggestions(q):
+        return [s["id"] for s in client.get("/books/suggest", params={"q": q}).json()["suggestions"]]
+    
+    # À popularité égale, les plus anciens d'abord ; la tête de "qu" est gardée
+    assert suggestions("qu") == [premier["id"], second["id"]]
+    assert "qu" in titres._tetes
+    nouvel_emprunt(livre_id=second["id"])
+    troisieme = nouveau_livre(titre="Quiétude")
+    assert suggestions("qu") == [second["id"], premier["id"], troisieme["id"]]
+    # Un livre qui quitte le préfixe fait reclasser la tranche
+    client.put(f"/books/{premier['id']}", json={"titre": "Rouet"})
+    assert "qu" not in titres._tetes
+    assert suggestions("qu") == [second["id"], troisieme["id"]]
+    
+    with engine.connect() as conn:
+        assert titres.reconstruire_si_modifie(conn)
+        assert not titres.reconstruire_si_modifie(conn)
+    nouveau_livre(titre="Quadrille")
+    with engine.connect() as conn:
+        assert titres.reconstruire_si_modifie(conn)
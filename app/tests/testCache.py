@@ -0,0 +1,130 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.cache import EN_QUARANTAINE, CacheReponses, MemoireLRU, cle_livre, reponses
+
+
+def test_lru_eviction_et_ttl():
+    """Le LRU garde les entrées récemment lues et expire les entrées trop vieilles."""
+    lru = MemoireLRU(max_entrees=2, ttl=60)
+    lru.set("a", b"1")
+    lru.set("b", b"2")
+    assert lru.get("a") == b"1"  # "a" devient la plus récente
+    lru.set("c", b"3")
+    assert lru.get("b") is None
+    assert lru.get("a") == b"1" and lru.get("c") == b"3"
+    assert lru.evictions == 1
+    
+    court = MemoireLRU(ttl=0.01)
+    court.set("a", b"1")
+    time.sleep(0.02)
+    assert court.get("a") is None
+
+
+def test_detail_livre_en_cache(client, nouveau_livre, compteur_requetes):
+    """Le second GET est servi sans requête SQL, avec la même réponse."""
+    livre = nouveau_livre()
+    premier = client.get(f"/books/{livre['id']}")
+    avant = client.get("/cache/stats").json()
+    
+    with compteur_requetes() as requetes:
+        second = client.get(f"/books/{livre['id']}")
+    assert second.status_code == 200
+    assert second.json() == premier.json()
+    assert requetes == []
+    assert client.get("/cache/stats").json()["hits"] == avant["hits"] + 1
+
+
+def test_invalidation_par_les_ecritures(client, nouvel_auteur, nouveau_livre, nouvel_emprunt):
+    """Livres, auteurs et emprunts invalident les détails qu'ils modifient."""
+    auteur_id = nouvel_auteur()
+    livre = nouveau_livre(auteur_id=auteur_id)
+    client.get(f"/books/{livre['id']}")
+    client.get(f"/authors/{auteur_id}")
+    
+    # Un emprunt change le stock du livre, visible aussi dans le détail de l'auteur
+    emprunt = nouvel_emprunt(livre_id=livre["id"])
+    assert client.get(f"/books/{livre['id']}").json()["nombre_exemplaires_disponibles"] == 2
+    livres = client.get(f"/authors/{auteur_id}").json()["livres"]
+    assert livres[0]["nombre_exemplaires_disponibles"] == 2
+    
+    client.post(f"/loans/{emprunt['id']}/retour", json={})
+    assert client.get(f"/books/{livre['id']}").json()["nombre_exemplaires_disponibles"] == 3
+    
+    # Mise à jour du livre et de l'auteur
+    client.put(f"/books/{livre['id']}", json={"titre": "Titre modifié"})
+    assert client.get(f"/books/{livre['id']}").json()["titre"] == "Titre modifié"
+    assert client.get(f"/authors/{auteur_id}").json()["livres"][0]["titre"] == "Titre modifié"
+    client.put(f"/authors/{auteur_id}", json={"nom": "Renommé"})
+    assert client.get(f"/authors/{auteur_id}").json()["nom"] == "Renommé"
+    
+    # Un nouveau livre apparaît dans le détail de l'auteur, un livre supprimé disparaît
+    autre = nouveau_livre(auteur_id=auteur_id)
+    assert len(client.get(f"/authors/{auteur_id}").json()["livres"]) == 2
+    client.delete(f"/books/{autre['id']}")
+    assert client.get(f"/books/{autre['id']}").status_code == 404
+    assert len(client.get(f"/authors/{auteur_id}").json()["livres"]) == 1
+    
+    assert reponses.statistiques()["invalidations"] > 0
+
+
+def test_compteurs_concurrents():
+    """Les compteurs restent exacts quand les handlers du threadpool lisent en parallèle."""
+    cache = CacheReponses(MemoireLRU())
+    cache.backend.set("a", b"{}\n{}")
+    
+    def lire(_):
+        for _ in range(2000):
+            cache.lire("a")
+            cache.lire("absente")
+    
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lire, range(8)))
+    assert (cache.hits, cache.misses) == (16000, 16000)
+
+
+def test_generation_ecarte_les_ecritures_perimees():
+    """Une lecture commencée avant une invalidation ne remet pas l'ancienne version en cache."""
+    lru = MemoireLRU(max_entrees=2)
+    generation = lru.generations(["a"])[0]
+    lru.delete("a")
+    assert not lru.set("a", b"ancien", generation)
+    assert lru.get("a") is None
+    assert lru.set("a", b"nouveau", lru.generations(["a"])[0])
+    assert lru.get("a") == b"nouveau"
+    
+    # Invalidations oubliées (au-delà de max_entrees) : les relevés antérieurs sont refusés
+    generation = lru.generations(["b"])[0]
+    lru.delete("c", "d", "e")
+    assert not lru.set("b", b"ancien", generation)
+
+
+def test_quarantaine_replique():
+    """Avec une réplique, rien n'est mis en cache pendant le délai qui suit une invalidation."""
+    lru = MemoireLRU(quarantaine=0.05)
+    lru.delete("a")
+    generation = lru.generations(["a"])[0]
+    assert generation == EN_QUARANTAINE
+    assert not lru.set("a", b"replique en retard", generation)
+    time.sleep(0.06)
+    assert lru.set("a", b"1", lru.generations(["a"])[0])
+
+
+def test_invalidation_pendant_la_lecture(client, nouveau_livre, monkeypatch):
+    """Un GET dont la clé est invalidée pendant sa lecture répond sans mettre en cache."""
+    livre = nouveau_livre()
+    cle = cle_livre(livre["id"])
+    releve = reponses.generation
+    
+    def generation_puis_ecriture(cle):
+        generation = releve(cle)
+        # Une écriture concurrente commite et invalide pendant la lecture
+        reponses.invalider(cle)
+        return generation
+    
+    monkeypatch.setattr(reponses, "generation", generation_puis_ecriture)
+    assert client.get(f"/books/{livre['id']}").status_code == 200
+    assert reponses.backend.get(cle) is None
+    
+    monkeypatch.undo()
+    client.get(f"/books/{livre['id']}")
+    assert reponses.backend.get(cle) is not None
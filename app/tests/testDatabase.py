@@ -0,0 +1,150 @@
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import httpx
+import pytest
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+from app import config, database
+from app.database import (
+    SessionEcriture, SessionLocal, create_db_engine, creer_schema, engine, get_db, reinitialiser_apres_fork,
+)
+from app.models import Book
+from app.plans import alertes, analyser
+from app.routers import authors, book, loans
+
+
+@pytest.mark.sqlite
+def test_pragmas_sqlite():
+    """Les PRAGMAs sont appliqués à chaque connexion du pool."""
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+        assert conn.execute(text("PRAGMA busy_timeout")).scalar() == config.SQLITE_BUSY_TIMEOUT_MS
+
+
+def test_pool_configure():
+    """Le pool respecte la configuration."""
+    assert engine.pool.size() == config.DB_POOL_SIZE
+
+
+def test_dependance_partagee():
+    """Les trois routers utilisent la même dépendance de session."""
+    assert authors.get_db is book.get_db is loans.get_db is get_db
+
+
+@pytest.mark.sqlite
+def test_aucun_scan_complet():
+    """Chaque forme de requête des endpoints est servie par un index (app/plans.py)."""
+    with engine.connect() as conn:
+        resultats = analyser(conn)
+    scans = {
+        nom: problemes for nom, (_, problemes) in resultats.items()
+        if any(probleme.startswith("scan complet") for probleme in problemes)
+    }
+    assert scans == {}
+
+
+def test_alertes_plan():
+    """Scans complets et tris hors index sont repérés dans un plan."""
+    assert alertes(["SCAN book"]) == ["scan complet : SCAN book"]
+    assert alertes(["SCAN book USING INDEX ix_book_titre"]) == []
+    assert alertes(["SEARCH book USING INDEX ix_book_disponibles (nombre_exemplaires_disponibles=?)",
+                    "USE TEMP B-TREE FOR ORDER BY"]) == ["tri hors index"]
+
+
+def _verrou_ecriture_libre() -> bool:
+    """Un autre écrivain peut-il prendre le verrou d'écriture, sans attendre ?"""
+    conn = sqlite3.connect(engine.url.database, timeout=0)
+    try:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.rollback()
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+@pytest.mark.sqlite
+def test_verrou_ecriture_immediat():
+    """Les sessions d'écriture prennent le verrou SQLite dès le début, les lectures jamais."""
+    for fabrique, libre in ((SessionLocal, True), (SessionEcriture, False)):
+        db = fabrique()
+        try:
+            db.execute(text("SELECT count(*) FROM book")).scalar()
+            assert _verrou_ecriture_libre() is libre
+        finally:
+            db.close()
+    assert _verrou_ecriture_libre()
+
+
+def test_reinitialisation_apres_fork():
+    """Après un fork, l'enfant repart d'un pool vide au lieu des connexions du parent."""
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+    assert engine.pool.checkedin() > 0
+    reinitialiser_apres_fork()
+    assert engine.pool.checkedin() == 0
+
+
+def test_plusieurs_workers(tmp_path):
+    """Deux workers : écritures concurrentes sérialisées, sans "database is locked" ni survente."""
+    from benchmarks.workers import arreter, lancer_serveur, port_libre
+
+    base = tmp_path / "workers.db"
+    moteur = create_db_engine(f"sqlite:///{base}")
+    creer_schema(moteur)
+    moteur.dispose()
+
+    port = port_libre()
+    serveur = lancer_serveur(base, 2, port)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as http:
+            auteur = http.post("/authors/add", json={
+                "prenom": "Jules", "nom": "Verne", "nationalite": "FR", "date_naissance": "1828-02-08",
+            })
+            livre = http.post("/books/add", json={
+                "titre": "Vingt mille lieues", "isbn": "9782070612758", "annee_publication": 2000,
+                "nombre_exemplaires_disponibles": 5, "nombre_exemplaires_total": 5,
+                "categorie": "Roman", "langue": "Français", "nombre_pages": 500,
+                "maison_edition": "Hetzel", "auteur_id": auteur.json()["id"],
+            }).json()
+
+        def emprunter(n):
+            with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=30) as http:
+                return http.post("/loans/add", json={
+                    "nom_emprunteur": f"Lecteur {n}", "email_emprunteur": f"l{n}@example.com",
+                    "numero_carte_bibliotheque": f"W-{n}", "statut": "En cours", "livre_id": livre["id"],
+                    "date_limite_retour": (date.today() + timedelta(days=14)).isoformat(),
+                }).status_code
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            statuts = list(pool.map(emprunter, range(12)))
+    finally:
+        arreter(serveur)
+
+    assert sorted(statuts) == [200] * 5 + [409] * 7
+
+
+def test_routage_replique(client, nouveau_livre, tmp_path, monkeypatch):
+    """Avec une réplique, les GET la lisent et les écritures vont à la base principale."""
+    replique = create_db_engine(f"sqlite:///{tmp_path / 'replique.db'}")
+    creer_schema(replique)
+    monkeypatch.setattr(database, "SessionLecture", sessionmaker(autoflush=False, bind=replique))
+
+    livre = nouveau_livre()  # POST : base principale
+    # La réplique vide n'a pas encore reçu le livre
+    assert client.get(f"/books/{livre['id']}").status_code == 404
+    with SessionLocal() as db:
+        assert db.get(Book, livre["id"]) is not None
+    replique.dispose()
+
+
+def test_recherche_jokers_litteraux(client, nouveau_livre):
+    """% et _ saisis dans une recherche sont cherchés tels quels, pas comme jokers LIKE."""
+    nouveau_livre(titre="Réussir à 100 % ?")
+    nouveau_livre(titre="Sans pourcentage")
+    titres = [l["titre"] for l in client.get("/books/search", params={"titre": "%", "page_size": 100}).json()["livres"]]
+    assert "Réussir à 100 % ?" in titres
+    assert all("%" in titre for titre in titres)
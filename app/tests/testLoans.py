@@ -0,0 +1,271 @@
+import csv
+import io
+import itertools
+import json
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from fastapi import HTTPException
+from sqlalchemy import select, update
+from app import config, export, lots
+from app.database import SessionLocal, engine_ecriture
+from app.models import Book, Loan, LoanHistory
+from app.retards import marquer_retards
+from app.schemas.loans import LoansCreate, LoansGet
+from app.stock import emprunter
+
+_cartes = itertools.count(1)
+
+
+def _donnees_emprunt(carte=None):
+    return {
+        "nom_emprunteur": "Lecteur",
+        "email_emprunteur": "lecteur@example.com",
+        "numero_carte_bibliotheque": carte or f"TEST-{next(_cartes)}",
+        "date_emprunt": date.today().isoformat(),
+        "date_limite_retour": (date.today() + timedelta(days=14)).isoformat(),
+        "statut": "Actif",
+    }
+
+
+def test_delete_emprunt(client, nouvel_emprunt, compteur_requetes):
+    """Le livre de l'emprunt est chargé avec lui, pas par une requête paresseuse."""
+    emprunt = nouvel_emprunt()
+    
+    with compteur_requetes() as requetes:
+        response = client.delete(f"/loans/{emprunt['id']}")
+    assert response.status_code == 200
+    assert "Livre" in response.json()["message"]
+    # SELECT emprunt + livre, DELETE
+    assert len([r for r in requetes if r.lstrip().upper().startswith("SELECT")]) == 1
+    
+    assert client.get(f"/loans/{emprunt['id']}").status_code == 404
+
+
+def test_export_ndjson_par_lots(client, nouvel_emprunt, monkeypatch):
+    """L'export est écrit lot par lot, une ligne JSON par emprunt."""
+    monkeypatch.setattr(config, "EXPORT_BATCH_SIZE", 2)
+    ids = {nouvel_emprunt()["id"] for _ in range(5)}
+    
+    response = client.get("/loans/export")
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    lignes = [json.loads(l) for l in response.text.splitlines()]
+    assert ids <= {l["id"] for l in lignes}
+    assert {"email_emprunteur", "date_limite_retour", "livre_id"} <= set(lignes[0])
+    
+    # Un morceau par lot de 2 lignes
+    morceaux = list(export._ndjson(select(Loan.__table__)))
+    assert len(morceaux) == (len(lignes) + 1) // 2
+
+
+def test_export_csv(client, nouvel_emprunt):
+    emprunt = nouvel_emprunt()
+    
+    response = client.get("/loans/export", params={"format": "csv"})
+    assert response.status_code == 200
+    lecteur = csv.DictReader(io.StringIO(response.text))
+    assert lecteur.fieldnames == list(LoansGet.model_fields)
+    assert str(emprunt["id"]) in {l["id"] for l in lecteur}
+    
+    assert client.get("/loans/export", params={"format": "xml"}).status_code == 400
+
+
+def _disponibles(client, livre_id):
+    return client.get(f"/books/{livre_id}").json()["nombre_exemplaires_disponibles"]
+
+
+def test_emprunt_et_retour_du_stock(client, nouveau_livre, nouvel_emprunt):
+    """Emprunter réserve un exemplaire, retourner le rend."""
+    livre = nouveau_livre(nombre_exemplaires_disponibles=1, nombre_exemplaires_total=1)
+    
+    emprunt = nouvel_emprunt(livre_id=livre["id"])
+    assert _disponibles(client, livre["id"]) == 0
+    assert client.get("/books/search", params={"isbn": livre["isbn"], "disponible": False}).json()["total"] == 1
+    
+    response = client.post("/loans/add", json={**_donnees_emprunt(), "livre_id": livre["id"]})
+    assert response.status_code == 409
+    
+    response = client.post(f"/loans/{emprunt['id']}/retour", json={})
+    assert response.status_code == 200
+    assert response.json()["statut"] == "Retourné"
+    assert response.json()["date_retour_effectif"] == date.today().isoformat()
+    assert _disponibles(client, livre["id"]) == 1
+    
+    assert client.post(f"/loans/{emprunt['id']}/retour", json={}).status_code == 409
+    assert client.post("/loans/999999/retour", json={}).status_code == 404
+
+
+def test_retour_par_put_et_suppression(client, nouveau_livre, nouvel_emprunt):
+    livre = nouveau_livre(nombre_exemplaires_disponibles=2, nombre_exemplaires_total=2)
+    premier = nouvel_emprunt(livre_id=livre["id"])
+    second = nouvel_emprunt(livre_id=livre["id"])
+    assert _disponibles(client, livre["id"]) == 0
+    
+    response = client.put(f"/loans/{premier['id']}", json={"statut": "Retourné"})
+    assert response.status_code == 200
+    assert _disponibles(client, livre["id"]) == 1
+    assert client.put(f"/loans/{premier['id']}", json={"statut": "Actif"}).status_code == 409
+    
+    # Retour refusé (date avant l'emprunt) : les autres champs ne sont pas enregistrés non plus
+    veille = (date.today() - timedelta(days=1)).isoformat()
+    response = client.put(f"/loans/{second['id']}", json={
+        "statut": "Retourné", "date_retour_effectif": veille, "nom_emprunteur": "Changé",
+    })
+    assert response.status_code == 400
+    assert client.get(f"/loans/{second['id']}").json()["nom_emprunteur"] == second["nom_emprunteur"]
+    assert _disponibles(client, livre["id"]) == 1
+    
+    # Supprimer un emprunt actif rend son exemplaire
+    client.delete(f"/loans/{second['id']}")
+    assert _disponibles(client, livre["id"]) == 2
+
+
+def test_emprunt_livre_inconnu(client):
+    response = client.post("/loans/add", json={**_donnees_emprunt(), "livre_id": 999999})
+    assert response.status_code == 404
+
+
+def test_emprunts_concurrents_sans_survente(nouveau_livre):
+    """Des centaines d'emprunts simultanés ne vendent jamais plus que le stock."""
+    stock = 25
+    livre = nouveau_livre(nombre_exemplaires_disponibles=stock, nombre_exemplaires_total=stock)
+    
+    def _emprunter(n):
+        db = SessionLocal()
+        try:
+            donnees = LoansCreate(**{**_donnees_emprunt(f"STRESS-{livre['id']}-{n}"), "livre_id": livre["id"]})
+            emprunter(db, donnees)
+            return 200
+        except HTTPException as e:
+            return e.status_code
+        finally:
+            db.close()
+    
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        statuts = list(executor.map(_emprunter, range(300)))
+    
+    assert statuts.count(200) == stock
+    assert statuts.count(409) == 300 - stock
+    
+    db = SessionLocal()
+    try:
+        assert db.get(Book, livre["id"]).nombre_exemplaires_disponibles == 0
+        assert db.query(Loan).filter(Loan.livre_id == livre["id"]).count() == stock
+    finally:
+        db.close()
+
+
+def test_statistiques_incrementales(client, nouveau_livre):
+    """Emprunts et retours tiennent à jour LoanHistory (moyenne glissante)."""
+    livre = nouveau_livre()
+    for jours in (10, 4):
+        donnees = {
+            **_donnees_emprunt(),
+            "livre_id": livre["id"],
+            "date_emprunt": (date.today() - timedelta(days=jours)).isoformat(),
+        }
+        emprunt = client.post("/loans/add", json=donnees).json()
+        client.post(f"/loans/{emprunt['id']}/retour", json={})
+    client.post("/loans/add", json={**_donnees_emprunt(), "livre_id": livre["id"]})
+    
+    db = SessionLocal()
+    try:
+        historique = db.query(LoanHistory).filter(LoanHistory.livre_id == livre["id"]).one()
+        assert historique.nombre_emprunts_total == 3
+        assert historique.popularite == 3
+        assert historique.nombre_retours == 2
+        assert historique.duree_moyenne_emprunt == 7
+    finally:
+        db.close()
+    
+    assert client.get(f"/books/{livre['id']}").json()["popularite"] == 3
+
+
+def _echeance_passee(*emprunts):
+    """Reculer la date limite (l'API refuse une date passée)"""
+    db = SessionLocal()
+    try:
+        db.execute(
+            update(Loan)
+            .where(Loan.id.in_([emprunt["id"] for emprunt in emprunts]))
+            .values(date_limite_retour=date.today() - timedelta(days=1))
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def test_marquer_retards_par_lots(client, nouvel_emprunt):
+    """Les emprunts échus passent 'En retard' par lots ; une seconde passe ne change rien."""
+    emprunts = [nouvel_emprunt() for _ in range(3)]
+    a_jour = nouvel_emprunt()
+    _echeance_passee(*emprunts)
+    
+    # Échus mais pas encore marqués : déjà listés
+    ids = {e["id"] for e in client.get("/loans/overdue", params={"page_size": 1000}).json()["emprunts"]}
+    assert {e["id"] for e in emprunts} <= ids
+    
+    assert marquer_retards(engine_ecriture, taille_lot=2) >= 3
+    assert marquer_retards(engine_ecriture, taille_lot=2) == 0
+    
+    for emprunt in emprunts:
+        assert client.get(f"/loans/{emprunt['id']}").json()["statut"] == "En retard"
+    assert client.get(f"/loans/{a_jour['id']}").json()["statut"] == "Actif"
+    
+    data = client.get("/loans/overdue", params={"page_size": 1000}).json()
+    ids = [e["id"] for e in data["emprunts"]]
+    assert {e["id"] for e in emprunts} <= set(ids) and a_jour["id"] not in ids
+    
+    # Un emprunt en retard se retourne normalement, ou redevient actif si la date limite est repoussée
+    assert client.post(f"/loans/{emprunts[0]['id']}/retour", json={}).json()["statut"] == "Retourné"
+    nouvelle_limite = (date.today() + timedelta(days=7)).isoformat()
+    response = client.put(f"/loans/{emprunts[1]['id']}", json={"date_limite_retour": nouvelle_limite})
+    assert response.json()["statut"] == "Actif"
+
+
+def test_lecture_par_lot_emprunts(client, nouvel_emprunt, compteur_requetes, monkeypatch):
+    """Les ids sont résolus par morceaux de TAILLE_MORCEAU, une requête IN (...) par morceau."""
+    ids = [nouvel_emprunt()["id"] for _ in range(3)]
+    monkeypatch.setattr(lots, "TAILLE_MORCEAU", 2)
+    
+    with compteur_requetes() as requetes:
+        response = client.get("/loans/", params={"ids": ",".join(map(str, [ids[2], -1, ids[0], ids[1]]))})
+    assert [emprunt["id"] for emprunt in response.json()["emprunts"]] == [ids[2], ids[0], ids[1]]
+    assert response.json()["manquants"] == [-1]
+    assert len(requetes) == 2
+    
+    response = client.post("/loans/batch-get", json={"ids": []})
+    assert response.json() == {"emprunts": [], "manquants": []}
+
+
+def test_suppression_livre_et_cles_etrangeres(client, nouvel_emprunt):
+    """Clés étrangères vérifiées : un livre emprunté reste, ses statistiques partent avec lui."""
+    emprunt = nouvel_emprunt()
+    livre_id = emprunt["livre_id"]
+    assert client.delete(f"/books/{livre_id}").status_code == 400
+
+    assert client.delete(f"/loans/{emprunt['id']}").status_code == 200
+    assert client.delete(f"/books/{livre_id}").status_code == 200
+    with SessionLocal() as db:
+        assert db.scalar(select(LoanHistory).where(LoanHistory.livre_id == livre_id)) is None
+
+
+def test_numero_carte_deja_utilise(client, nouvel_emprunt):
+    """Seule l'unicité du numéro de carte donne son message ; l'exemplaire réservé est rendu."""
+    premier = nouvel_emprunt()
+    livre_id = premier["livre_id"]
+    
+    response = client.post("/loans/add", json={
+        **_donnees_emprunt(premier["numero_carte_bibliotheque"]), "livre_id": livre_id,
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Ce numéro de carte est déjà utilisé par un emprunt"
+    assert client.get(f"/books/{livre_id}").json()["nombre_exemplaires_disponibles"] == 2
+    
+    # Une autre contrainte violée n'est plus rapportée comme un numéro de carte en double
+    response = client.post("/loans/add", json={
+        **_donnees_emprunt(), "livre_id": livre_id, "statut": "Retourné",
+        "date_retour_effectif": (date.today() - timedelta(days=1)).isoformat(),
+    })
+    assert response.status_code == 400
+    assert response.json()["detail"] == "La date de retour ne peut pas précéder la date d'emprunt"
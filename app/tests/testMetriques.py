@@ -0,0 +1,95 @@
+import logging
+import re
+import pytest
+from app import config, profilage
+from app.metriques import Histogramme
+
+
+def test_server_timing_compte_les_requetes_sql(client, nouveau_livre, compteur_requetes):
+    """Server-Timing rapporte le temps SQL et le nombre de requêtes de la requête HTTP."""
+    nouveau_livre()
+    with compteur_requetes() as requetes:
+        response = client.get("/books/", params={"page_size": 5})
+    assert response.status_code == 200
+
+    entete = response.headers["server-timing"]
+    nombre = re.search(r'db;dur=[\d.]+;desc="(\d+) requetes SQL"', entete)
+    assert nombre and int(nombre.group(1)) == len(requetes)
+    assert re.search(r"app;dur=[\d.]+", entete)
+
+
+def test_metrics_par_route(client, nouveau_livre):
+    """/metrics expose histogrammes, requêtes en cours et compteurs SQL par gabarit de route."""
+    livre = nouveau_livre()
+    client.get(f"/books/{livre['id']}")
+    client.get("/chemin/inexistant")
+
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    texte = response.text
+
+    # Le gabarit sert d'étiquette, pas le chemin : le nombre de séries reste borné
+    assert 'route="/books/{livre_id}"' in texte
+    assert f'route="/books/{livre["id"]}"' not in texte
+    assert 'route="aucune",status="404"' in texte
+    assert re.search(
+        r'http_request_duration_seconds_bucket\{method="GET",route="/books/\{livre_id\}",status="200",le="\+Inf"\} \d+',
+        texte,
+    )
+    assert re.search(r'http_response_size_bytes_count\{method="POST",route="/books/add",status="200"\} \d+', texte)
+    assert re.search(r'db_queries_total\{method="POST",route="/books/add"\} [1-9]\d*', texte)
+    # La requête /metrics elle-même est en cours pendant l'exposition
+    assert "http_requests_in_flight 1" in texte
+
+
+def test_histogramme_cumulatif():
+    histogramme = Histogramme((0.1, 1.0))
+    for valeur in (0.05, 0.1, 0.5, 3.0):
+        histogramme.observer(valeur)
+    assert list(histogramme.cumuls()) == [(0.1, 2), (1.0, 3), (float("inf"), 4)]
+    assert histogramme.nombre == 4 and histogramme.somme == 3.65
+
+
+def test_profil_debug(client, nouveau_livre, compteur_requetes, monkeypatch):
+    """X-Debug-Profile : chaque requête SQL avec sa durée, et le profil Python du handler."""
+    nouveau_livre(titre="Profil nocturne")
+    params = {"titre": "nocturne", "categorie": "Fiction"}
+
+    # Désactivé par défaut : l'en-tête est ignoré
+    response = client.get("/books/search", params=params, headers={"X-Debug-Profile": "sql"})
+    assert "x-debug-profile-id" not in response.headers
+
+    monkeypatch.setattr(config, "DEBUG_PROFILE_ENABLED", True)
+    with compteur_requetes() as requetes:
+        response = client.get("/books/search", params=params, headers={"X-Debug-Profile": "sql,python"})
+    assert response.status_code == 200
+    profil = client.get(f"/debug/profiles/{response.headers['x-debug-profile-id']}").json()
+
+    assert profil["endpoint"] == "GET /books/search"
+    assert [requete["sql"] for requete in profil["requetes"]] == requetes
+    assert all(requete["duree_ms"] >= 0 for requete in profil["requetes"])
+    # Le handler sync est profilé dans son thread du threadpool
+    assert "search_books" in profil["python"]
+
+    assert client.get("/debug/profiles/inconnu").status_code == 404
+
+
+@pytest.mark.sqlite
+def test_journal_requetes_lentes(client, nouveau_livre, caplog, monkeypatch):
+    """Requêtes lentes journalisées avec endpoint, paramètres et plan, en débit limité."""
+    nouveau_livre()
+    monkeypatch.setattr(config, "SLOW_QUERY_MS", 1e-6)
+    monkeypatch.setattr(profilage.journal_lentes, "limiteur", profilage.Limiteur(1))
+
+    with caplog.at_level(logging.WARNING, logger="app.profilage"):
+        client.get("/books/search", params={"categorie": "Fiction"})
+        client.get("/books/search", params={"categorie": "Fiction"})
+
+    # Une seule entrée par minute : les suivantes sont comptées sans être journalisées
+    assert len(caplog.records) == 1
+    message = caplog.records[0].getMessage()
+    assert "GET /books/search" in message
+    assert "Fiction" in message
+    assert re.search(r"Plan :\n  (SEARCH|SCAN) ", message)
+    assert profilage.journal_lentes.limiteur.omis > 0
@@ -0,0 +1,193 @@
+import math
+import re
+import unicodedata
+from collections import Counter
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from app.models import Author, AuthorTrigram, AuthorTrigramStat
+
+# ===============================
+# Index trigrammes des noms d'auteurs
+# ===============================
+#
+# author.nom_normalise garde "prénom nom" sans accents, casse ni
+# ponctuation ("Fiodor Dostoïevski" -> "fiodor dostoievski") ; la table
+# author_trigram associe chacun de ses trigrammes à l'auteur et
+# author_trigram_stat compte les auteurs de chaque trigramme. Les trois
+# sont écrits avec l'auteur (création, modification, import, suppression).
+#
+# Trigrammes à la manière de pg_trgm : chaque mot est entouré de deux
+# espaces devant et d'un derrière ("  dostoievski "). Une suggestion
+# (GET /authors/suggest?q=) tolère accents et fautes de frappe :
+# - le dernier mot de q est un début de mot, sans l'espace final ;
+# - le score est la part des trigrammes de q présents dans le nom, au moins
+#   SEUIL : un candidat possède forcément l'un des (n - m + 1) trigrammes les
+#   plus rares de q (m = trigrammes exigés sur n). Leurs listes sont lues,
+#   les plus rares d'abord, dans la limite de LIGNES_MAX lignes d'index ;
+# - les CANDIDATS_MAX auteurs les plus présents dans ces listes sont notés
+#   exactement, à score égal les noms les plus courts (les plus proches).
+# Le coût d'une suggestion est ainsi borné quelle que soit la taille du
+# catalogue ; un début de saisie très courant ("ma") ne lit que LIGNES_MAX
+# lignes de sa liste.
+
+SEUIL = 0.5
+
+# Lignes de author_trigram lues au plus par suggestion
+LIGNES_MAX = 6000
+
+# Auteurs notés au plus par suggestion
+CANDIDATS_MAX = 200
+
+LOT = 5000
+
+_SEPARATEURS = re.compile(r"[^0-9a-z]+")
+
+
+def normaliser(texte: str) -> str:
+    """Minuscules sans accents, mots séparés par un espace ("Jean-Paul Sartre" -> "jean paul sartre")"""
+    decompose = unicodedata.normalize("NFKD", texte)
+    sans_accents = "".join(c for c in decompose if not unicodedata.combining(c)).casefold()
+    return " ".join(_SEPARATEURS.split(sans_accents)).strip()
+
+
+def nom_normalise(prenom: str, nom: str) -> str:
+    return normaliser(f"{prenom} {nom}")
+
+
+def _entoure(texte: str) -> str:
+    """Mots entourés comme pour les trigrammes, concaténés : "  victor   hugo " """
+    return "".join(f"  {mot} " for mot in texte.split())
+
+
+def trigrammes(texte: str, prefixe: bool = False) -> set:
+    """Trigrammes d'un texte normalisé ; prefixe: le dernier mot peut se poursuivre"""
+    mots = texte.split()
+    resultat = set()
+    for i, mot in enumerate(mots):
+        entoure = f"  {mot}" if prefixe and i == len(mots) - 1 else f"  {mot} "
+        resultat.update(entoure[j:j + 3] for j in range(len(entoure) - 2))
+    return resultat
+
+
+# ===============================
+# Maintenance
+# ===============================
+
+
+def _ajuster_frequences(db, variations: Counter):
+    """Ajouter les variations aux comptes de author_trigram_stat, en un seul upsert"""
+    variations = [{"trigramme": t, "nombre": n} for t, n in variations.items() if n]
+    if not variations:
+        return
+    # INSERT ... ON CONFLICT DO UPDATE, même syntaxe sur SQLite et PostgreSQL
+    dialecte = getattr(db, "dialect", None) or db.get_bind().dialect
+    insertion = (postgresql.insert if dialecte.name == "postgresql" else sqlite.insert)(AuthorTrigramStat.__table__)
+    db.execute(
+        insertion.on_conflict_do_update(
+            index_elements=["trigramme"],
+            set_={"nombre": AuthorTrigramStat.__table__.c.nombre + insertion.excluded.nombre},
+        ),
+        variations,
+    )
+
+
+def indexer_auteurs(db, auteurs, nouveaux: bool = False):
+    """
+    (Ré)écrire les trigrammes des auteurs donnés en (id, nom_normalise) ; Session ou Connection
+
+    nouveaux: auteurs tout juste insérés, sans trigrammes à retirer.
+    Un nom vide retire l'auteur de l'index (avant sa suppression).
+    """
+    auteurs = list(auteurs)
+    if not auteurs:
+        return
+    variations = Counter()
+    if not nouveaux:
+        ids = [id_ for id_, _ in auteurs]
+        for trigramme, nombre in db.execute(
+            select(AuthorTrigram.trigramme, func.count())
+            .where(AuthorTrigram.auteur_id.in_(ids))
+            .group_by(AuthorTrigram.trigramme)
+        ):
+            variations[trigramme] -= nombre
+        db.execute(delete(AuthorTrigram).where(AuthorTrigram.auteur_id.in_(ids)))
+
+    lignes = [
+        {"trigramme": trigramme, "auteur_id": id_}
+        for id_, nom in auteurs for trigramme in trigrammes(nom)
+    ]
+    if lignes:
+        db.execute(insert(AuthorTrigram), lignes)
+    variations.update(ligne["trigramme"] for ligne in lignes)
+    _ajuster_frequences(db, variations)
+
+
+def reindexer_auteurs(conn):
+    """Reconstruire author_trigram et ses comptes depuis author.nom_normalise (benchmarks ; la migration 0006 a sa propre copie)"""
+    conn.execute(delete(AuthorTrigram))
+    conn.execute(delete(AuthorTrigramStat))
+    lignes = conn.execute(select(Author.id, Author.nom_normalise).order_by(Author.id))
+    while lot := lignes.fetchmany(LOT):
+        conn.execute(insert(AuthorTrigram), [
+            {"trigramme": trigramme, "auteur_id": id_}
+            for id_, nom in lot for trigramme in trigrammes(nom)
+        ])
+    conn.execute(insert(AuthorTrigramStat).from_select(
+        ["trigramme", "nombre"],
+        select(AuthorTrigram.trigramme, func.count()).group_by(AuthorTrigram.trigramme),
+    ))
+
+
+# ===============================
+# Suggestions
+# ===============================
+
+
+def _listes_a_lire(db, cherches: list, exiges: int) -> list:
+    """Trigrammes de q dont les listes sont lues : les plus rares, dans la limite de LIGNES_MAX"""
+    frequences = sorted(
+        (nombre, trigramme) for trigramme, nombre in db.execute(
+            select(AuthorTrigramStat.trigramme, AuthorTrigramStat.nombre)
+            .where(AuthorTrigramStat.trigramme.in_(cherches), AuthorTrigramStat.nombre > 0)
+        )
+    )
+    listes, lignes = [], 0
+    for nombre, trigramme in frequences[:len(cherches) - exiges + 1]:
+        if listes and lignes + nombre > LIGNES_MAX:
+            break
+        listes.append(trigramme)
+        lignes += nombre
+    return listes
+
+
+def suggerer_auteurs(db, q: str, limite: int = 10) -> list:
+    """Auteurs les plus proches de q, par similarité décroissante : [{id, prenom, nom, similarite}]"""
+    cherches = sorted(trigrammes(normaliser(q), prefixe=True))
+    exiges = math.ceil(SEUIL * len(cherches))
+    listes = _listes_a_lire(db, cherches, exiges) if cherches else []
+    if not listes:
+        return []
+
+    lues = (
+        select(AuthorTrigram.auteur_id).where(AuthorTrigram.trigramme.in_(listes)).limit(LIGNES_MAX).subquery()
+    )
+    presents = (
+        select(lues.c.auteur_id).group_by(lues.c.auteur_id)
+        .order_by(func.count().desc()).limit(CANDIDATS_MAX).subquery()
+    )
+    candidats = db.execute(
+        select(Author.id, Author.prenom, Author.nom, Author.nom_normalise)
+        .join(presents, presents.c.auteur_id == Author.id)
+    )
+
+    notes = []
+    for id_, prenom, nom, normalise in candidats:
+        # Un trigramme de q figure dans le nom entouré si et seulement s'il est l'un des siens
+        entoure = _entoure(normalise)
+        communs = sum(trigramme in entoure for trigramme in cherches)
+        if communs >= exiges:
+            notes.append((-communs, len(normalise), normalise, id_, prenom, nom))
+    return [
+        {"id": id_, "prenom": prenom, "nom": nom, "similarite": round(-communs / len(cherches), 3)}
+        for communs, _, _, id_, prenom, nom in sorted(notes)[:limite]
+    ]
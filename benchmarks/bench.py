@@ -0,0 +1,362 @@
+"""
+Banc de performance des endpoints des trois routers
+
+    python -m benchmarks.bench --echelle 10k                 # mesurer et comparer à la référence
+    python -m benchmarks.bench --echelle 10k --enregistrer   # remplacer la référence de l'échelle
+    python -m benchmarks.bench --echelle 1m --scenarios "GET /books"
+
+Le catalogue synthétique (benchmarks/generer.py) est généré une fois par
+échelle et graine dans benchmarks/data/, puis copié avant chaque exécution :
+les scénarios d'écriture ne modifient jamais la base de référence.
+Chaque scénario passe par un TestClient (même processus, sans réseau) ;
+on mesure débit, latences p50/p95/p99 et nombre moyen de requêtes SQL.
+
+Code de sortie 1 si un scénario régresse au-delà du seuil par rapport à
+benchmarks/baseline.json (latence médiane, ou requêtes SQL en plus), ou si
+un endpoint répond par une erreur.
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+from app.schemas.validation import isbn13
+
+DOSSIER = Path(__file__).resolve().parent
+REFERENCE = DOSSIER / "baseline.json"
+
+# Latence médiane tolérée au-dessus de la référence (proportion), et plancher en ms :
+# sous ce plancher les écarts relèvent du bruit de mesure. La comparaison porte
+# sur p50 : p95/p99 des écritures dépendent trop des fsync pour servir de seuil.
+SEUIL = 0.5
+PLANCHER_MS = 1.0
+
+MOTS_RECHERCHE = ("nuit", "prince", "mer", "jardin", "lumière", "voyage")
+NOMS_RECHERCHE = ("hugo", "sand", "zola", "duras", "camus")
+
+
+# ===============================
+# Scénarios
+# ===============================
+#
+# Un scénario est (nom, nombre d'itérations, fonction(rng, etat) -> (méthode, chemin, options)).
+# etat porte les volumes du catalogue et les ids créés par les scénarios
+# d'écriture, consommés ensuite par les mises à jour et suppressions.
+
+
+def _livre(etat, **champs):
+    n = next(etat["sequence"])
+    donnees = {
+        "titre": f"Banc {n}",
+        "isbn": isbn13(f"979{n:09d}"),
+        "annee_publication": 2000,
+        "nombre_exemplaires_disponibles": 1000,
+        "nombre_exemplaires_total": 1000,
+        "categorie": "Fiction",
+        "langue": "Français",
+        "nombre_pages": 200,
+        "maison_edition": "Banc",
+        "auteur_id": 1,
+    }
+    donnees.update(champs)
+    return donnees
+
+
+def _auteur(etat):
+    n = next(etat["sequence"])
+    return {"prenom": "Banc", "nom": f"Auteur{n}", "nationalite": "FR", "date_naissance": "1970-01-01"}
+
+
+def _emprunt(etat, livre_id):
+    n = next(etat["sequence"])
+    return {
+        "nom_emprunteur": f"Banc {n}",
+        "email_emprunteur": f"banc{n}@example.com",
+        "numero_carte_bibliotheque": f"BANC-{n}",
+        "date_limite_retour": (date.today() + timedelta(days=21)).isoformat(),
+        "statut": "Actif",
+        "livre_id": livre_id,
+    }
+
+
+def _cree(reponse):
+    return reponse.json()["id"]
+
+
+def scenarios(iterations: int, lourds: int) -> list:
+    """Scénarios dans l'ordre d'exécution : lectures, créations, mises à jour, suppressions"""
+    return [
+        # Lectures
+        ("GET /", iterations, lambda rng, e: ("GET", "/", {})),
+        ("GET /books/ (page)", iterations, lambda rng, e: (
+            "GET", "/books/", {"params": {"page": rng.randint(1, 50), "page_size": 20}})),
+        ("GET /books/ (curseur, popularite)", iterations, lambda rng, e: (
+            "GET", "/books/", {"params": {"cursor": True, "sort_by": "popularite", "order": "desc",
+                                          "page_size": 20}})),
+        ("GET /books/ (tri auteur)", iterations, lambda rng, e: (
+            "GET", "/books/", {"params": {"sort_by": "auteur", "page_size": 20}})),
+        ("GET /books/ (page_size=1000)", lourds * 5, lambda rng, e: (
+            "GET", "/books/", {"params": {"page": rng.randint(1, 5), "page_size": 1000}})),
+        ("GET /books/{id}", iterations, lambda rng, e: ("GET", f"/books/{rng.randint(1, e['livres'])}", {})),
+        ("POST /books/batch-get (50 ids)", iterations, lambda rng, e: (
+            "POST", "/books/batch-get", {"json": {"ids": rng.sample(range(1, e["livres"] + 1), 50)}})),
+        ("GET /books/search?titre", iterations, lambda rng, e: (
+            "GET", "/books/search", {"params": {"titre": rng.choice(MOTS_RECHERCHE), "page_size": 20}})),
+        ("GET /books/search?categorie&langue&annee_min", iterations, lambda rng, e: (
+            "GET", "/books/search", {"params": {"categorie": "Fiction", "langue": "Français",
+                                                "annee_min": rng.randint(1850, 2000), "page_size": 20}})),
+        ("GET /books/search?auteur", iterations, lambda rng, e: (
+            "GET", "/books/search", {"params": {"auteur": rng.choice(NOMS_RECHERCHE), "page_size": 20}})),
+        ("GET /authors/", lourds, lambda rng, e: ("GET", "/authors/", {})),
+        ("GET /authors/{id}", iterations, lambda rng, e: ("GET", f"/authors/{rng.randint(1, e['auteurs'])}", {})),
+        ("GET /authors/search?nationalite", iterations, lambda rng, e: (
+            "GET", "/authors/search", {"params": {"nationalite": "FR", "page": rng.randint(1, 20),
+                                                  "page_size": 20}})),
+        ("GET /authors/search?nom", iterations, lambda rng, e: (
+            "GET", "/authors/search", {"params": {"nom": rng.choice(NOMS_RECHERCHE), "page_size": 20}})),
+        ("GET /authors/export", lourds, lambda rng, e: ("GET", "/authors/export", {})),
+        ("GET /loans/", lourds, lambda rng, e: ("GET", "/loans/", {})),
+        ("GET /loans/{id}", iterations, lambda rng, e: ("GET", f"/loans/{rng.randint(1, e['emprunts'])}", {})),
+        ("GET /loans/overdue", iterations, lambda rng, e: (
+            "GET", "/loans/overdue", {"params": {"page": rng.randint(1, 10), "page_size": 20}})),
+        ("GET /loans/export", lourds, lambda rng, e: ("GET", "/loans/export", {})),
+        ("GET /cache/stats", iterations, lambda rng, e: ("GET", "/cache/stats", {})),
+        # Créations
+        ("POST /authors/add", iterations, lambda rng, e: ("POST", "/authors/add", {"json": _auteur(e)})),
+        ("POST /authors/bulk (100)", lourds, lambda rng, e: (
+            "POST", "/authors/bulk", {"json": [_auteur(e) for _ in range(100)]})),
+        ("POST /books/add", iterations, lambda rng, e: (
+            "POST", "/books/add", {"json": _livre(e, auteur_id=rng.randint(1, e["auteurs"]))})),
+        ("POST /books/bulk (100)", lourds, lambda rng, e: (
+            "POST", "/books/bulk", {"json": [_livre(e, auteur_id=rng.randint(1, e["auteurs"]))
+                                             for _ in range(100)]})),
+        ("POST /loans/add", iterations, lambda rng, e: (
+            "POST", "/loans/add", {"json": _emprunt(e, rng.choice(e["livres_crees"]))})),
+        # Mises à jour
+        ("PUT /authors/{id}", iterations, lambda rng, e: (
+            "PUT", f"/authors/{rng.choice(e['auteurs_crees'])}", {"json": {"prenom": f"Banc{rng.random()}"}})),
+        ("PUT /books/{id}", iterations, lambda rng, e: (
+            "PUT", f"/books/{rng.choice(e['livres_crees'])}", {"json": {"nombre_pages": rng.randint(60, 900)}})),
+        ("PUT /loans/{id}", iterations, lambda rng, e: (
+            "PUT", f"/loans/{rng.choice(e['emprunts_crees'])}", {"json": {"commentaires": "banc"}})),
+        ("POST /loans/{id}/retour", iterations, lambda rng, e: (
+            "POST", f"/loans/{e['emprunts_crees'][e['retours']]}/retour", {"json": {}})),
+        # Suppressions (emprunts, puis livres, puis auteurs sans livres)
+        ("DELETE /loans/{id}", iterations, lambda rng, e: ("DELETE", f"/loans/{e['emprunts_crees'].pop()}", {})),
+        ("DELETE /books/{id}", iterations, lambda rng, e: ("DELETE", f"/books/{e['livres_crees'].pop()}", {})),
+        ("DELETE /authors/{id}", iterations, lambda rng, e: ("DELETE", f"/authors/{e['auteurs_crees'].pop()}", {})),
+    ]
+
+
+def _suivre(nom, reponse, etat):
+    """Mémoriser les ids créés pour les scénarios suivants"""
+    if reponse.status_code >= 400:
+        return
+    if nom == "POST /authors/add":
+        etat["auteurs_crees"].append(_cree(reponse))
+    elif nom == "POST /books/add":
+        etat["livres_crees"].append(_cree(reponse))
+    elif nom == "POST /loans/add":
+        etat["emprunts_crees"].append(_cree(reponse))
+    elif nom == "POST /loans/{id}/retour":
+        etat["retours"] += 1
+
+
+# ===============================
+# Mesure
+# ===============================
+
+
+def etalonner() -> float:
+    """
+    Durée (ms) d'un travail CPU fixe : vitesse de la machine au moment de la mesure
+
+    Sur une machine plus lente (ou plus chargée) que lors de l'enregistrement,
+    les références sont ramenées à sa vitesse avant comparaison. L'étalon n'est
+    jamais utilisé pour durcir les seuils : une mesure d'étalon trop rapide
+    (fréquence CPU momentanément haute) créerait de fausses régressions.
+    """
+    durees = []
+    for _ in range(5):
+        debut = time.perf_counter()
+        json.loads(json.dumps([{"id": i, "titre": f"Livre {i}", "pages": i * 3} for i in range(20_000)]))
+        durees.append((time.perf_counter() - debut) * 1000)
+    return min(durees)
+
+
+def _percentiles(durees):
+    if len(durees) < 2:
+        return durees[0], durees[0], durees[0]
+    coupes = statistics.quantiles(durees, n=100, method="inclusive")
+    return coupes[49], coupes[94], coupes[98]
+
+
+def mesurer(client, engine, etat, liste, graine: int, filtre: str = None) -> dict:
+    """Exécuter les scénarios ; renvoie nom -> métriques"""
+    from sqlalchemy import event
+
+    compteur = [0]
+
+    def _compter(*args):
+        compteur[0] += 1
+
+    event.listen(engine, "before_cursor_execute", _compter)
+    resultats = {}
+    try:
+        for nom, iterations, requete in liste:
+            if filtre and filtre not in nom:
+                continue
+            rng = random.Random(f"{graine}:{nom}")
+            durees, requetes_sql, erreurs = [], 0, 0
+            for _ in range(iterations):
+                try:
+                    methode, chemin, options = requete(rng, etat)
+                except IndexError:
+                    # Plus d'id créé à consommer (scénario de création filtré ou en erreur)
+                    break
+                compteur[0] = 0
+                debut = time.perf_counter()
+                reponse = client.request(methode, chemin, **options)
+                durees.append((time.perf_counter() - debut) * 1000)
+                requetes_sql += compteur[0]
+                erreurs += reponse.status_code >= 400
+                _suivre(nom, reponse, etat)
+            if not durees:
+                print(f"{nom} : ignoré, aucun id créé à utiliser")
+                continue
+            p50, p95, p99 = _percentiles(durees)
+            resultats[nom] = {
+                "n": len(durees),
+                "rps": round(len(durees) / (sum(durees) / 1000), 1),
+                "p50_ms": round(p50, 3),
+                "p95_ms": round(p95, 3),
+                "p99_ms": round(p99, 3),
+                "requetes_sql": round(requetes_sql / len(durees), 2),
+                "erreurs": erreurs,
+            }
+    finally:
+        event.remove(engine, "before_cursor_execute", _compter)
+    return resultats
+
+
+def comparer(resultats: dict, reference: dict, seuil: float = SEUIL, plancher_ms: float = PLANCHER_MS,
+             vitesse: float = 1.0) -> list:
+    """
+    Régressions par rapport à la référence (liste de messages, vide si aucune)
+
+    vitesse: étalon actuel / étalon de la référence (> 1 : machine plus lente)
+    """
+    regressions = []
+    for nom, mesure in resultats.items():
+        if mesure["erreurs"]:
+            regressions.append(f"{nom} : {mesure['erreurs']} réponse(s) en erreur")
+        base = reference.get(nom)
+        if base is None:
+            continue
+        attendu = base["p50_ms"] * vitesse
+        limite = max(attendu * (1 + seuil), attendu + plancher_ms)
+        if mesure["p50_ms"] > limite:
+            regressions.append(f"{nom} : p50 {mesure['p50_ms']:.2f} ms > {limite:.2f} ms (référence {base['p50_ms']:.2f})")
+        if mesure["requetes_sql"] > base["requetes_sql"]:
+            regressions.append(f"{nom} : {mesure['requetes_sql']} requêtes SQL > {base['requetes_sql']}")
+    return regressions
+
+
+def afficher(resultats: dict, reference: dict):
+    print(f"{'scénario':<48} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'SQL':>6}  {'Δp50':>7}")
+    for nom, m in resultats.items():
+        base = reference.get(nom)
+        ecart = f"{(m['p50_ms'] / base['p50_ms'] - 1) * 100:+.0f}%" if base and base["p50_ms"] else ""
+        print(f"{nom:<48} {m['rps']:>8.1f} {m['p50_ms']:>8.2f} {m['p95_ms']:>8.2f} {m['p99_ms']:>8.2f} "
+              f"{m['requetes_sql']:>6.2f}  {ecart:>7}")
+
+
+def _base(echelle: str, graine: int) -> Path:
+    """Catalogue de référence de l'échelle (généré au premier usage)"""
+    from benchmarks.generer import VERSION, generer
+
+    chemin = DOSSIER / "data" / f"catalogue-{echelle}-{graine}-v{VERSION}.db"
+    if not chemin.exists():
+        chemin.parent.mkdir(exist_ok=True)
+        print(f"Génération du catalogue {echelle} dans {chemin}...")
+        temporaire = chemin.with_suffix(".tmp")
+        temporaire.unlink(missing_ok=True)
+        generer(f"sqlite:///{temporaire}", echelle, graine)
+        temporaire.rename(chemin)
+    return chemin
+
+
+def main(argv=None) -> int:
+    from benchmarks.generer import ECHELLES
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--echelle", choices=ECHELLES, default="10k")
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--iterations", type=int, default=200, help="requêtes par scénario")
+    parser.add_argument("--iterations-lourdes", type=int, default=10,
+                        help="requêtes des scénarios qui lisent une table entière")
+    parser.add_argument("--scenarios", help="ne garder que les scénarios dont le nom contient ce texte")
+    parser.add_argument("--reference", type=Path, default=REFERENCE)
+    parser.add_argument("--seuil", type=float, default=SEUIL)
+    parser.add_argument("--enregistrer", action="store_true", help="écrire les mesures comme nouvelle référence")
+    parser.add_argument("--sortie", type=Path, help="écrire les mesures dans ce fichier JSON")
+    args = parser.parse_args(argv)
+
+    # Copie de travail : la base doit être choisie avant d'importer l'application
+    travail = Path(tempfile.mkdtemp(prefix="bibliotheque-bench-")) / "bench.db"
+    shutil.copy(_base(args.echelle, args.graine), travail)
+    os.environ["DATABASE_URL"] = f"sqlite:///{travail}"
+
+    from fastapi.testclient import TestClient
+    from app.database import engine
+    from app.main import app
+
+    livres = ECHELLES[args.echelle]
+    etat = {
+        "livres": livres, "auteurs": max(livres // 10, 1), "emprunts": livres,
+        "livres_crees": [], "auteurs_crees": [], "emprunts_crees": [], "retours": 0,
+        "sequence": itertools.count(1),
+    }
+    liste = scenarios(args.iterations, args.iterations_lourdes)
+    # Étalon avant et après : la charge de la machine peut changer pendant la mesure
+    etalon = etalonner()
+    try:
+        resultats = mesurer(TestClient(app), engine, etat, liste, args.graine, args.scenarios)
+        etalon = (etalon + etalonner()) / 2
+    finally:
+        engine.dispose()
+        shutil.rmtree(travail.parent, ignore_errors=True)
+
+    references = json.loads(args.reference.read_text()) if args.reference.exists() else {}
+    reference = references.get(args.echelle, {})
+    scenarios_reference = reference.get("scenarios", {})
+    vitesse = max(1.0, etalon / reference["etalon_ms"]) if reference.get("etalon_ms") else 1.0
+    print(f"Étalon CPU : {etalon:.1f} ms (vitesse relative à la référence : {vitesse:.2f})")
+    afficher(resultats, scenarios_reference)
+
+    if args.sortie:
+        args.sortie.write_text(json.dumps(resultats, indent=2, ensure_ascii=False) + "\n")
+    if args.enregistrer:
+        references[args.echelle] = {
+            "etalon_ms": round(etalon, 2),
+            "scenarios": {**scenarios_reference, **resultats},
+        }
+        args.reference.write_text(json.dumps(references, indent=2, ensure_ascii=False) + "\n")
+        print(f"Référence {args.echelle} enregistrée dans {args.reference}")
+        return 0
+
+    regressions = comparer(resultats, scenarios_reference, args.seuil, vitesse=vitesse)
+    for message in regressions:
+        print(f"RÉGRESSION {message}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
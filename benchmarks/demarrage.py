@@ -0,0 +1,98 @@
+"""
+Budget de temps d'import de l'application (python -X importtime)
+
+    python -m benchmarks.demarrage                 # mesurer et comparer au budget
+    python -m benchmarks.demarrage --budget 1200 --repetitions 10
+
+Chaque worker uvicorn importe app.main : ce temps est payé N fois au
+démarrage de N workers. L'import est mesuré dans un processus neuf, sur
+une base qui n'existe pas : il ne doit ni la créer ni y lire quoi que ce
+soit (le schéma se crée avec `alembic upgrade head`).
+
+Code de sortie 1 si l'import dépasse le budget (ramené à la vitesse de la
+machine par l'étalon CPU de benchmarks/bench.py) ou s'il a créé la base.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+from benchmarks.bench import REFERENCE, etalonner
+
+RACINE = Path(__file__).resolve().parent.parent
+
+MODULE = "app.main"
+
+# Import cumulé de app.main (ms) à la vitesse de l'étalon de référence
+BUDGET_MS = 1500.0
+
+# Modules affichés, par temps propre décroissant
+LIGNES = 10
+
+
+def lire_importtime(sortie: str) -> list:
+    """Lignes 'import time: self | cumulé | module' -> [(module, propre_ms, cumule_ms)]"""
+    modules = []
+    for ligne in sortie.splitlines():
+        if not ligne.startswith("import time:") or "self [us]" in ligne:
+            continue
+        propre, cumule, nom = ligne[len("import time:"):].split("|")
+        modules.append((nom.strip(), int(propre) / 1000, int(cumule) / 1000))
+    return modules
+
+
+def mesurer_import(module: str = MODULE) -> dict:
+    """Importer module dans un processus neuf ; durées en ms et effet sur la base"""
+    with tempfile.TemporaryDirectory(prefix="bibliotheque-import-") as dossier:
+        base = Path(dossier) / "absente.db"
+        env = {**os.environ, "DATABASE_URL": f"sqlite:///{base}"}
+        processus = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=RACINE, env=env, capture_output=True, text=True, check=True,
+        )
+        base_creee = base.exists()
+
+    modules = lire_importtime(processus.stderr)
+    return {
+        "total_ms": next(cumule for nom, _, cumule in modules if nom == module),
+        "application_ms": sum(propre for nom, propre, _ in modules if nom.split(".")[0] == "app"),
+        "modules": sorted(modules, key=lambda m: m[1], reverse=True),
+        "base_creee": base_creee,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=float, default=BUDGET_MS, help="ms, à la vitesse de référence")
+    parser.add_argument("--repetitions", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    # Meilleure des mesures : les suivantes profitent du cache disque des .pyc
+    mesures = [mesurer_import() for _ in range(args.repetitions)]
+    meilleure = min(mesures, key=lambda m: m["total_ms"])
+
+    reference = json.loads(REFERENCE.read_text()) if REFERENCE.exists() else {}
+    etalon_reference = reference.get("10k", {}).get("etalon_ms")
+    etalon = etalonner()
+    vitesse = max(1.0, etalon / etalon_reference) if etalon_reference else 1.0
+    budget = args.budget * vitesse
+
+    print(f"import {MODULE} : {meilleure['total_ms']:.0f} ms (budget {budget:.0f} ms, "
+          f"dont {meilleure['application_ms']:.0f} ms dans les modules app.*)")
+    for nom, propre, cumule in meilleure["modules"][:LIGNES]:
+        print(f"  {propre:8.1f} ms  {cumule:8.1f} ms  {nom}")
+
+    echec = False
+    if any(m["base_creee"] for m in mesures):
+        print("ÉCHEC : l'import a créé la base de données")
+        echec = True
+    if meilleure["total_ms"] > budget:
+        print(f"ÉCHEC : import au-delà du budget de {budget:.0f} ms")
+        echec = True
+    return 1 if echec else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
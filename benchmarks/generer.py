@@ -0,0 +1,205 @@
+"""
+Générateur de catalogue synthétique reproductible
+
+    python -m benchmarks.generer --echelle 100k --sortie /tmp/bench.db
+
+Une échelle fixe le nombre de livres ; les auteurs sont dix fois moins
+nombreux, les emprunts aussi nombreux que les livres. La même graine
+produit toujours la même base (mêmes titres, ids, stocks et statistiques) ;
+les dates sont relatives au jour de la génération.
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+from sqlalchemy import create_engine, insert
+from app.models import Author, Base, Book, CategorieEnum, Loan, LoanHistory, StatutEmpruntEnum
+from app.search import install_fts
+from app.trigrammes import nom_normalise, reindexer_auteurs
+
+ECHELLES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+# À incrémenter quand le schéma change : les catalogues déjà générés sont alors recréés
+VERSION = 2
+
+# Lignes par INSERT multi-valeurs (une transaction pour toute la génération)
+LOT = 10_000
+
+MOTS = (
+    "nuit jour mer ciel terre feu vent pierre rose lune soleil ombre lumière chemin maison jardin "
+    "forêt rivière montagne ville voyage guerre paix amour mémoire silence temps hiver été automne "
+    "printemps royaume prince reine enfant père mère frère sœur ami ennemi secret promesse retour "
+    "départ dernier premier petit grand long noir blanc rouge bleu vert perdu caché sauvage "
+    "éternel dernière nouvelle histoire chronique légende voix regard cœur âme rêve songe île port"
+).split()
+PRENOMS = (
+    "Marie Jean Pierre Anne Louis Claire Paul Sophie Jacques Camille Victor Emma Albert Simone "
+    "Honoré Colette Gustave Marguerite Émile George Antoine Annie Romain Patrick Amélie Boris"
+).split()
+NOMS = (
+    "Hugo Sand Zola Duras Camus Proust Sagan Balzac Flaubert Verne Dumas Colette Ernaux Modiano "
+    "Yourcenar Céline Gide Giono Queneau Perec Vian Pagnol Maupassant Stendhal Rimbaud Verlaine"
+).split()
+NATIONALITES = ("FR", "BE", "CH", "CA", "EN", "US", "DE", "IT", "ES", "JP")
+LANGUES = ("Français", "Anglais", "Espagnol", "Allemand", "Italien")
+EDITEURS = ("Gallimard", "Seuil", "Flammarion", "Grasset", "Actes Sud", "Minuit", "POL")
+CATEGORIES = tuple(categorie.value for categorie in CategorieEnum)
+
+ACTIF = StatutEmpruntEnum.ACTIF.value
+RETOURNE = StatutEmpruntEnum.RETOURNE.value
+EN_RETARD = StatutEmpruntEnum.EN_RETARD.value
+
+
+def _par_lots(lignes):
+    lot = []
+    for ligne in lignes:
+        lot.append(ligne)
+        if len(lot) == LOT:
+            yield lot
+            lot = []
+    if lot:
+        yield lot
+
+
+def _auteurs(rng, nombre):
+    for i in range(1, nombre + 1):
+        prenom = rng.choice(PRENOMS)
+        # Suffixe numérique : (prenom, nom) est unique
+        nom = f"{rng.choice(NOMS)}{i}"
+        yield {
+            "id": i,
+            "prenom": prenom,
+            "nom": nom,
+            "date_naissance": date(1800, 1, 1) + timedelta(days=rng.randrange(200 * 365)),
+            "nationalite": rng.choice(NATIONALITES),
+            "nom_normalise": nom_normalise(prenom, nom),
+        }
+
+
+def _emprunts(rng, nombre, totaux, actifs, aujourd_hui):
+    """
+    Emprunts : (ligne, durée si retourné) ; actifs compte les emprunts en cours par livre
+
+    Un emprunt n'est actif que s'il reste un exemplaire : les stocks
+    générés respectent donc la contrainte disponibles <= total.
+    """
+    for i in range(1, nombre + 1):
+        livre_id = rng.randrange(1, len(totaux) + 1)
+        if rng.random() < 0.3 and actifs[livre_id - 1] < totaux[livre_id - 1]:
+            # En cours : emprunté dans les 30 derniers jours, en retard après 21 jours
+            actifs[livre_id - 1] += 1
+            debut = aujourd_hui - timedelta(days=rng.randrange(30))
+            limite = debut + timedelta(days=21)
+            statut = ACTIF if limite >= aujourd_hui else EN_RETARD
+            retour, duree = None, None
+        else:
+            debut = aujourd_hui - timedelta(days=rng.randrange(60, 3 * 365))
+            limite = debut + timedelta(days=21)
+            duree = rng.randrange(1, 60)
+            statut, retour = RETOURNE, debut + timedelta(days=duree)
+        yield {
+            "id": i,
+            "nom_emprunteur": f"Lecteur {i}",
+            "email_emprunteur": f"lecteur{i}@example.com",
+            "numero_carte_bibliotheque": f"C{i:09d}",
+            "date_emprunt": debut,
+            "date_limite_retour": limite,
+            "date_retour_effectif": retour,
+            "statut": statut,
+            "commentaires": None,
+            "livre_id": livre_id,
+        }, duree
+
+
+def generer(url: str, echelle: str = "10k", graine: int = 42) -> dict:
+    """Créer le schéma et le catalogue synthétique dans une base vide ; renvoie les volumes"""
+    livres = ECHELLES[echelle]
+    auteurs = max(livres // 10, 1)
+    rng = random.Random(graine)
+    aujourd_hui = date.today()
+    engine = create_engine(url)
+    Base.metadata.create_all(engine)
+
+    totaux = [rng.randint(1, 8) for _ in range(livres)]
+    actifs = [0] * livres
+    emprunts_par_livre = [0] * livres
+    durees = {}
+
+    with engine.begin() as conn:
+        for lot in _par_lots(_auteurs(rng, auteurs)):
+            conn.execute(insert(Author), lot)
+
+        # Emprunts d'abord : ils fixent les stocks disponibles et les statistiques
+        lot = []
+        for emprunt, duree in _emprunts(rng, livres, totaux, actifs, aujourd_hui):
+            emprunts_par_livre[emprunt["livre_id"] - 1] += 1
+            if duree is not None:
+                somme, nombre = durees.get(emprunt["livre_id"], (0, 0))
+                durees[emprunt["livre_id"]] = (somme + duree, nombre + 1)
+            lot.append(emprunt)
+            if len(lot) == LOT:
+                conn.execute(insert(Loan), lot)
+                lot = []
+        if lot:
+            conn.execute(insert(Loan), lot)
+
+        def _livres():
+            for i in range(1, livres + 1):
+                yield {
+                    "id": i,
+                    "titre": " ".join(rng.choice(MOTS) for _ in range(rng.randint(2, 5))).capitalize(),
+                    "isbn": f"978{i:010d}",
+                    "annee_publication": rng.randint(1850, aujourd_hui.year),
+                    "nombre_exemplaires_total": totaux[i - 1],
+                    "nombre_exemplaires_disponibles": totaux[i - 1] - actifs[i - 1],
+                    "categorie": rng.choice(CATEGORIES),
+                    "langue": rng.choice(LANGUES),
+                    "nombre_pages": rng.randint(60, 1200),
+                    "maison_edition": rng.choice(EDITEURS),
+                    "popularite": emprunts_par_livre[i - 1],
+                    "auteur_id": rng.randint(1, auteurs),
+                }
+
+        for lot in _par_lots(_livres()):
+            conn.execute(insert(Book), lot)
+
+        def _historique():
+            for i, nombre in enumerate(emprunts_par_livre, start=1):
+                if nombre:
+                    somme, retours = durees.get(i, (0, 0))
+                    yield {
+                        "livre_id": i,
+                        "nombre_emprunts_total": nombre,
+                        "popularite": nombre,
+                        "nombre_retours": retours,
+                        "duree_moyenne_emprunt": somme / retours if retours else None,
+                    }
+
+        for lot in _par_lots(_historique()):
+            conn.execute(insert(LoanHistory), lot)
+
+    # Index plein texte et trigrammes construits en une fois, après les insertions
+    install_fts(engine)
+    with engine.begin() as conn:
+        reindexer_auteurs(conn)
+        conn.exec_driver_sql("ANALYZE")
+    engine.dispose()
+    return {"auteurs": auteurs, "livres": livres, "emprunts": livres}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--echelle", choices=ECHELLES, default="10k")
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--sortie", required=True, help="fichier SQLite à créer")
+    args = parser.parse_args(argv)
+
+    debut = time.perf_counter()
+    volumes = generer(f"sqlite:///{args.sortie}", args.echelle, args.graine)
+    print(f"{volumes} générés en {time.perf_counter() - debut:.1f} s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
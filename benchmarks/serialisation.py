@@ -0,0 +1,83 @@
+"""
+Sérialisation d'une page de 1000 livres : chemin ORM + Pydantic contre colonnes + orjson
+
+    python -m benchmarks.serialisation --echelle 10k --repetitions 30
+
+Mesure, sur le catalogue synthétique, le corps de GET /books/?page_size=1000
+produit de deux façons :
+- ORM : objets Book, validation BookGet_All (from_attributes) puis JSON standard,
+  comme le faisait response_model ;
+- colonnes : tuples lus par COLONNES_LIVRE, dicts, puis orjson (chemin actuel).
+"""
+import argparse
+import json
+import statistics
+import sys
+import time
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+from benchmarks.bench import _base
+from benchmarks.generer import ECHELLES
+
+TAILLE_PAGE = 1000
+
+
+def _orm(session):
+    from app.models import Book
+    from app.schemas.book import BookGet_All
+
+    livres = session.query(Book).order_by(Book.titre, Book.id).limit(TAILLE_PAGE).all()
+    modele = BookGet_All.model_validate({"livres": livres, "taille_page": TAILLE_PAGE})
+    return json.dumps(jsonable_encoder(modele)).encode()
+
+
+def _colonnes(session):
+    from app.models import Book
+    from app.routers.book import COLONNES_LIVRE
+    from app.schemas.book import BookGet
+    from app.serialisation import en_dicts
+
+    lignes = session.query(*COLONNES_LIVRE).order_by(Book.titre, Book.id).limit(TAILLE_PAGE).all()
+    return ORJSONResponse({"livres": en_dicts(lignes, BookGet), "taille_page": TAILLE_PAGE}).body
+
+
+def mesurer(fonction, engine, repetitions: int) -> list:
+    durees = []
+    for _ in range(repetitions):
+        # Session neuve : pas d'objets déjà présents dans l'identity map
+        with Session(engine) as session:
+            debut = time.perf_counter()
+            fonction(session)
+            durees.append((time.perf_counter() - debut) * 1000)
+    return durees
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--echelle", choices=ECHELLES, default="10k")
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--repetitions", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    engine = create_engine(f"sqlite:///{_base(args.echelle, args.graine)}")
+    with Session(engine) as session:
+        # Mêmes livres, même ordre, mêmes valeurs
+        assert json.loads(_orm(session))["livres"] == json.loads(_colonnes(session))["livres"]
+
+    resultats = {}
+    for nom, fonction in (("ORM + Pydantic + json", _orm), ("colonnes + orjson", _colonnes)):
+        mesurer(fonction, engine, 3)
+        durees = mesurer(fonction, engine, args.repetitions)
+        resultats[nom] = statistics.median(durees)
+        print(f"{nom:<24} p50 {resultats[nom]:7.2f} ms   min {min(durees):7.2f} ms")
+
+    orm, rapide = resultats.values()
+    print(f"Accélération : x{orm / rapide:.1f}")
+    engine.dispose()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+"""
+Suggestions d'auteurs (GET /authors/suggest) sur un grand nombre d'auteurs
+
+    python -m benchmarks.suggestion                        # 500 000 auteurs
+    python -m benchmarks.suggestion --nombre 100000 --budget 5
+
+Génère une fois (dans benchmarks/data/) une base de N auteurs aux noms
+variés : prénoms réels, noms faits de syllabes, certains accentués. Mesure
+ensuite app.trigrammes.suggerer_auteurs() pour des saisies tirées de ces
+noms : début de nom, nom complet sans accents, faute de frappe, prénom et
+début de nom. Affiche p50 / p99 par type de saisie et la taille de l'index.
+
+Code de sortie 1 si une p99 dépasse le budget (ms, ramené à la vitesse de
+la machine par l'étalon CPU de benchmarks/bench.py).
+"""
+import argparse
+import json
+import random
+import sys
+import time
+from datetime import date
+from sqlalchemy import create_engine, func, insert, select
+from sqlalchemy.orm import Session
+from app.database import creer_schema
+from app.models import Author, AuthorTrigram
+from app.trigrammes import nom_normalise, normaliser, reindexer_auteurs, suggerer_auteurs
+from benchmarks.bench import DOSSIER, REFERENCE, _percentiles, etalonner
+from benchmarks.generer import LOT, NATIONALITES, PRENOMS, VERSION
+
+BUDGET_MS = 10.0
+
+# Syllabe = attaque + voyelle + coda : quelques dizaines de milliers de trigrammes
+# distincts, de fréquences très inégales, comme dans un vrai catalogue de noms
+ATTAQUES = (
+    "b br c ch cl cr d dr f fl fr g gl gr h j k kr l m n p ph pl pr qu r s sch sh sl st "
+    "t th tr v w z zh"
+).split()
+VOYELLES = "a e i o u y ou ai ei ie au é è ë ï ö ü".split()
+CODAS = ["", "", "", "n", "r", "l", "s", "t", "ck", "nd", "rt", "x", "z", "m", "ski", "ov", "mann", "berg"]
+
+
+def nom(rng) -> str:
+    return "".join(
+        rng.choice(ATTAQUES) + rng.choice(VOYELLES) + rng.choice(CODAS) for _ in range(rng.randint(2, 3))
+    ).capitalize()
+
+
+def generer_auteurs(url: str, nombre: int, graine: int):
+    """Base de N auteurs et leur index trigrammes"""
+    rng = random.Random(graine)
+    engine = create_engine(url)
+    creer_schema(engine)
+    noms = set()
+    while len(noms) < nombre:
+        # (prenom, nom) est unique : les doublons tirés sont ignorés
+        noms.add((rng.choice(PRENOMS), f"{nom(rng)} {nom(rng)}"))
+    with engine.begin() as conn:
+        lignes = [
+            {
+                "id": i, "prenom": prenom, "nom": famille, "date_naissance": date(1900, 1, 1),
+                "nationalite": rng.choice(NATIONALITES), "nom_normalise": nom_normalise(prenom, famille),
+            }
+            for i, (prenom, famille) in enumerate(sorted(noms), start=1)
+        ]
+        for debut in range(0, nombre, LOT):
+            conn.execute(insert(Author), lignes[debut:debut + LOT])
+        reindexer_auteurs(conn)
+        conn.exec_driver_sql("ANALYZE")
+    engine.dispose()
+
+
+def base_auteurs(nombre: int, graine: int):
+    chemin = DOSSIER / "data" / f"auteurs-{nombre}-{graine}-v{VERSION}.db"
+    if not chemin.exists():
+        chemin.parent.mkdir(exist_ok=True)
+        print(f"Génération de {nombre} auteurs dans {chemin}...")
+        temporaire = chemin.with_suffix(".tmp")
+        temporaire.unlink(missing_ok=True)
+        generer_auteurs(f"sqlite:///{temporaire}", nombre, graine)
+        temporaire.rename(chemin)
+    return chemin
+
+
+def faute(rng, texte: str) -> str:
+    """Deux lettres voisines inversées"""
+    i = rng.randrange(len(texte) - 1)
+    return texte[:i] + texte[i + 1] + texte[i] + texte[i + 2:]
+
+
+def saisies(rng, auteurs) -> dict:
+    """Type de saisie -> requêtes, tirées de noms existants"""
+    types = {"début de nom": [], "nom sans accents": [], "faute de frappe": [], "prénom et début": []}
+    for prenom, famille in auteurs:
+        premier = famille.split()[0]
+        types["début de nom"].append(premier[:rng.randint(2, 5)])
+        types["nom sans accents"].append(normaliser(famille))
+        types["faute de frappe"].append(faute(rng, famille))
+        types["prénom et début"].append(f"{prenom} {premier[:3]}")
+    return types
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nombre", type=int, default=500_000)
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--requetes", type=int, default=200, help="saisies par type")
+    parser.add_argument("--budget", type=float, default=BUDGET_MS, help="p99 en ms, à la vitesse de référence")
+    args = parser.parse_args(argv)
+
+    engine = create_engine(f"sqlite:///{base_auteurs(args.nombre, args.graine)}")
+    rng = random.Random(args.graine)
+    with Session(engine) as db:
+        ids = [rng.randint(1, args.nombre) for _ in range(args.requetes)]
+        auteurs = [db.get(Author, id_) for id_ in ids]
+        types = saisies(rng, [(a.prenom, a.nom) for a in auteurs])
+        trigrammes = db.scalar(select(func.count()).select_from(AuthorTrigram))
+
+        reference = json.loads(REFERENCE.read_text()) if REFERENCE.exists() else {}
+        etalon_reference = reference.get("10k", {}).get("etalon_ms")
+        vitesse = max(1.0, etalonner() / etalon_reference) if etalon_reference else 1.0
+        budget = args.budget * vitesse
+
+        print(f"{args.nombre} auteurs, {trigrammes} lignes author_trigram ({trigrammes / args.nombre:.1f} par auteur)")
+        # retrouvé : part des saisies dont l'auteur d'origine est parmi les 10 suggestions
+        print(f"{'saisie':<18} {'p50 ms':>8} {'p99 ms':>8} {'retrouvé':>8}")
+        echec = False
+        for nom_type, requetes in types.items():
+            # Échauffement : cache de pages SQLite
+            for q in requetes[:20]:
+                suggerer_auteurs(db, q)
+            durees, trouves = [], 0
+            for q, id_ in zip(requetes, ids):
+                debut = time.perf_counter()
+                suggestions = suggerer_auteurs(db, q)
+                durees.append((time.perf_counter() - debut) * 1000)
+                trouves += id_ in {s["id"] for s in suggestions}
+            p50, _, p99 = _percentiles(durees)
+            echec |= p99 > budget
+            print(f"{nom_type:<18} {p50:>8.2f} {p99:>8.2f} {trouves / len(requetes):>8.0%}")
+    print(f"budget p99 : {budget:.1f} ms")
+    return 1 if echec else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,73 @@
+"""
+Validation en masse : coût des schémas de création sur N payloads
+
+    python -m benchmarks.validation --nombre 100000
+
+Valide ligne à ligne, comme app.bulk, N livres et N auteurs valides
+(ISBN à clé de contrôle correcte, codes pays ISO 3166-1) et affiche le
+temps total et le débit par schéma.
+"""
+import argparse
+import random
+import sys
+import time
+from app.schemas.author import AuteurCreate
+from app.schemas.book import BookCreate
+from app.schemas.validation import isbn13
+from benchmarks.generer import CATEGORIES, EDITEURS, LANGUES, MOTS, NATIONALITES, NOMS, PRENOMS
+
+
+def livres(rng, nombre):
+    return [
+        {
+            "titre": " ".join(rng.choice(MOTS) for _ in range(3)),
+            "isbn": isbn13(f"978{i:09d}"),
+            "annee_publication": rng.randint(1950, 2020),
+            "nombre_exemplaires_disponibles": 1,
+            "nombre_exemplaires_total": 2,
+            "categorie": rng.choice(CATEGORIES),
+            "langue": rng.choice(LANGUES),
+            "nombre_pages": rng.randint(60, 900),
+            "maison_edition": rng.choice(EDITEURS),
+            "auteur_id": rng.randint(1, 1000),
+        }
+        for i in range(nombre)
+    ]
+
+
+def auteurs(rng, nombre):
+    return [
+        {
+            "prenom": rng.choice(PRENOMS),
+            "nom": f"{rng.choice(NOMS)}{i}",
+            "nationalite": rng.choice(NATIONALITES).lower(),
+            "date_naissance": f"19{rng.randint(10, 99)}-0{rng.randint(1, 9)}-1{rng.randint(0, 9)}",
+        }
+        for i in range(nombre)
+    ]
+
+
+def mesurer(schema, payloads) -> float:
+    debut = time.perf_counter()
+    for donnees in payloads:
+        schema.model_validate(donnees)
+    return time.perf_counter() - debut
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--nombre", type=int, default=100_000)
+    parser.add_argument("--graine", type=int, default=42)
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.graine)
+    for schema, payloads in ((BookCreate, livres(rng, args.nombre)), (AuteurCreate, auteurs(rng, args.nombre))):
+        # Meilleur de trois passes : la première paie aussi le réchauffement
+        duree = min(mesurer(schema, payloads) for _ in range(3))
+        print(f"{schema.__name__:<12} {args.nombre} payloads en {duree * 1000:8.1f} ms "
+              f"({args.nombre / duree:,.0f} /s)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
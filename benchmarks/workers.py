@@ -0,0 +1,171 @@
+"""
+Montée en charge des lectures selon le nombre de workers uvicorn
+
+    python -m benchmarks.workers --echelle 10k --workers 1 2 4
+    python -m benchmarks.workers --workers 1 4 --clients 16 --duree 20
+
+Pour chaque nombre de workers, l'application est lancée dans un vrai
+serveur (`python -m app.serveur --workers N`) sur une copie du catalogue
+synthétique, puis des processus clients (connexions HTTP persistantes)
+envoient des GET /books/{id} pendant --duree secondes. On affiche le débit,
+les latences p50 / p99 et l'efficacité : débit / (débit à 1 worker x N).
+
+Les lectures passent à l'échelle tant que workers + clients ne dépassent
+pas le nombre de cœurs : sur une machine à C cœurs, les clients en
+consomment une partie, la mesure n'a de sens que pour N < C.
+"""
+import argparse
+import http.client
+import multiprocessing
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from benchmarks.bench import _base
+from benchmarks.generer import ECHELLES
+
+RACINE = Path(__file__).resolve().parent.parent
+
+# Attente maximale du démarrage des workers (s)
+DEMARRAGE_MAX_S = 30.0
+
+
+def port_libre() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def attendre(port: int, limite: float = DEMARRAGE_MAX_S):
+    """Attendre que le serveur réponde sur GET /"""
+    fin = time.monotonic() + limite
+    while time.monotonic() < fin:
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=1)
+            conn.request("GET", "/")
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            time.sleep(0.1)
+    raise RuntimeError(f"serveur injoignable sur le port {port}")
+
+
+def lancer_serveur(base: Path, workers: int, port: int, **env) -> subprocess.Popen:
+    """python -m app.serveur --workers N sur la base donnée ; renvoie le processus une fois prêt"""
+    environnement = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{base}",
+        # Pas d'écriture de fond pendant la mesure
+        "OVERDUE_SWEEP_INTERVAL_S": "0",
+        **env,
+    }
+    serveur = subprocess.Popen(
+        [sys.executable, "-m", "app.serveur", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning"],
+        cwd=RACINE, env=environnement,
+    )
+    try:
+        attendre(port)
+    except Exception:
+        arreter(serveur)
+        raise
+    return serveur
+
+
+def arreter(serveur: subprocess.Popen):
+    """Arrêt propre : SIGTERM, les workers ferment leurs pools (lifespan)"""
+    serveur.terminate()
+    try:
+        serveur.wait(timeout=15)
+    except subprocess.TimeoutExpired:
+        serveur.kill()
+        serveur.wait()
+
+
+def client(port: int, livres: int, duree: float, graine: int, file):
+    """Processus client : GET /books/{id} en boucle sur une connexion persistante"""
+    rng = random.Random(graine)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    latences, erreurs = [], 0
+    fin = time.perf_counter() + duree
+    while time.perf_counter() < fin:
+        debut = time.perf_counter()
+        conn.request("GET", f"/books/{rng.randint(1, livres)}")
+        reponse = conn.getresponse()
+        reponse.read()
+        latences.append(time.perf_counter() - debut)
+        erreurs += reponse.status != 200
+    file.put((latences, erreurs))
+
+
+def mesurer(port: int, livres: int, clients: int, duree: float) -> dict:
+    file = multiprocessing.Queue()
+    processus = [
+        multiprocessing.Process(target=client, args=(port, livres, duree, graine, file))
+        for graine in range(clients)
+    ]
+    for p in processus:
+        p.start()
+    resultats = [file.get() for _ in processus]
+    for p in processus:
+        p.join()
+
+    latences = sorted(latence * 1000 for lot, _ in resultats for latence in lot)
+    coupes = statistics.quantiles(latences, n=100, method="inclusive")
+    return {
+        "requetes": len(latences),
+        "erreurs": sum(erreurs for _, erreurs in resultats),
+        "rps": len(latences) / duree,
+        "p50_ms": coupes[49],
+        "p99_ms": coupes[98],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--echelle", choices=ECHELLES, default="10k")
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=8, help="processus clients")
+    parser.add_argument("--duree", type=float, default=10.0, help="secondes de mesure par palier")
+    args = parser.parse_args(argv)
+
+    coeurs = os.cpu_count() or 1
+    if max(args.workers) >= coeurs:
+        print(f"Attention : {coeurs} cœur(s) pour {max(args.workers)} workers et {args.clients} clients, "
+              "la montée en charge sera bornée par le CPU")
+
+    travail = Path(tempfile.mkdtemp(prefix="bibliotheque-workers-")) / "workers.db"
+    shutil.copy(_base(args.echelle, args.graine), travail)
+    livres = ECHELLES[args.echelle]
+
+    print(f"{'workers':>7} {'req/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'efficacité':>10} {'erreurs':>7}")
+    reference, echec = None, False
+    try:
+        for workers in args.workers:
+            port = port_libre()
+            serveur = lancer_serveur(travail, workers, port)
+            try:
+                # Échauffement : chaque worker ouvre ses connexions et remplit son cache de pages
+                mesurer(port, livres, args.clients, 1.0)
+                resultat = mesurer(port, livres, args.clients, args.duree)
+            finally:
+                arreter(serveur)
+            reference = reference or resultat["rps"] / workers
+            efficacite = resultat["rps"] / (reference * workers)
+            echec |= resultat["erreurs"] > 0
+            print(f"{workers:>7} {resultat['rps']:>9.0f} {resultat['p50_ms']:>8.2f} {resultat['p99_ms']:>8.2f} "
+                  f"{efficacite:>10.0%} {resultat['erreurs']:>7}")
+    finally:
+        shutil.rmtree(travail.parent, ignore_errors=True)
+    return 1 if echec else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())